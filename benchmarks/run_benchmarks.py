@@ -0,0 +1,202 @@
+"""
+End-to-end benchmarks of ptwordpress against a simulated WordPress site (simulated_wordpress.py).
+
+Every scenario runs in a fresh Python process, so singletons, caches and peak RSS of one scenario do not
+leak into the next one. Reported for each scenario: wall time, requests received by the server, requests
+per second, requests throttled by the server and peak RSS of the scanning process. Results are printed
+as JSON (and written to --output), so runs before and after a change can be compared by a script.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --latency 0.05 --posts 5000 --rate-limit 100 --output before.json
+    python benchmarks/run_benchmarks.py --scenarios scan:posts print_media --repeat 3
+    python benchmarks/run_benchmarks.py --scenarios scan:files wordlist_discovery:plugins --not-found page
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import statistics
+import subprocess
+import contextlib
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), "ptwordpress")
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from simulated_wordpress import SimulatedWordPress
+
+# Test groups of a full scan, every group is one scenario scan:<group>
+SCAN_GROUPS = {
+    "info":    ["TECH", "INFO", "API", "ICONS", "GOOGLE", "COMMENTS", "VERSION", "ROBOTS", "SITEMAP"],
+    "files":   ["DANGEROUS", "ADMIN", "CONFIG", "SETTINGS", "FPD", "LOGS", "MNGMNT", "INFPG", "STATS", "BACKUP", "REPO", "README", "DIRLIST"],
+    "plugins": ["PLUGINS", "WPS"],
+    "users":   ["UESRRSS", "USERDICT", "USERPARAM", "USERAPIU", "USERAPIP"],
+    "posts":   ["POSTS", "EMAILS", "EXTURLS", "YOAST"],
+    "media":   ["MEDIA"],
+}
+
+# Entry points benchmarked without the rest of the scan
+COMPONENTS = ["wordlist_discovery:plugins", "_scrape_posts", "print_media", "identify_version_by_sources"]
+
+DEFAULT_SCENARIOS = [f"scan:{group}" for group in SCAN_GROUPS] + ["scan:all"] + COMPONENTS
+
+
+def _import_ptwordpress(url, scan_args):
+    """Import ptwordpress from the source tree and parse command line of the benchmarked scan"""
+    sys.path.insert(0, PACKAGE_DIR)
+    import ptwordpress
+    ptwordpress.SCRIPTNAME = "ptwordpress"
+    sys.argv = ["ptwordpress", "-u", url, *scan_args]
+    return ptwordpress, ptwordpress.parse_args()
+
+
+def _run_scenario(scenario, url, scan_args):
+    """Body of the child process, runs scenario and returns result of the tool"""
+    if scenario.startswith("scan:"):
+        group = scenario.split(":", 1)[1]
+        tests = [test for tests in SCAN_GROUPS.values() for test in tests] if group == "all" else SCAN_GROUPS[group]
+        ptwordpress, args = _import_ptwordpress(url, ["-ts", *tests, *scan_args])
+        return ptwordpress.PtWordpress(args).run(args)
+
+    ptwordpress, args = _import_ptwordpress(url, scan_args)
+    from ptlibs import ptjsonlib
+    from modules.journal import ScanJournal
+    from modules.http_client import ScanHttpClient
+    from modules.source_discover import SourceDiscover
+    from modules.user_discover import UserDiscover
+    from modules.version_by_sources import VersionBySourcesIdentifier
+
+    jsonlib = ptjsonlib.PtJsonLib()
+    ScanJournal()
+    ScanHttpClient(args=args, ptjsonlib=jsonlib)
+    if scenario.startswith("wordlist_discovery:"):
+        wordlist = scenario.split(":", 1)[1]
+        return SourceDiscover(url, args, jsonlib, True, False).wordlist_discovery(wordlist, title=f"Dictionary {wordlist}")
+    if scenario == "_scrape_posts":
+        return len(UserDiscover(url, args, jsonlib, True)._scrape_posts() or [])
+    if scenario == "print_media":
+        return len(SourceDiscover(url, args, jsonlib, True, False).print_media([]) or [])
+    if scenario == "identify_version_by_sources":
+        return VersionBySourcesIdentifier(args, jsonlib).identify_version_by_sources()
+    raise ValueError(f"Unknown scenario {scenario}")
+
+
+def child_main(scenario, url, result_path, scan_args):
+    """Run one scenario with output of the tool discarded, write measurements to result_path"""
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = _run_scenario(scenario, url, scan_args)
+    wall = time.perf_counter() - started
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # kilobytes on Linux, bytes on macOS
+    if sys.platform == "darwin":
+        peak_rss_kb //= 1024
+    with open(result_path, "w") as f:
+        json.dump({"wall": wall, "peakRssKb": peak_rss_kb, "result": result}, f, default=str)
+
+
+def run_scenario(site, scenario, scan_args, timeout):
+    """Run scenario in a child process against site, returns its measurements"""
+    result_path = os.path.join(os.environ.get("TMPDIR", "/tmp"), f"ptwordpress-bench-{os.getpid()}.json")
+    requests_before, throttled_before = site.requests, site.throttled
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", scenario, site.url, result_path, "--", *scan_args],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=timeout)
+    elapsed = time.perf_counter() - started
+    if process.returncode != 0 or not os.path.isfile(result_path):
+        return {"scenario": scenario, "error": (process.stderr or f"exit code {process.returncode}").strip()[-2000:], "processWall": round(elapsed, 3)}
+
+    with open(result_path) as f:
+        measured = json.load(f)
+    os.remove(result_path)
+    requests = site.requests - requests_before
+    return {
+        "scenario": scenario,
+        "wall": round(measured["wall"], 3),
+        "processWall": round(elapsed, 3), # Including interpreter start and imports
+        "requests": requests,
+        "requestsPerSecond": round(requests / measured["wall"], 1) if measured["wall"] else None,
+        "throttled": site.throttled - throttled_before,
+        "peakRssKb": measured["peakRssKb"],
+        "result": measured["result"],
+    }
+
+
+def summarize(runs) -> dict:
+    """Median of repeated runs of one scenario"""
+    ok = [run for run in runs if "error" not in run]
+    if not ok:
+        return runs[-1]
+    summary = dict(ok[-1])
+    for key in ["wall", "processWall", "requestsPerSecond", "peakRssKb"]:
+        values = [run[key] for run in ok if run.get(key) is not None]
+        summary[key] = round(statistics.median(values), 3) if values else None
+    summary["runs"] = len(ok)
+    if len(ok) > 1:
+        summary["wallStdev"] = round(statistics.stdev(run["wall"] for run in ok), 3)
+    return summary
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark ptwordpress against a simulated WordPress site")
+    parser.add_argument("--scenarios", nargs="+", default=DEFAULT_SCENARIOS, help=f"Scenarios to run (default: {' '.join(DEFAULT_SCENARIOS)})")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs of every scenario, median is reported")
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds every response of the site is delayed")
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--media", type=int, default=500)
+    parser.add_argument("--plugins", nargs="*", help="Installed plugins as slug:version")
+    parser.add_argument("--post-size", type=int, default=2000, help="Bytes of content of every post")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Requests per second before the site answers 429, 0 for no limit")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--not-found", choices=["404", "page", "redirect"], default="404", help="Response of the site to unknown paths")
+    parser.add_argument("--no-pagination-headers", action="store_true", help="Site does not send X-WP-Total and X-WP-TotalPages")
+    parser.add_argument("--timeout", type=float, default=900, help="Seconds one scenario may run")
+    parser.add_argument("--scan-args", default="", help="Extra ptwordpress arguments, e.g. \"-t 20 -ae 200\"")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    return parser.parse_args()
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        scenario, url, result_path = sys.argv[2:5]
+        return child_main(scenario, url, result_path, sys.argv[6:])
+
+    args = parse_args()
+    plugins = dict(plugin.split(":", 1) for plugin in args.plugins) if args.plugins is not None else None
+    site = SimulatedWordPress(latency=args.latency, posts=args.posts, users=args.users, media=args.media, plugins=plugins,
+                              post_size=args.post_size, rate_limit=args.rate_limit, retry_after=args.retry_after, not_found=args.not_found,
+                              pagination_headers=not args.no_pagination_headers)
+    site.start()
+    results = []
+    try:
+        for scenario in args.scenarios:
+            runs = [run_scenario(site, scenario, args.scan_args.split(), args.timeout) for _ in range(args.repeat)]
+            summary = summarize(runs)
+            results.append(summary)
+            print(f"{scenario:<30} " + (f"{summary['wall']:>8.2f}s {summary['requests']:>7} req {summary['requestsPerSecond'] or 0:>8.1f} req/s {summary['peakRssKb'] // 1024:>5} MB"
+                                        if "error" not in summary else "ERROR " + summary["error"].splitlines()[-1]), file=sys.stderr)
+    finally:
+        site.stop()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "site": {"latency": args.latency, "posts": args.posts, "users": args.users, "media": args.media, "plugins": site.plugins,
+                 "postSize": args.post_size, "rateLimit": args.rate_limit, "retryAfter": args.retry_after, "notFound": args.not_found,
+                 "paginationHeaders": not args.no_pagination_headers},
+        "scanArgs": args.scan_args,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Local stand-in for a WordPress site used by the benchmarks.
+
+Serves the homepage, REST API (posts, users, media, comments), RSS feed, author pages, robots.txt,
+plugin readmes and version source files the scanner asks for. Every response is delayed by latency
+seconds, with rate_limit set the server answers requests above rate_limit per second by 429 with
+Retry-After like a throttling WAF.
+
+Run standalone:
+    python benchmarks/simulated_wordpress.py --port 8080 --latency 0.02 --posts 2000 --rate-limit 50
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+DEFAULT_PLUGINS = {"contact-form-7": "5.7.1", "akismet": "5.0", "wordfence": "7.9", "woocommerce": "8.2.1", "elementor": "3.17.0"}
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore magna aliqua".split()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256 # Default 5 drops connections of a scan with many threads
+
+
+class SimulatedWordPress:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, posts=500, users=20, media=300, plugins=None,
+                 version="6.4.2", post_size=2000, rate_limit=0.0, retry_after=1, not_found="404", ranges=True, pagination_headers=True):
+        """
+        Args:
+            host (str): Address to listen on.
+            port (int): Port to listen on, 0 picks a free port.
+            latency (float): Seconds every response is delayed.
+            posts (int): Number of posts served by /wp-json/wp/v2/posts.
+            users (int): Number of users (REST API, author archives, ?author=<id> redirects).
+            media (int): Number of media served by /wp-json/wp/v2/media.
+            plugins (dict): Installed plugins {slug: version}, their readme.txt are served.
+            version (str): WordPress version in generator tags.
+            post_size (int): Approximate size of rendered content of a post in bytes.
+            rate_limit (float): Requests per second served before answering 429, 0 for no limit.
+            retry_after (int): Retry-After seconds sent with 429.
+            not_found (str): Response to unknown paths, "404", "page" (200 themed page naming the path) or "redirect" (302 to homepage).
+            ranges (bool): Answer Range requests of 200 responses by 206, False to ignore Range like some servers do.
+            pagination_headers (bool): Send X-WP-Total and X-WP-TotalPages with collections, False like proxies stripping them.
+        """
+        self.latency = latency
+        self.posts = posts
+        self.users = users
+        self.media = media
+        self.plugins = DEFAULT_PLUGINS if plugins is None else plugins
+        self.version = version
+        self.post_size = post_size
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.not_found = not_found
+        self.ranges = ranges
+        self.pagination_headers = pagination_headers
+        self.requests = 0
+        self.throttled = 0
+        self._tokens = rate_limit
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """Serve in a background thread, returns URL of the site"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _admit(self) -> bool:
+        """Count the request, False when it is over the rate limit"""
+        with self._lock:
+            self.requests += 1
+            if not self.rate_limit:
+                return True
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled_at) * self.rate_limit)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.throttled += 1
+            return False
+
+    def _post(self, i) -> dict:
+        words = " ".join(WORDS[(i + k) % len(WORDS)] for k in range(self.post_size // 6))
+        return {
+            "id": i + 1, "date": "2024-01-01T10:00:00", "modified": "2024-01-02T10:00:00", "slug": f"post-{i + 1}", "status": "publish",
+            "type": "post", "link": f"{self.url}/post-{i + 1}/", "title": {"rendered": f"Post {i + 1}"}, "author": (i % self.users) + 1,
+            "content": {"rendered": f"<p>{words} contact{i % 9}@example.com <a href=\"https://ext{i % 13}.example.org/page\">link</a></p>"},
+            "yoast_head_json": {"title": f"Post {i + 1}", "author": f"User {(i % self.users) + 1}"},
+        }
+
+    def _media(self, i) -> dict:
+        return {"id": i + 1, "source_url": f"{self.url}/wp-content/uploads/2024/01/image-{i + 1}.jpg", "author": (i % self.users) + 1,
+                "date_gmt": "2024-01-01T10:00:00", "modified_gmt": "2024-01-01T10:00:00", "title": {"rendered": f"image-{i + 1}"}}
+
+    def _user(self, i) -> dict:
+        return {"id": i + 1, "slug": f"user{i + 1}", "name": f"User {i + 1}"}
+
+    def _homepage(self) -> str:
+        assets = "".join(f"<link rel='stylesheet' href='/wp-content/plugins/{slug}/style.css?ver={version}'>\n" for slug, version in self.plugins.items())
+        return (f"<html><head><title>Simulated site</title><meta name=\"generator\" content=\"WordPress {self.version}\">\n"
+                f"<link rel=\"icon\" href=\"/favicon.ico\">\n{assets}"
+                f"<link rel='stylesheet' href='/wp-content/themes/twentytwentyfour/style.css?ver=1.0'>\n"
+                f"<script src='/wp-includes/js/jquery/jquery.min.js?ver=3.7.1'></script></head>"
+                f"<body><!-- simulated --><a href=\"/about/\">About</a> <a href=\"/post-1/\">Post</a> GTM-ABC1234</body></html>")
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.do_GET()
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self._admitted():
+                    return
+                if urlparse(self.path).path == "/xmlrpc.php":
+                    return self._send(200, "<methodResponse><params></params></methodResponse>", "text/xml")
+                self._send(404, "<html>Not found</html>")
+
+            def do_GET(self):
+                if not self._admitted():
+                    return
+                parsed = urlparse(self.path)
+                self._route(parsed.path, parse_qs(parsed.query))
+
+            def _admitted(self) -> bool:
+                admitted = site._admit()
+                time.sleep(site.latency)
+                if not admitted:
+                    self._send(429, "<html>Too Many Requests</html>", headers={"Retry-After": str(site.retry_after)})
+                return admitted
+
+            def _send(self, status, body=b"", content_type="text/html; charset=UTF-8", headers=None):
+                body = body.encode() if isinstance(body, str) else body
+                byte_range = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+                if site.ranges and status == 200 and byte_range and int(byte_range.group(1)) < len(body):
+                    start, end = int(byte_range.group(1)), min(int(byte_range.group(2) or len(body) - 1), len(body) - 1)
+                    headers = {**(headers or {}), "Content-Range": f"bytes {start}-{end}/{len(body)}"}
+                    status, body = 206, body[start:end + 1]
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _json(self, data, headers=None):
+                self._send(200, json.dumps(data), "application/json; charset=UTF-8", headers)
+
+            def _collection(self, item, total, query):
+                per_page = min(int(query.get("per_page", ["10"])[0]), 100)
+                page = int(query.get("page", ["1"])[0])
+                pages = max(1, -(-total // per_page))
+                if page > pages:
+                    return self._send(400, json.dumps({"code": "rest_post_invalid_page_number"}), "application/json; charset=UTF-8")
+                items = [item(i) for i in range((page - 1) * per_page, min(total, page * per_page))]
+                fields = query.get("_fields", [None])[0]
+                if fields:
+                    items = [{k: v for k, v in entry.items() if k in fields.split(",")} for entry in items]
+                self._json(items, {"X-WP-Total": str(total), "X-WP-TotalPages": str(pages)} if site.pagination_headers else None)
+
+            def _route(self, path, query):
+                if path == "/" and "author" in query:
+                    author = query["author"][0]
+                    if author.isdigit() and 1 <= int(author) <= site.users:
+                        return self._send(301, headers={"Location": f"{site.url}/author/user{author}/"})
+                    return self._send(404, "<html>Not found</html>")
+                if path == "/":
+                    return self._send(200, site._homepage())
+                if path.startswith("/author/"):
+                    slug = path.split("/")[2]
+                    if slug.startswith("user") and slug[4:].isdigit() and 1 <= int(slug[4:]) <= site.users:
+                        return self._send(200, f"<html><head><title>User {slug[4:]} | Simulated site</title></head><body class=\"author author-{slug}\"></body></html>")
+                    return self._send(404, "<html>Not found</html>")
+                if path in ("/wp-json", "/wp-json/"):
+                    return self._json({"name": "Simulated site", "description": "", "url": site.url, "home": site.url, "namespaces": ["oembed/1.0", "wp/v2"] + [f"{slug}/v1" for slug in site.plugins], "routes": {}})
+                if path.startswith("/wp-json/wp/v2/posts"):
+                    return self._collection(site._post, site.posts, query)
+                if path.startswith("/wp-json/wp/v2/users"):
+                    user_id = path[len("/wp-json/wp/v2/users"):].strip("/")
+                    if user_id.isdigit():
+                        return self._json(site._user(int(user_id) - 1)) if 1 <= int(user_id) <= site.users else self._send(404, "{}", "application/json")
+                    return self._collection(site._user, site.users, query)
+                if path.startswith("/wp-json/wp/v2/media"):
+                    return self._collection(site._media, site.media, query)
+                if path.startswith("/wp-json/wp/v2/comments"):
+                    return self._collection(lambda i: {"id": i + 1, "author": 0, "author_name": f"Visitor {i + 1}"}, 50, query)
+                if path.rstrip("/") == "/feed":
+                    items = "".join(f"<item><dc:creator><![CDATA[User {i + 1}]]></dc:creator></item>" for i in range(min(site.users, 10)))
+                    return self._send(200, f'<?xml version="1.0"?><rss xmlns:dc="http://purl.org/dc/elements/1.1/"><channel><generator>https://wordpress.org/?v={site.version}</generator>{items}</channel></rss>', "application/rss+xml")
+                if path == "/robots.txt":
+                    return self._send(200, f"User-agent: *\nDisallow: /wp-admin/\nSitemap: {site.url}/wp-sitemap.xml\n", "text/plain")
+                if path == "/wp-sitemap.xml":
+                    return self._send(200, "<sitemapindex></sitemapindex>", "application/xml")
+                if path == "/favicon.ico":
+                    return self._send(200, b"\x00\x00\x01\x00simulated", "image/x-icon")
+                if path in ("/wp-login.php", "/wp-admin/"):
+                    return self._send(200, "<html><form id=\"loginform\"></form></html>")
+                if path == "/readme.html":
+                    return self._send(200, f"<html>WordPress Version {site.version}</html>")
+                if path.startswith("/wp-content/plugins/"):
+                    parts = path.split("/")
+                    if len(parts) > 3 and parts[3] in site.plugins:
+                        if len(parts) > 4 and parts[4] == "readme.txt":
+                            return self._send(200, f"=== {parts[3]} ===\nStable tag: {site.plugins[parts[3]]}\n\n" + "Changelog line\n" * 2000, "text/plain")
+                        return self._send(200, "")
+                if path.startswith("/wp-content/themes/twentytwentyfour/style.css"):
+                    return self._send(200, "/*\nTheme Name: Twenty Twenty-Four\nVersion: 1.0\n*/\n" + "a{color:red}\n" * 2000, "text/css")
+                if path.startswith("/wp-content/uploads/") or path.startswith("/wp-includes/") or path.startswith("/wp-admin/css/"):
+                    if path.endswith("/"):
+                        return self._send(403, "<html>Forbidden</html>")
+                    return self._send(200, "/* " + path + " */\n" + "x" * 4096, "application/octet-stream")
+                self._not_found(path)
+
+            def _not_found(self, path):
+                if site.not_found == "page":
+                    return self._send(200, f"<html><head><title>Page not found | Simulated site</title></head><body><h1>Nothing found for {path}</h1>{'<p>Try a search.</p>' * 200}</body></html>")
+                if site.not_found == "redirect":
+                    return self._send(302, headers={"Location": f"{site.url}/"})
+                self._send(404, "<html>Not found</html>")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated WordPress site for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--media", type=int, default=300)
+    parser.add_argument("--rate-limit", type=float, default=0)
+    parser.add_argument("--not-found", choices=["404", "page", "redirect"], default="404")
+    parser.add_argument("--ignore-ranges", action="store_true", help="Answer Range requests by the whole file")
+    parser.add_argument("--no-pagination-headers", action="store_true", help="Do not send X-WP-Total and X-WP-TotalPages")
+    args = parser.parse_args()
+    site = SimulatedWordPress(args.host, args.port, args.latency, args.posts, args.users, args.media, rate_limit=args.rate_limit,
+                              not_found=args.not_found, ranges=not args.ignore_ranges, pagination_headers=not args.no_pagination_headers)
+    print(f"Serving simulated WordPress on {site.url}", file=sys.stderr)
+    try:
+        site._server.serve_forever()
+    except KeyboardInterrupt:
+        site.stop()
+
+
+if __name__ == "__main__":
+    main()
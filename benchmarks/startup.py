@@ -0,0 +1,103 @@
+"""
+Startup benchmark of ptwordpress: import time (python -X importtime) and wall time of short invocations.
+
+Every case runs ptwordpress.py in a fresh interpreter with -X importtime, sums the cumulative import time
+of top-level imports and checks it against the budget of the case. Modules listed in "forbidden" must not be
+imported by the case at all (e.g. requests for -v, aiohttp for scans without --async-engine). Exits with 1
+when a budget is exceeded or a forbidden module was imported, so it can run in CI.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --repeat 10 --output startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = os.path.join(os.path.dirname(BENCHMARKS_DIR), "ptwordpress", "ptwordpress.py")
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from simulated_wordpress import SimulatedWordPress
+
+# name, arguments ({url} is the simulated site), import budget in milliseconds, modules the case must not import
+CASES = [
+    ("version",      ["-v"],                                 75,  ["requests", "bs4", "aiohttp", "tqdm"]),
+    ("help",         ["-h"],                                 75,  ["requests", "bs4", "aiohttp", "tqdm"]),
+    ("scan:ROBOTS",  ["-u", "{url}", "-ts", "ROBOTS", "-j"], 425, ["aiohttp", "tqdm", "bs4", "modules.wordpress_downloader", "modules.batch", "modules.guessing"]),
+    ("scan:all",     ["-u", "{url}", "-j"],                  475, ["aiohttp", "tqdm", "bs4", "modules.wordpress_downloader", "modules.batch"]),
+]
+
+
+def parse_importtime(stderr) -> tuple:
+    """Returns (total import time in ms, {module: cumulative ms}) from -X importtime output"""
+    total, modules = 0, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative) / 1000
+        if not name[1:].startswith(" "): # Top-level import, not nested in another one
+            total += int(cumulative) / 1000
+    return total, modules
+
+
+def run_case(args, url, repeat) -> dict:
+    name, arguments, budget, forbidden = args
+    arguments = [argument.format(url=url) for argument in arguments]
+    import_times, walls, modules = [], [], {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime", SCRIPT, *arguments], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        walls.append((time.perf_counter() - started) * 1000)
+        total, modules = parse_importtime(process.stderr)
+        import_times.append(total)
+
+    imported_forbidden = sorted(module for module in modules if any(module == f or module.startswith(f + ".") for f in forbidden))
+    import_ms = statistics.median(import_times)
+    return {
+        "case": name,
+        "arguments": arguments,
+        "importMs": round(import_ms, 1),
+        "wallMs": round(statistics.median(walls), 1),
+        "budgetMs": budget,
+        "modules": len(modules),
+        "slowest": [{"module": module, "ms": ms} for module, ms in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:10]],
+        "forbiddenImported": imported_forbidden,
+        "ok": import_ms <= budget and not imported_forbidden,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark of ptwordpress")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of every case, median is reported")
+    parser.add_argument("--cases", nargs="+", help="Run only these cases")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    site = SimulatedWordPress(posts=20, users=3, media=5)
+    url = site.start()
+    try:
+        results = [run_case(case, url, args.repeat) for case in CASES if not args.cases or case[0] in args.cases]
+    finally:
+        site.stop()
+
+    for result in results:
+        status = "OK" if result["ok"] else "OVER BUDGET" if not result["forbiddenImported"] else "IMPORTS " + ", ".join(result["forbiddenImported"])
+        print(f"{result['case']:<14} import {result['importMs']:>7.1f} ms (budget {result['budgetMs']} ms)  wall {result['wallMs']:>7.1f} ms  {status}", file=sys.stderr)
+
+    report = {"python": sys.version.split()[0], "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if all(result["ok"] for result in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
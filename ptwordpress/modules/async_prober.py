@@ -0,0 +1,150 @@
+"""Asyncio engine sending wordlist probes with many requests in flight (--async-engine)."""
+
+import time
+import asyncio
+
+from modules.rate_control import HostBlockedError, is_throttling_response
+from modules.scheduler import ContextThreadPoolExecutor
+
+try:
+    import aiohttp
+except ImportError: # Optional dependency, pip install ptwordpress[async]
+    aiohttp = None
+
+
+class AsyncResponse:
+    """Minimal requests.Response look-alike used to evaluate probe responses."""
+    def __init__(self, url, status_code, headers, content, encoding=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.history = []
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+
+class AsyncProber:
+    def __init__(self, args, http_client):
+        """
+        Args:
+            args (Namespace): Parsed arguments, args.async_engine is the number of requests in flight.
+            http_client (ScanHttpClient): Shared client, provides headers, proxy, timeout, rate control, FPD test and stored URLs.
+        """
+        self.args = args
+        self.http_client = http_client
+        self.concurrency = max(1, args.async_engine)
+        self._in_flight = 0
+
+    def stream(self, candidates, method, callback, on_result, on_request=None, test_fpd: bool = False) -> None:
+        """
+        Send method request (str, or callable returning the method for url) to every (index, url) of candidates, on_result(index, callback(url, response, method sent))
+        is called as probes complete. Failed requests give None, the same as RequestException in the threaded engine.
+        Callbacks may send requests (soft-404 calibration), they run in a pool of args.threads threads outside the event loop.
+        Candidates are taken from the iterator only as fast as probes are sent, at most
+        2 * concurrency ahead, so the iterator may generate any number of them.
+        """
+        with ContextThreadPoolExecutor(max_workers=max(1, self.args.threads)) as callbacks:
+            asyncio.run(self._stream(candidates, method, callback, on_result, on_request, test_fpd, callbacks))
+
+    async def _stream(self, candidates, method, callback, on_result, on_request, test_fpd, callbacks):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ssl=False, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.http_client.timeout)
+        headers = self.http_client._merge_headers(None, True)
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_created)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers, cookie_jar=aiohttp.DummyCookieJar(), trust_env=True, trace_configs=[trace_config]) as session:
+            async def probe(index, url):
+                probe_method = method(url) if callable(method) else method
+                async with semaphore:
+                    if on_request:
+                        on_request(url)
+                    response = await self._send(session, url, probe_method)
+                if response is None:
+                    return index, None
+                self._after_response(response, probe_method, test_fpd)
+                return index, await asyncio.get_running_loop().run_in_executor(callbacks, callback, url, response, probe_method)
+
+            pending = set()
+            for index, url in candidates:
+                pending.add(asyncio.ensure_future(probe(index, url)))
+                if len(pending) >= 2 * self.concurrency:
+                    finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished:
+                        on_result(*task.result())
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    on_result(*task.result())
+
+    async def _send(self, session, url, method, max_retries=2):
+        """Send request within the limits of the host rate control, repeat it when throttled, None when the host is blocked"""
+        rate = self.http_client.rate_control.for_url(url)
+        for attempt in range(0, self.http_client.THROTTLED_RETRIES + 1):
+            try:
+                started = await self._acquire(rate)
+            except HostBlockedError:
+                return None
+            response = None
+            try:
+                response = await self._request(session, url, method, max_retries)
+            finally:
+                self._in_flight -= 1
+                if self.http_client.global_request_slots is not None:
+                    self.http_client.global_request_slots.release()
+                rate.update(started, response)
+            if attempt == self.http_client.THROTTLED_RETRIES or rate.blocked or not is_throttling_response(response):
+                return response
+
+    async def _acquire(self, rate) -> float:
+        """Wait until the host allows another request in flight and for a slot of all batch workers (--max-connections), returns its start time"""
+        while True:
+            delay = 0.01
+            if self._in_flight < rate.scaled(self.concurrency):
+                delay = rate.try_reserve()
+                if delay <= 0:
+                    self._in_flight += 1
+                    await self._acquire_global_slot()
+                    return time.monotonic()
+            await asyncio.sleep(delay)
+
+    async def _acquire_global_slot(self):
+        """Slots are shared with threads of other processes and cannot be awaited, they are polled"""
+        slots = self.http_client.global_request_slots
+        while slots is not None and not slots.acquire(False):
+            await asyncio.sleep(0.005)
+
+    async def _request(self, session, url, method, max_retries):
+        proxy = (self.http_client.proxy or {}).get(url.split(":", 1)[0])
+        trace = self.http_client.trace
+        for attempt in range(0, max_retries + 1):
+            started, connection = time.monotonic(), {"opened": False}
+            try:
+                async with session.request(method, url, allow_redirects=False, proxy=proxy, trace_request_ctx=connection) as response:
+                    ttfb = time.monotonic() - started
+                    content = await response.read()
+                    trace.record(method, url, response.status, time.monotonic() - started, ttfb=ttfb, reused=not connection["opened"],
+                                 bytes_down=15 + sum(len(k) + len(v) + 4 for k, v in response.headers.items()) + len(content))
+                    return AsyncResponse(str(response.url), response.status, response.headers, content, response.charset)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                trace.record(method, url, None, time.monotonic() - started, reused=not connection["opened"], error=e.__class__.__name__)
+                if attempt < max_retries:
+                    await asyncio.sleep(1)
+        return None
+
+    @staticmethod
+    async def _on_connection_created(session, context, params):
+        context.trace_request_ctx["opened"] = True
+
+    def _after_response(self, response, method, test_fpd):
+        """Same post-processing as ScanHttpClient.send_request does for every response"""
+        if (self.http_client.test_fpd or test_fpd) and method.upper() == "GET":
+            with self.http_client._lock:
+                self.http_client._check_fpd_in_response(response, self.args.verbose if test_fpd else True)
+        if self.http_client._store_urls and response.status_code != 404:
+            with self.http_client._lock:
+                self.http_client._stored_urls.add(response.url)
@@ -0,0 +1,170 @@
+"""Batch mode, scans a list of targets inside one long-lived pool of worker processes."""
+
+import io
+import sys
+import copy
+import json
+import urllib.parse
+import contextlib
+
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import BoundedSemaphore
+
+from ptlibs import ptjsonlib, ptprinthelper
+from ptlibs.ptprinthelper import ptprint, out_ifnot
+
+from modules.http_client import ScanHttpClient
+from modules.scheduler import _collapse_progress_lines
+from modules.helpers import Helpers
+from modules.plugins.emails import Emails
+from modules.plugins.hashes import Hashes
+from modules.journal import ScanJournal
+from modules.events import EventStream
+
+
+class TargetScanError(Exception):
+    """Scan of a single target ended with an error"""
+
+
+class BatchPtJsonLib(ptjsonlib.PtJsonLib):
+    """PtJsonLib ending only the current target on error instead of the whole process."""
+    def end_error(self, message, condition, details=None):
+        ptprint(out_ifnot(f"Error: {message}", "ERROR", condition))
+        self.set_status("error", message)
+        raise TargetScanError(message)
+
+
+def load_targets(path: str) -> list:
+    """Load target URLs from file or from stdin when path is '-', skip empty lines and comments"""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    targets = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#") and line not in targets:
+            targets.append(line)
+    return targets
+
+
+def _init_worker(request_slots):
+    # Budget of requests in flight shared by all workers
+    ScanHttpClient.global_request_slots = request_slots
+
+
+def _reset_singletons():
+    """Forget per-target state kept by singletons from a previous target scanned by this worker"""
+    for cls in [ScanHttpClient, Helpers, Emails, Hashes, ScanJournal, EventStream]:
+        cls._instance = None
+
+
+def _scan_in_worker(scan_function, args) -> dict:
+    """Run scan_function for one target, capture its output and result"""
+    _reset_singletons()
+    json_lib = BatchPtJsonLib()
+    buffer = io.StringIO()
+    error = None
+    with contextlib.redirect_stdout(buffer):
+        try:
+            scan_function(args, json_lib)
+        except TargetScanError as e:
+            error = str(e)
+        except BaseException as e: # Do not let SystemExit or any other error kill the worker
+            error = str(e) or e.__class__.__name__
+            ptprint(f"Error: {error}", "ERROR", condition=not args.json)
+            json_lib.set_status("error", error)
+    return {"url": args.url, "output": buffer.getvalue(), "result": json_lib.json_object, "error": error}
+
+
+class BatchScanner:
+    def __init__(self, args, scan_function):
+        """
+        Args:
+            args (Namespace): Parsed arguments, shared by all targets.
+            scan_function (callable): Picklable function(args, ptjsonlib) scanning args.url.
+            args.list_concurrency targets are scanned at once. Every target is scanned with at most
+            args.threads requests in flight and args.max_connections limits requests in flight of all targets.
+        """
+        self.args = args
+        self.scan_function = scan_function
+        self.max_workers = max(1, args.list_concurrency)
+        self.max_connections = args.max_connections or self.max_workers * args.threads
+
+    def run(self, targets: list) -> None:
+        """Scan all targets, print output of each target as soon as its scan finishes"""
+        queues = OrderedDict()
+        for url in targets:
+            queues.setdefault(self._get_host(url), deque()).append(url)
+
+        active_hosts = set()
+        running = {}
+        request_slots = BoundedSemaphore(self.max_connections)
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker, initargs=(request_slots,)) as executor:
+            while queues or running:
+                while len(running) < self.max_workers:
+                    host = self._next_host(queues, active_hosts)
+                    if host is None:
+                        break
+                    url = queues[host].popleft()
+                    if not queues[host]:
+                        del queues[host]
+                    active_hosts.add(host)
+                    running[executor.submit(_scan_in_worker, self.scan_function, self._get_target_args(url))] = (host, url)
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    host, url = running.pop(future)
+                    active_hosts.discard(host)
+                    try:
+                        result = future.result()
+                    except Exception as e: # Worker process died
+                        result = {"url": url, "output": "", "result": BatchPtJsonLib().json_object, "error": str(e) or e.__class__.__name__}
+                        result["result"].update({"status": "error", "message": result["error"]})
+                    self._print_result(result)
+
+    def _next_host(self, queues, active_hosts):
+        """
+        Round-robin over hosts: take the first host without a running scan and move it to the end,
+        so targets on one host are never scanned concurrently and cannot starve the other hosts.
+        """
+        for host in list(queues):
+            if host not in active_hosts:
+                queues.move_to_end(host)
+                return host
+        return None
+
+    def _get_target_args(self, url):
+        target_args = copy.copy(self.args)
+        target_args.url = url
+        host = self._get_host(url).replace(":", "_")
+        if self.args.output:
+            target_args.output = f"{self.args.output}-{host}"
+        if self.args.save_media:
+            target_args.save_media = f"{self.args.save_media.rstrip('/')}/{host}"
+        if self.args.trace:
+            target_args.trace = f"{self.args.trace}-{host}"
+        if self.args.journal:
+            # Targets not reached by the interrupted batch start a new journal
+            target_args.journal = f"{self.args.journal}-{host}"
+        return target_args
+
+    @staticmethod
+    def _get_host(url: str) -> str:
+        return urllib.parse.urlparse(url if "://" in url else f"http://{url}").netloc.lower()
+
+    def _print_result(self, result: dict) -> None:
+        if self.args.ndjson and not self.args.socket_address:
+            if result["error"]: # Scans streamed their events to stdout, errors before the scan started were not streamed
+                print(json.dumps({"event": "error", "target": result["url"], "message": result["error"]}), flush=True)
+        elif self.args.json:
+            # One JSON document per line for every target
+            print(json.dumps({"url": result["url"], **result["result"]}), flush=True)
+        else:
+            ptprinthelper.ptprint(f"Target: {result['url']}", "TITLE", colortext=True, newline_above=True)
+            sys.stdout.write(_collapse_progress_lines(result["output"]))
+            if result["error"] and not result["output"]:
+                ptprinthelper.ptprint(f"Error: {result['error']}", "ERROR", indent=4)
+            sys.stdout.flush()
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+from threading import Lock
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class DiskCache:
+    """
+    Persistent HTTP cache (-C/--cache) kept in SQLite, shared by all scans using the same cache directory.
+
+    Responses younger than ttl are served without contacting the server. Older responses are revalidated
+    with If-None-Match / If-Modified-Since when the server sent ETag / Last-Modified, so unchanged files
+    cost one 304 response without body. The least recently used responses are evicted above max_bytes.
+    """
+    def __init__(self, directory: str, ttl: float, max_bytes: int):
+        os.makedirs(directory, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "http-cache.sqlite3"), timeout=30, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL") # Batch mode workers share the cache
+            self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, url TEXT, status INTEGER, reason TEXT, headers TEXT, body BLOB,
+                etag TEXT, last_modified TEXT, stored_at REAL, accessed_at REAL, size INTEGER)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(method, url, headers, allow_redirects) -> str:
+        relevant_headers = sorted((k.lower(), str(v)) for k, v in (headers or {}).items() if k.lower() != "user-agent")
+        return hashlib.sha256(repr((method.upper(), url, relevant_headers, allow_redirects)).encode()).hexdigest()
+
+    def load(self, method, url, headers, allow_redirects, send) -> requests.Response:
+        """Return cached response for the request, send(extra_headers) is called when the server must be asked"""
+        key = self.make_key(method, url, headers, allow_redirects)
+        with self._lock:
+            row = self._db.execute("SELECT url, status, reason, headers, body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+
+        if row and time.time() - row[7] < self.ttl:
+            self.hits += 1
+            self._touch(key)
+            return self._build_response(method, row)
+
+        conditional_headers = {}
+        if row and row[5]:
+            conditional_headers["If-None-Match"] = row[5]
+        if row and row[6]:
+            conditional_headers["If-Modified-Since"] = row[6]
+
+        response = send(conditional_headers)
+        if conditional_headers and response.status_code == 304:
+            self.revalidated += 1
+            self._touch(key, revalidated=True)
+            return self._build_response(method, row)
+
+        self.misses += 1
+        self._store(key, response)
+        return response
+
+    def _touch(self, key, revalidated=False):
+        now = time.time()
+        with self._lock, self._db:
+            if revalidated:
+                self._db.execute("UPDATE responses SET accessed_at = ?, stored_at = ? WHERE key = ?", (now, now, key))
+            else:
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+
+    def _store(self, key, response):
+        # Keep only complete responses without redirect chain, transient errors are not cached
+        if response.history or response.status_code == 429 or response.status_code >= 500:
+            return
+        body = response.content or b""
+        if len(body) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._db:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._size += len(body) - (old[0] if old else 0)
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                key, response.url, response.status_code, response.reason, json.dumps(dict(response.headers)), body,
+                response.headers.get("ETag"), response.headers.get("Last-Modified"), now, now, len(body)))
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used responses until the cache fits into max_bytes"""
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if self._size <= self.max_bytes * 0.9:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._size -= size
+
+    @staticmethod
+    def _build_response(method, row) -> requests.Response:
+        url, status, reason, headers, body = row[:5]
+        response = requests.Response()
+        response.url = url
+        response.status_code = status
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response._content = body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.request = requests.Request(method, url).prepare()
+        return response
@@ -0,0 +1,148 @@
+"""Event stream (--ndjson), findings written as NDJSON lines while the scan runs."""
+
+import os
+import sys
+import json
+import time
+import queue
+import select
+import socket
+import threading
+
+from modules.scheduler import current_test
+
+PIPE_BUF = getattr(select, "PIPE_BUF", 4096) # Largest atomic write to a pipe
+
+
+class EventStream:
+    """
+    Writes each finding as one JSON line as soon as it is found, to stdout or to the socket sink
+    (--socket-address, --socket-port).
+
+    Events are serialized by the emitting thread and written by one writer thread in batches of up to
+    BATCH_SIZE events or FLUSH_INTERVAL seconds, whichever comes first. The queue between them holds at
+    most QUEUE_SIZE events, a slow consumer blocks the emitting tests instead of growing memory.
+    Lines are written whole, at most PIPE_BUF bytes per write when possible, so streams of parallel
+    batch workers sharing one pipe do not interleave inside a line.
+    """
+    _instance = None
+    QUEUE_SIZE = 10000
+    BATCH_SIZE = 500
+    FLUSH_INTERVAL = 0.2
+    _CLOSE = object()
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, args=None, ptjsonlib=None):
+        if hasattr(self, '_initialized'):
+            return
+        self.enabled = bool(getattr(args, "ndjson", False))
+        self.target = getattr(args, "url", None)
+        self.process_ident = getattr(args, "process_ident", None)
+        self.dropped = 0
+        self._socket = None
+        self._address = None
+        self._queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._thread = None
+        self._initialized = True
+        if not self.enabled:
+            return
+
+        if getattr(args, "socket_address", None) and getattr(args, "socket_port", None):
+            self._address = (args.socket_address, int(args.socket_port))
+            try:
+                self._socket = socket.create_connection(self._address, timeout=getattr(args, "timeout", None) or 10)
+                self._socket.settimeout(None) # Blocking send is the backpressure of the stream
+            except OSError as e:
+                self.enabled = False
+                ptjsonlib.end_error(f"Cannot connect to event sink {self._address[0]}:{self._address[1]}: {e}", getattr(args, "json", False))
+                return
+        self._thread = threading.Thread(target=self._writer, name="EventStream", daemon=True)
+        self._thread.start()
+
+    @property
+    def to_stdout(self) -> bool:
+        return self.enabled and self._address is None
+
+    def emit(self, event: str, **data) -> None:
+        """Stream finding of type event (user, plugin, theme, url, email, media, version, vulnerability, ...)"""
+        if not self.enabled:
+            return
+        record = {"event": event, "time": round(time.time(), 3), "target": self.target, "test": current_test.get()}
+        if self.process_ident:
+            record["process"] = self.process_ident
+        record.update(data)
+        self._queue.put(json.dumps(record, default=str) + "\n")
+
+    def _writer(self):
+        while True:
+            lines = [self._queue.get()]
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while lines[-1] is not self._CLOSE and len(lines) < self.BATCH_SIZE:
+                try:
+                    lines.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            closing = lines[-1] is self._CLOSE
+            if closing:
+                lines.pop()
+            if lines:
+                self._write(lines)
+            if closing:
+                return
+
+    def _write(self, lines):
+        if self._address:
+            if self._socket is None:
+                self.dropped += len(lines)
+                return
+            data = "".join(lines).encode("utf-8")
+            try:
+                self._socket.sendall(data)
+            except OSError:
+                try: # One reconnect, then events are dropped
+                    self._socket.close()
+                    self._socket = socket.create_connection(self._address, timeout=10)
+                    self._socket.settimeout(None)
+                    self._socket.sendall(data)
+                except OSError as e:
+                    self._socket = None
+                    self.enabled = False
+                    self.dropped += len(lines)
+                    print(f"Event sink {self._address[0]}:{self._address[1]} lost: {e}", file=sys.stderr, flush=True)
+            return
+
+        stream = sys.__stdout__
+        if stream is None:
+            return
+        stream.flush()
+        fd = stream.fileno()
+        chunk = b""
+        for line in lines:
+            line = line.encode("utf-8")
+            if chunk and len(chunk) + len(line) > PIPE_BUF:
+                self._write_fd(fd, chunk)
+                chunk = b""
+            chunk += line
+        if chunk:
+            self._write_fd(fd, chunk)
+
+    @staticmethod
+    def _write_fd(fd, data):
+        while data:
+            data = data[os.write(fd, data):]
+
+    def close(self) -> None:
+        """Write all queued events and stop the writer thread"""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(self._CLOSE)
+            self._thread.join()
+        if self._socket:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
@@ -0,0 +1,304 @@
+"""Compiled index of fingerprint databases (core file hashes, release badges, favicons), memory-mapped by scans."""
+
+import os
+import mmap
+import struct
+import hashlib
+
+from threading import Lock
+
+MODULES_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCES = {
+    "hashes": os.path.join(MODULES_DIR, "wordlists", "sources2versions.csv"),
+    "files": os.path.join(MODULES_DIR, "wordlists", "unique_sources_for_version_identify.txt"),
+    "badges": os.path.join(MODULES_DIR, "release_badges.py"),
+    "favicons": os.path.join(MODULES_DIR, "wordlists", "favicons.csv"), # Written by --download from the releases, not shipped
+}
+INDEX_NAME = "fingerprints.idx"
+
+MAGIC = b"PTWPIDX1"
+HEADER = struct.Struct("<8s32sII")   # magic, signature of the sources, number of versions, bytes of one version bitset
+SECTION = struct.Struct("<QQ")       # offset, length
+SECTIONS = ["versions", "files", "names", "bitsets", "hashes", "file_ranges", "file_hashes", "badges", "favicons"]
+HASH_RECORD = struct.Struct("<16sII")  # MD5 of a file, index of the file, index of bitset of versions, sorted by MD5
+RANGE_RECORD = struct.Struct("<II")    # first and count of hash records of a file in file_hashes
+DIGEST_RECORD = struct.Struct("<32sI") # SHA256, index of its name (badge version, favicon name), sorted by SHA256
+U32 = struct.Struct("<I")
+
+popcount = int.bit_count if hasattr(int, "bit_count") else lambda mask: bin(mask).count("1")
+
+
+def version_key(version, parts: int = 4) -> tuple:
+    """Sortable tuple of version string, e.g. (6, 4, 2, 0) for 6.4.2, (6, 5, 0, 0) for 6.5-RC1"""
+    values = []
+    for part in (version or "").strip().split("."):
+        digits = ""
+        for ch in part:
+            if not ch.isdigit():
+                break
+            digits += ch
+        if part:
+            values.append(int(digits) if digits else 0)
+    return tuple((values or [0]) + [0] * parts)[:parts]
+
+
+def source_signature() -> bytes:
+    """Digest of size and mtime of the sources, the index is rebuilt when any of them changes"""
+    stats = []
+    for name, path in sorted(SOURCES.items()):
+        try:
+            stat = os.stat(path)
+            stats.append((name, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            stats.append((name, None, None))
+    return hashlib.sha256(MAGIC + repr(stats).encode()).digest()
+
+
+def _string_table(strings) -> bytes:
+    blobs = [string.encode("utf-8") for string in strings]
+    offsets, position = [], 0
+    for blob in blobs:
+        offsets.append(position)
+        position += len(blob)
+    offsets.append(position)
+    return struct.pack(f"<{len(offsets) + 1}I", len(blobs), *offsets) + b"".join(blobs)
+
+
+def _read_digests(path) -> dict:
+    """{sha256: name} of CSV with columns SHA256 and Name"""
+    import csv
+    digests = {}
+    if os.path.isfile(path):
+        with open(path, newline="", encoding="utf-8") as fh:
+            for row in csv.DictReader(fh):
+                sha256, name = (row.get("SHA256") or "").strip().lower(), (row.get("Name") or "").strip()
+                if len(sha256) == 64 and name:
+                    digests[sha256] = name
+    return digests
+
+
+def compile_index() -> bytes:
+    """
+    Compile the sources into the index. A row of sources2versions.csv gives MD5 of File in all versions from
+    MinVersion to MaxVersion, every distinct (File, MD5) gets a bitset of these versions.
+    """
+    import csv
+    from modules.release_badges import known_svg_badge_hashes
+
+    rows = []
+    with open(SOURCES["hashes"], newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            file, md5, version = (row.get("File") or "").strip(), (row.get("MD5") or "").strip().lower(), (row.get("Version") or "").strip()
+            if file and len(md5) == 32 and version:
+                rows.append((file, md5, version, (row.get("MinVersion") or version).strip(), (row.get("MaxVersion") or version).strip()))
+
+    versions = sorted({version for _, _, version, _, _ in rows}, key=version_key)
+    keys = [version_key(version) for version in versions]
+    masks = {}
+    for file, md5, _, min_version, max_version in rows:
+        low, high = version_key(min_version), version_key(max_version)
+        mask = masks.get((file, md5), 0)
+        for bit, key in enumerate(keys):
+            if low <= key <= high:
+                mask |= 1 << bit
+        masks[(file, md5)] = mask
+    masks = {key: mask for key, mask in masks.items() if mask} # Rows of versions without the file (Reason "nearest")
+
+    with open(SOURCES["files"], encoding="utf-8") as fh:
+        probe_order = list(dict.fromkeys(line.strip() for line in fh if line.strip()))
+    hashed_files = {file for file, _ in masks}
+    files = [file for file in probe_order if file in hashed_files] + sorted(hashed_files - set(probe_order))
+    file_ids = {file: i for i, file in enumerate(files)}
+
+    bitset_bytes = (len(versions) + 7) // 8
+    records = sorted((bytes.fromhex(md5), file_ids[file], i) for i, ((file, md5), mask) in enumerate(masks.items()))
+    bitsets = b"".join(mask.to_bytes(bitset_bytes, "little") for mask in masks.values())
+    by_file = sorted(range(len(records)), key=lambda i: (records[i][1], i))
+    counts = [0] * len(files)
+    for _, file_id, _ in records:
+        counts[file_id] += 1
+    ranges = [(sum(counts[:file_id]), count) for file_id, count in enumerate(counts)]
+
+    names = []
+    def digest_records(digests):
+        table = []
+        for sha256, name in digests.items():
+            names.append(name)
+            table.append((bytes.fromhex(sha256), len(names) - 1))
+        return b"".join(DIGEST_RECORD.pack(*record) for record in sorted(table))
+    badges = digest_records({sha256.lower(): version for version, sha256 in known_svg_badge_hashes.items()})
+    favicons = digest_records(_read_digests(SOURCES["favicons"]))
+
+    sections = {
+        "versions": _string_table(versions),
+        "files": _string_table(files),
+        "names": _string_table(names),
+        "bitsets": bitsets,
+        "hashes": b"".join(HASH_RECORD.pack(*record) for record in records),
+        "file_ranges": b"".join(RANGE_RECORD.pack(*file_range) for file_range in ranges),
+        "file_hashes": b"".join(U32.pack(i) for i in by_file),
+        "badges": badges,
+        "favicons": favicons,
+    }
+    offset = HEADER.size + SECTION.size * len(SECTIONS)
+    table, body = [], []
+    for name in SECTIONS:
+        table.append(SECTION.pack(offset, len(sections[name])))
+        body.append(sections[name])
+        offset += len(sections[name])
+    return HEADER.pack(MAGIC, source_signature(), len(versions), bitset_bytes) + b"".join(table) + b"".join(body)
+
+
+def build_index(path) -> str:
+    """Compile the index to path (file or directory), replaced atomically so running scans keep their mapping"""
+    if os.path.isdir(path) or not os.path.splitext(path)[1]:
+        path = os.path.join(path, INDEX_NAME)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as fh:
+        fh.write(compile_index())
+    os.replace(temporary, path)
+    return path
+
+
+class FingerprintIndex:
+    """
+    Read only view of the compiled index (build_index, -bi/--build-index), shared by all tests of the scan.
+
+    The index file is memory-mapped, lookups binary search fixed-size records in the mapping and versions are
+    bitsets (int) intersected by &, so opening the index and a lookup cost the same however large the databases
+    grow. The index is compiled into the cache directory on first use and whenever the sources change, when
+    the directory is not writable it is compiled in memory.
+    """
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, args=None):
+        if hasattr(self, '_initialized'):
+            return
+        with self._lock:
+            if hasattr(self, '_initialized'):
+                return
+            cache_dir = getattr(args, "cache_dir", None) or os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "ptwordpress")
+            self._data = self._open(os.path.join(cache_dir, INDEX_NAME))
+            _, _, self.version_count, self._bitset_bytes = HEADER.unpack_from(self._data, 0)
+            self._sections = {name: SECTION.unpack_from(self._data, HEADER.size + i * SECTION.size) for i, name in enumerate(SECTIONS)}
+            self._versions = None
+            self._files = None
+            self._initialized = True
+
+    @staticmethod
+    def _open(path):
+        signature = source_signature()
+        for attempt in range(2):
+            try:
+                with open(path, "rb") as fh:
+                    data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+                if data[:len(MAGIC)] == MAGIC and HEADER.unpack_from(data, 0)[1] == signature:
+                    return data
+                data.close()
+            except (OSError, ValueError): # Missing, empty or truncated index
+                pass
+            if attempt == 0:
+                try:
+                    build_index(path)
+                except OSError:
+                    break
+        return compile_index()
+
+    def _strings(self, name) -> list:
+        offset, _ = self._sections[name]
+        count = U32.unpack_from(self._data, offset)[0]
+        offsets = struct.unpack_from(f"<{count + 1}I", self._data, offset + U32.size)
+        blob = offset + U32.size * (count + 2)
+        return [bytes(self._data[blob + start:blob + end]).decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+    def _string(self, name, index) -> str:
+        offset, _ = self._sections[name]
+        start, end = struct.unpack_from("<2I", self._data, offset + U32.size * (index + 1))
+        blob = offset + U32.size * (U32.unpack_from(self._data, offset)[0] + 2)
+        return bytes(self._data[blob + start:blob + end]).decode("utf-8")
+
+    def _search(self, name, record, key: bytes):
+        """Binary search of record sorted by its first field, returns the unpacked record or None"""
+        offset, length = self._sections[name]
+        low, high = 0, length // record.size
+        while low < high:
+            middle = (low + high) // 2
+            found = record.unpack_from(self._data, offset + middle * record.size)
+            if found[0] == key:
+                return found
+            if found[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _bitset(self, index) -> int:
+        offset = self._sections["bitsets"][0] + index * self._bitset_bytes
+        return int.from_bytes(self._data[offset:offset + self._bitset_bytes], "little")
+
+    @property
+    def versions(self) -> list:
+        """All versions of the index in ascending order, version i is bit i of bitsets"""
+        if self._versions is None:
+            self._versions = self._strings("versions")
+        return self._versions
+
+    @property
+    def all_versions(self) -> int:
+        return (1 << self.version_count) - 1
+
+    @property
+    def files(self) -> list:
+        """Files with known hashes, in the order of unique_sources_for_version_identify.txt"""
+        if self._files is None:
+            self._files = self._strings("files")
+        return self._files
+
+    def versions_of(self, mask: int) -> list:
+        """Versions of bitset in ascending order"""
+        versions = self.versions
+        return [versions[bit] for bit in range(self.version_count) if mask >> bit & 1]
+
+    def mask_of(self, versions) -> int:
+        positions = {version: bit for bit, version in enumerate(self.versions)}
+        return sum(1 << positions[version] for version in set(versions) if version in positions)
+
+    def lookup(self, md5: str):
+        """(file, bitset of versions) of file with MD5, None for unknown hash"""
+        try:
+            found = self._search("hashes", HASH_RECORD, bytes.fromhex(md5))
+        except ValueError:
+            return None
+        return (self.files[found[1]], self._bitset(found[2])) if found else None
+
+    def file_hashes(self, file_id: int) -> list:
+        """[(md5, bitset of versions)] of file at index file_id of files"""
+        first, count = RANGE_RECORD.unpack_from(self._data, self._sections["file_ranges"][0] + file_id * RANGE_RECORD.size)
+        file_hashes, records = self._sections["file_hashes"][0], self._sections["hashes"][0]
+        result = []
+        for i in range(first, first + count):
+            md5, _, bitset = HASH_RECORD.unpack_from(self._data, records + U32.unpack_from(self._data, file_hashes + i * U32.size)[0] * HASH_RECORD.size)
+            result.append((md5.hex(), self._bitset(bitset)))
+        return result
+
+    def _digest_name(self, section, sha256: str):
+        try:
+            found = self._search(section, DIGEST_RECORD, bytes.fromhex(sha256))
+        except ValueError:
+            return None
+        return self._string("names", found[1]) if found else None
+
+    def badge(self, sha256: str):
+        """Release of about-release-badge.svg with SHA256, e.g. 6.4.x"""
+        return self._digest_name("badges", sha256)
+
+    def favicon(self, sha256: str):
+        """Name of known favicon with SHA256, always None until favicons.csv is built by --download"""
+        return self._digest_name("favicons", sha256)
@@ -1,20 +1,21 @@
 from time import sleep
 from urllib.parse import urljoin
-from ptlibs.http.http_client import HttpClient
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from modules.http_client import ScanHttpClient
+from modules.scheduler import ContextThreadPoolExecutor
+from concurrent.futures import as_completed
 
 class Guessing:
     def __init__(self, args, ptjsonlib):
         self.args = args
         self.ptjsonlib = ptjsonlib
-        self.http_client = HttpClient(self.args, self.ptjsonlib)
+        self.http_client = ScanHttpClient(self.args, self.ptjsonlib)
 
 
     def test_login_protection_and_weak_passwords(self, usernames, weak_passwords):
         self.login_url = f"{self.args.url.rstrip('/')}/wp-login.php"
         successful_logins = []
         for username in usernames:
-            with ThreadPoolExecutor(max_workers=self.args.threads) as executor:
+            with ContextThreadPoolExecutor(max_workers=self.args.threads) as executor:
                 futures = [executor.submit(self.attempt_login, username, pw) for pw in weak_passwords]
 
                 for future in as_completed(futures):
@@ -12,19 +12,18 @@ import itertools
 
 import requests
 
-from ptlibs.http.http_client import HttpClient
+from modules.http_client import ScanHttpClient
+from modules.rate_control import is_throttling_response
+from modules.scheduler import ContextThreadPoolExecutor, ScanAborted
 from ptlibs import ptjsonlib
 
 from modules.version_by_sources import VersionBySourcesIdentifier
-from modules.release_badges import known_svg_badge_hashes
+from modules.fingerprint_index import FingerprintIndex
 from modules.plugins.hashes import Hashes
 
-from ptlibs import ptmisclib, ptprinthelper
+from ptlibs import ptprinthelper
 from ptlibs.ptprinthelper import ptprint
 
-import defusedxml.ElementTree as ET
-from bs4 import BeautifulSoup, Comment
-
 
 class Helpers:
     _instance = None
@@ -42,7 +41,7 @@ class Helpers:
 
             self.args = args
             self.ptjsonlib = ptjsonlib
-            self.http_client = HttpClient(args=self.args, ptjsonlib=self.ptjsonlib)
+            self.http_client = ScanHttpClient(args=self.args, ptjsonlib=self.ptjsonlib)
             self._block_wait = self.args.block_wait
             self._initialized = True  # Flag to indicate that initialization is complete
 
@@ -75,26 +74,9 @@ class Helpers:
             self.ptjsonlib.end_error(f"Target doesn't seem to be running wordpress.", self.args.json)
 
 
-    def parse_google_identifiers(self, response):
+    def parse_google_identifiers(self, homepage):
         ptprinthelper.ptprint(f"Google identifiers", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
-
-        regulars = {
-            "Google Tag Manager ID": r"(GTM-[A-Z0-9]{6,9})",
-            "Google Analytics Universal ID": r"(UA-\d{4,10}-\d+)",
-            "Google Analytics 4": r"(G-[A-Z0-9]{8,12})",
-            "Google Ads Conversion ID": r"(AW-\d{9,12})",
-            "Google Campaign Manager ID": r"(DC-\d{6,10})",
-            "Google AdSense Publisher ID" : r"(ca-pub-\d{16})|(ca-ads-\d{16})",
-            "Google API Keys": r"AIza[0-9A-z_\-\\]{35}",
-        }
-        found_identifiers = {}
-        for key, regex in regulars.items():
-            matches = re.findall(regex, response.text)
-            matches = [m[0] if isinstance(m, tuple) else m for m in matches]
-            matches = sorted(set(matches))
-            if matches:
-                found_identifiers[key] = matches
-
+        found_identifiers = homepage.google_identifiers
         if found_identifiers:
             for category, values in found_identifiers.items():
                 ptprinthelper.ptprint(f"{category}:", "TEXT", condition=not self.args.json, indent=4)
@@ -163,7 +145,7 @@ class Helpers:
             if rest_response is not None and rest_response.status_code != 200:
                 raise Exception
         except Exception as e:
-            print_api_is_not_available(status_code=getattr(rest_response, "status_code", None))
+            print_api_is_not_available(status_code=getattr(rest_response, "status_code", None), json_output=self.args.json)
             return
 
         rest_response = rest_response.json()
@@ -215,12 +197,10 @@ class Helpers:
                 raise Exception
             return rest_response.json()
         except Exception as e:
-            print_api_is_not_available(status_code=getattr(rest_response, "status_code", None))
+            print_api_is_not_available(status_code=getattr(rest_response, "status_code", None), json_output=self.args.json)
 
-    def extract_and_print_html_comments(self, response):
-        soup = BeautifulSoup(response.content, 'lxml')
-        # Find all comments in the HTML
-        comments = {comment for comment in soup.find_all(string=lambda text: isinstance(text, Comment))}
+    def extract_and_print_html_comments(self, homepage):
+        comments = homepage.comments
         if comments:
             ptprint(f"HTML comments", "TITLE", condition=not self.args.json, newline_above=True, indent=0, colortext=True)
             for comment in comments:
@@ -228,16 +208,14 @@ class Helpers:
                 ptprint(comment, "TEXT", condition=not self.args.json, colortext=True, indent=4)
         return comments
 
-    def extract_and_print_meta_tags(self, response) -> list:
-        content_type = next((value for key, value in response.headers.items() if key.lower() == "content-type"), "")
-        if "text/html" not in content_type:
+    def extract_and_print_meta_tags(self, homepage) -> list:
+        if not homepage.is_html:
             return
-        soup = BeautifulSoup(response.text, "lxml")
-        meta_tags = soup.find_all("meta")
+        meta_tags = homepage.meta_tags
         if meta_tags:
             ptprint(f"Meta tags", "TITLE", condition=not self.args.json, newline_above=True, indent=0, colortext=True)
             for meta in meta_tags:
-                ptprint(meta, "ADDITIONS", condition=not self.args.json, colortext=True, indent=4)
+                ptprint(homepage.render_tag("meta", meta), "ADDITIONS", condition=not self.args.json, colortext=True, indent=4)
         return meta_tags
 
     def print_robots_txt(self, robots_txt_response):
@@ -319,15 +297,12 @@ class Helpers:
         svg_badge_response = self.http_client.send_request(url=f"{self.BASE_URL}/wp-admin/images/about-release-badge.svg", method="GET", allow_redirects=False)
         if svg_badge_response.status_code == 200:
             ptprinthelper.ptprint(f"{svg_badge_response.url}", "VULN", condition=(not self.args.json and 'VERSION' in self.args.tests), indent=4, end="")
-            _found = False
             # Get sha 256 hash from response and compare with local db
             response_hash = Hashes(self.args).calculate_hashes(svg_badge_response.content)["SHA256"]
-            for key, value in known_svg_badge_hashes.items():
-                if value == response_hash:
-                    ptprinthelper.ptprint(f": {key}", "TEXT", condition=(not self.args.json and 'VERSION' in self.args.tests))
-                    _found = True
-                    break
-            if not _found:
+            badge_version = FingerprintIndex(self.args).badge(response_hash)
+            if badge_version:
+                ptprinthelper.ptprint(f": {badge_version}", "TEXT", condition=(not self.args.json and 'VERSION' in self.args.tests))
+            else:
                 ptprinthelper.ptprint(f" ", "TEXT", condition=(not self.args.json and 'VERSION' in self.args.tests))
 
         opml_response = self.http_client.send_request(url=f"{self.BASE_URL}/wp-links-opml.php", method="GET", allow_redirects=False)
@@ -365,7 +340,7 @@ class Helpers:
 
         # TODO: If you know about more methods, add them ...
 
-        version_from_sources = VersionBySourcesIdentifier(self.args, self.ptjsonlib).identify_version_by_sources()
+        version_from_sources = VersionBySourcesIdentifier(self.args, self.ptjsonlib).identify_version_by_sources(hint=wp_version)
         if len(version_from_sources)==1 and not wp_version: # only one version found from sources and no other version detected yet
             wp_version = version_from_sources[0]
         ptprint(f"Predicted version(s) by sources: {', '.join(version_from_sources)}", "OK" if not version_from_sources else "VULN", condition=(not self.args.json and 'VERSION' in self.args.tests), indent=4)
@@ -374,6 +349,7 @@ class Helpers:
 
     def _get_wp_version_from_rss_feed(self, response):
         """Retrieve wordpress version from generator tag if possible"""
+        import defusedxml.ElementTree as ET
         try:
             root = ET.fromstring(response.text.strip())
         except:
@@ -394,25 +370,50 @@ class Helpers:
 
         return _wp_version
 
-    def fetch_responses_in_parallel(self):
-
-        def fetch(url):
+    def prefetch_bootstrap_responses(self, tests) -> tuple:
+        """
+        Send all requests the bootstrap and the selected tests always need at once, as soon as BASE_URL is final.
+        Returns (rest, rss, robots.txt) responses, the other requests keep running in the background and their
+        responses are taken from the response memo by the tests sending the same request later. Without the memo
+        (--memo-size 0) only the returned responses are requested.
+        """
+        def fetch(request):
+            method, url, allow_redirects = request
             try:
-                return self.http_client.send_request(url=url, method="GET")
+                return self.http_client.send_request(url=url, method=method, allow_redirects=allow_redirects)
             except Exception as e:
                 return None
 
         urls = {
-            "rest": self.REST_URL,
-            "rss": self.BASE_URL + "/feed",
-            "robots": self.BASE_URL + "/robots.txt",
+            "rest": ("GET", self.REST_URL, True),
+            "rss": ("GET", self.BASE_URL + "/feed", True),
+            "robots": ("GET", self.BASE_URL + "/robots.txt", True),
         }
-
-        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-            futures = {name: executor.submit(fetch, url) for name, url in urls.items()}
+        # (method, url, allow_redirects) exactly as sent later, so they match the memoized responses
+        speculative = [("HEAD", f"{self.BASE_URL}/favicon.ico", True)] # HEAD method test
+        if tests & {"TECH", "ICONS"}:
+            speculative.append(("GET", f"{self.BASE_URL}/favicon.ico", True))
+        if tests & {"VERSION", "WPS"}:
+            speculative += [("GET", f"{self.BASE_URL}/wp-admin/images/about-release-badge.svg", False), ("GET", f"{self.BASE_URL}/wp-links-opml.php", False)]
+        if "VERSION" in tests:
+            speculative.append(("GET", "https://api.wordpress.org/core/version-check/1.7/", False))
+        if "SITEMAP" in tests:
+            speculative.append(("GET", f"{self.BASE_URL}/sitemap.xml", False))
+        if "PLUGINS" in tests:
+            from modules.security_tools_identifier import SecurityToolsIdentifier
+            speculative += [("GET", url, True) for url in SecurityToolsIdentifier(self.args, self.ptjsonlib).get_urls()]
+        if not self.http_client.memo:
+            speculative = []
+
+        executor = ContextThreadPoolExecutor(max_workers=len(urls) + len(speculative))
+        try:
+            futures = {name: executor.submit(fetch, request) for name, request in urls.items()}
+            for request in speculative:
+                executor.submit(fetch, request)
             responses = {name: future.result() for name, future in futures.items()}
-            return responses["rest"], responses["rss"], responses["robots"]
-        return rest_response, rss_response, robots_txt_response
+        finally:
+            executor.shutdown(wait=False)
+        return responses["rest"], responses["rss"], responses["robots"]
 
     def _get_base_response(self, url):
         """Retrieve base response and handle initial redirects"""
@@ -423,7 +424,7 @@ class Helpers:
 
     def _load_url(self, url, args = None, message: str = None, redirects=False):
         try:
-            response, dump = ptmisclib.load_url(url, "GET", headers=self.args.headers, cache=self.args.cache, redirects=True, proxies=self.args.proxy, timeout=self.args.timeout, dump_response=True)
+            response, dump = self.http_client.send_request(url, "GET", allow_redirects=True, dump=True)
             history = response.history + [response]
 
             if response.history:
@@ -458,62 +459,47 @@ class Helpers:
             self.ptjsonlib.end_error(f"Error retrieving response from server.", self.args.json)
 
     def _check_if_blocked_by_server(self, url):
-        return
-        # Check if the server is available
+        """
+        Check the server still answers url. Throttled requests were already repeated by the rate control,
+        a target still blocking or blocked by the rate control ends the scan (ScanAborted, raised from a test
+        it stops the scheduler), or with --block-wait the scan waits until it is unblocked.
+        """
+        rate = self.http_client.rate_control.for_url(url)
         def check_server_availability():
             try:
-                response = self.http_client.send_request(url)
-                return response.status_code == 200
+                response = self.http_client.send_request(url, memo=False, cache=False)
+                return not is_throttling_response(response)
             except requests.RequestException:
                 return False
 
         block_wait = self._block_wait
-        if not check_server_availability():
+        if rate.blocked or not check_server_availability():
             if block_wait is None:
                 ptprint(f" ", "TEXT", not self.args.json)
-                self.ptjsonlib.end_error("The tested server has banned you. Not all tests were completed.", self.args.json)
+                rate.block() # Tests still running end without waiting for the host
+                raise ScanAborted("The tested server has banned you. Not all tests were completed.")
             else:
-                # If delay wasn't explicitly set by the user, default to 1 second
-                if self.args.delay == 0:
-                    self.args.delay = 1000  # in miliseconds
-
-                # Reduce thread count to 1 to minimize server load
-                self.args.threads = 1
-
                 dot_cycle = itertools.cycle([".", "..", "..."])
-                while not check_server_availability():
+                while True:
+                    rate.unblock()
+                    if check_server_availability():
+                        break
                     dots = next(dot_cycle)
-                    self.args.delay += 2000
-
-                    # Increase delay by 2 seconds each cycle to be more gentle to the server
-                    ptprinthelper.ptprint(ptprinthelper.get_colored_text(f"The tested server has banned you. Waiting for unblocking{dots} | Increasing delay between requests to {self.args.delay // 1000} seconds...", "WARNING"), "TEXT", indent=4, end="\r")
+                    ptprinthelper.ptprint(ptprinthelper.get_colored_text(f"The tested server has banned you. Waiting for unblocking{dots}", "WARNING"), "TEXT", indent=4, end="\r")
                     time.sleep(block_wait / 1000.0)
 
-    def _extract_all_links_from_homepage(self, response):
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        base_domain = urllib.parse.urlparse(response.url).netloc
-
-        tags_with_links = soup.find_all(['a', 'link', 'script', 'img', 'iframe', 'frame', 'object'],
-                                        href=True) + soup.find_all(['script', 'img', 'iframe', 'object'], src=True)
-
-        for tag in tags_with_links:
-            link_url = tag.get('href') or tag.get('src')
+    def _extract_all_links_from_homepage(self, homepage):
+        base_domain = urllib.parse.urlparse(homepage.url).netloc
+        # Store URLs that belong to the same domain
+        self.http_client._stored_urls.update(url for url in homepage.links if urllib.parse.urlparse(url).netloc == base_domain)
 
-            # Convert relative URLs to absolute using urljoin
-            absolute_url = urllib.parse.urljoin(response.url, link_url)
-            # Check if the URL belongs to the same domain (either relative or same domain)
-            if urllib.parse.urlparse(absolute_url).netloc == base_domain:
-                if absolute_url not in self.http_client._stored_urls:
-                    self.http_client._stored_urls.add(absolute_url)
-
-    def collect_favicon_hashes_from_html(self, response):
+    def collect_favicon_hashes_from_html(self, homepage):
         """
             Extracts all favicon-related URLs from the HTML source of a given HTTP response,
             downloads each file, and calculates their MD5, SHA1, and SHA256 hashes.
 
             Behavior:
-                - Parses the HTML for <link> tags with 'href' attributes containing 'favicon',
+                - Takes <link> tags of the homepage analysis with 'href' attributes containing 'favicon',
                 'apple-touch-icon', 'mask-icon', etc.
                 - Adds /favicon.ico manually to ensure it's included even if not in the HTML.
                 - Follows redirects and processes each unique URL once.
@@ -521,7 +507,7 @@ class Helpers:
                 - Prints each favicon URL and its corresponding hash values.
 
             Parameters:
-                response (requests.Response): The HTTP response object containing HTML content.
+                homepage (HomepageAnalysis): Analysis of the homepage HTML.
 
             Note:
                 Useful for identifying shared favicon usage (e.g., WordPress default icon)
@@ -529,21 +515,8 @@ class Helpers:
         """
         ptprinthelper.ptprint(f"Favicons", "TITLE", condition=not self.args.json, colortext=True, newline_above=True, end="")
 
-        try:
-            soup = BeautifulSoup(response.text, 'lxml')
-            base_url = response.url
-        except Exception as e:
-            return
-
-
-        favicon_urls = set()
-        for link in soup.find_all('link'):
-            rel = link.get('rel', [])
-            href = link.get('href', '')
-            if any(keyword in str(rel) for keyword in ['icon', 'apple-touch-icon', 'mask-icon']) or 'favicon' in href:
-                full_url = urllib.parse.urljoin(base_url, href)
-                favicon_urls.add(full_url)
-
+        base_url = homepage.url
+        favicon_urls = set(homepage.favicons)
         favicon_urls.add(urllib.parse.urljoin(base_url, '/favicon.ico'))
         for favicon_url in favicon_urls:
             try:
@@ -558,6 +531,10 @@ class Helpers:
 
                     for hash_type, hash_value in hashes.items():
                         ptprinthelper.ptprint(f"{hash_type}{' ' * (10 - len(hash_type))}{hash_value.lower()}", "TEXT", condition=not self.args.json, flush=True, indent=4, clear_to_eol=True, end="\n")
+
+                    known_favicon = FingerprintIndex(self.args).favicon(hashes["SHA256"])
+                    if known_favicon:
+                        ptprinthelper.ptprint(f"Known favicon: {known_favicon}", "INFO", condition=not self.args.json, flush=True, indent=4, clear_to_eol=True)
                 else:
                     ptprinthelper.ptprint(f"[{fav_response.status_code}] {HTTPStatus(fav_response.status_code).phrase} {'- Image contains errors' if fav_response.status_code == 200 else ''} ", "ADDITIONS", condition=not self.args.json, colortext=True, indent=4)
             except Exception as e:
@@ -579,12 +556,12 @@ class Helpers:
                 "status": post["status"],
                 "type": post["type"],
                 "link": post["link"],
-                "title": post["title"]["rendered"],
+                "title": post["title"],
                 "author": post["author"]
             })
 
             if self.args.verbose:
-                ptprinthelper.ptprint(f'{post["id"]}, {self.user_discover.get_user_slug_or_name(post["author"])}, {post["date"]}, {post["title"]["rendered"]}', "ADDITIONS", colortext=False, condition=not self.args.json, indent=4, clear_to_eol=True)
+                ptprinthelper.ptprint(f'{post["id"]}, {self.user_discover.get_user_slug_or_name(post["author"])}, {post["date"]}, {post["title"]}', "ADDITIONS", colortext=False, condition=not self.args.json, indent=4, clear_to_eol=True)
             ptprinthelper.ptprint(post["link"], "ADDITIONS", colortext=True, condition=not self.args.json, indent=4, clear_to_eol=True)
 
         if not all_posts:
@@ -599,6 +576,7 @@ class Helpers:
         with open(csv_filename, "w", newline="", encoding="utf-8") as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(["ID", "DATE", "DATE_GMT", "GUID", "MODIFIED", "MODIFIED_GMT", "SLUG", "STATUS", "TYPE", "LINK", "TITLE", "AUTHOR"])
+            authors = user_names_by_id(enumerated_users)
 
             for post in posts:
                 # Extract fields
@@ -610,14 +588,11 @@ class Helpers:
                     "status": post["status"],
                     "type": post["type"],
                     "link": post["link"],
-                    "title": post["title"]["rendered"],
+                    "title": post["title"],
                     "author": str(post["author"])
                 }
 
-                for user in enumerated_users:
-                    if user["id"] == result["author"]:
-                        result["author"] = user.get("slug") or user.get("name") or result["author"]
-
+                result["author"] = authors.get(result["author"], result["author"])
 
                 # Write CSV row
                 writer.writerow([
@@ -636,8 +611,16 @@ class Helpers:
                 ])
 
 
-def print_api_is_not_available(status_code):
-    ptprinthelper.ptprint(f"API is not available" + (f" [{str(status_code)}]" if status_code else ""), "WARNING", condition=True, indent=4)
+def print_api_is_not_available(status_code, json_output=False):
+    ptprinthelper.ptprint(f"API is not available" + (f" [{str(status_code)}]" if status_code else ""), "WARNING", condition=not json_output, indent=4)
+
+def user_names_by_id(users) -> dict:
+    """Returns {str(id): slug or name} of enumerated users, authors of posts and media are looked up in it"""
+    names = {}
+    for user in users:
+        if user.get("id") and (user.get("slug") or user.get("name")):
+            names.setdefault(str(user["id"]), user.get("slug") or user.get("name"))
+    return names
 
 def _yes_no_prompt(message) -> bool:
 
@@ -0,0 +1,118 @@
+"""Single pass analysis of the homepage, shared by all tests reading its HTML."""
+
+import re
+from urllib.parse import urljoin
+
+from functools import cached_property
+
+# Tags whose href / src point to other resources of the site
+HREF_TAGS = {"a", "link", "script", "img", "iframe", "frame", "object"}
+SRC_TAGS = {"script", "img", "iframe", "object"}
+FAVICON_RELS = ["icon", "apple-touch-icon", "mask-icon"]
+
+GOOGLE_IDENTIFIERS = {
+    "Google Tag Manager ID": r"(GTM-[A-Z0-9]{6,9})",
+    "Google Analytics Universal ID": r"(UA-\d{4,10}-\d+)",
+    "Google Analytics 4": r"(G-[A-Z0-9]{8,12})",
+    "Google Ads Conversion ID": r"(AW-\d{9,12})",
+    "Google Campaign Manager ID": r"(DC-\d{6,10})",
+    "Google AdSense Publisher ID" : r"(ca-pub-\d{16})|(ca-ads-\d{16})",
+    "Google API Keys": r"AIza[0-9A-z_\-\\]{35}",
+}
+
+# Paths to plugin and theme assets anywhere in the page (attributes, inline scripts and styles). A path starts
+# after a quote or parenthesis, the lookbehind keeps the search linear on long runs of text without them.
+ASSET_PATTERNS = {content_type: re.compile(rf"(?:^|(?<=[\"'()]))([^\"'()]*wp-content\/{content_type}s\/)(.*?)(?=[\"')])", re.IGNORECASE) for content_type in ["plugin", "theme"]}
+
+
+class _Collector:
+    """Target of the lxml parser, collects elements and comments as the page is parsed, no tree is built"""
+    def __init__(self):
+        self.elements = [] # (tag, attributes) of elements with attributes read by the analysis
+        self.comments = []
+
+    def start(self, tag, attrib):
+        if tag in HREF_TAGS or tag == "meta":
+            self.elements.append((tag, dict(attrib)))
+
+    def comment(self, text):
+        self.comments.append(text)
+
+    def close(self):
+        return self
+
+
+class HomepageAnalysis:
+    """
+    Links, meta tags, comments, favicons, Google identifiers and plugin / theme assets of the homepage.
+
+    The page is parsed once by the lxml parser with a collecting target, so no DOM is built. Regex based
+    results (Google identifiers, assets) are searched in the raw page once, when first read. One instance
+    is created by the bootstrap of the scan and passed to every test working with the homepage.
+    """
+    def __init__(self, response):
+        self.url = response.url
+        content_type = next((value for key, value in response.headers.items() if key.lower() == "content-type"), "")
+        self.is_html = "text/html" in content_type
+        self.text = response.text
+
+        collector = self._parse(self.text)
+        self.meta_tags = [attributes for tag, attributes in collector.elements if tag == "meta"]
+        # The HTML parser reports processing instructions (<?xml ...?>, <?php ...?>) as comments, the raw page tells them apart
+        self.comments = list(dict.fromkeys(comment for comment in collector.comments if comment is not None and not (comment.startswith("?") and f"<{comment}>" in self.text)))
+        self.links = [] # Absolute URLs of href / src attributes
+        self.favicons = []
+        for tag, attributes in collector.elements:
+            link = attributes.get("href") if tag in HREF_TAGS else None
+            if not link and tag in SRC_TAGS:
+                link = attributes.get("src")
+            if link:
+                self.links.append(urljoin(self.url, link))
+            if tag == "link" and (any(rel in attributes.get("rel", "") for rel in FAVICON_RELS) or "favicon" in attributes.get("href", "")):
+                self.favicons.append(urljoin(self.url, attributes.get("href", "")))
+
+    @staticmethod
+    def _parse(text) -> _Collector:
+        from lxml import etree
+        collector = _Collector()
+        if not text:
+            return collector
+        parser = etree.HTMLParser(target=collector, huge_tree=True)
+        try:
+            parser.feed(text)
+            parser.close()
+        except etree.LxmlError:
+            pass # Elements collected before the parser gave up are kept
+        return collector
+
+    @cached_property
+    def google_identifiers(self) -> dict:
+        """Returns {category: sorted identifiers} of Google services found in the page"""
+        found_identifiers = {}
+        for key, regex in GOOGLE_IDENTIFIERS.items():
+            matches = re.findall(regex, self.text)
+            matches = sorted(set(m[0] if isinstance(m, tuple) else m for m in matches))
+            if matches:
+                found_identifiers[key] = matches
+        return found_identifiers
+
+    @cached_property
+    def assets(self) -> dict:
+        """
+        Returns {"plugin": [...], "theme": [...]} of (path up to wp-content/<type>/, rest of the path, name, ?ver= value or None)
+        ordered by the path prefix.
+        """
+        assets = {}
+        for content_type, pattern in ASSET_PATTERNS.items():
+            assets[content_type] = []
+            for prefix, relative_path in pattern.findall(self.text):
+                version = relative_path.split("?ver")[-1].split("=")[-1] if "?ver" in relative_path else None
+                assets[content_type].append((prefix, relative_path, relative_path.split("/")[0], version))
+            assets[content_type].sort(key=lambda reference: reference[0])
+        return assets
+
+    @staticmethod
+    def render_tag(tag, attributes) -> str:
+        """Element as HTML, e.g. <meta name="generator" content="WordPress 6.5"/>"""
+        rendered = " ".join(f'{key}="{str(value).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace(chr(34), "&quot;")}"' for key, value in attributes.items())
+        return f"<{tag}{' ' + rendered if rendered else ''}/>"
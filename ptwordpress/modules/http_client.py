@@ -0,0 +1,207 @@
+import time
+import threading
+import http.cookiejar
+
+from threading import BoundedSemaphore, Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ptlibs import ptmisclib
+from ptlibs.http.http_client import HttpClient
+
+from modules.response_memo import ResponseMemo
+from modules.disk_cache import DiskCache
+from modules.rate_control import RateController, HostBlockedError, is_throttling_response
+from modules.request_trace import RequestTrace
+
+
+class TransportStats:
+    """Counts requests sent over the network and TCP(+TLS) connections opened for them."""
+    def __init__(self):
+        self.requests_sent = 0
+        self.connections_opened = 0
+        self._lock = Lock()
+
+    def request_sent(self):
+        with self._lock:
+            self.requests_sent += 1
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    @property
+    def connections_reused(self) -> int:
+        return max(0, self.requests_sent - self.connections_opened)
+
+
+class _RejectCookiesPolicy(http.cookiejar.DefaultCookiePolicy):
+    """Keep the shared session stateless, every request sends only its own cookies as before."""
+    def set_ok(self, cookie, request):
+        return False
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter counting connections opened by its connection pools and tracing every request sent."""
+    def __init__(self, stats: TransportStats, pool_maxsize: int, trace: RequestTrace = None):
+        self.stats = stats
+        self.trace = trace
+        self._local = threading.local() # Connection opened for the request sent by this thread
+        super().__init__(pool_maxsize=pool_maxsize)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self._count_connections(self.poolmanager)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if not proxy.lower().startswith("socks"): # SOCKS managers use their own pool classes
+            self._count_connections(manager)
+        return manager
+
+    def send(self, request, **kwargs):
+        self.stats.request_sent()
+        if self.trace is None:
+            return super().send(request, **kwargs)
+
+        self._local.opened = False
+        started = time.monotonic()
+        try:
+            response = super().send(request, **kwargs) # Returns once headers were received
+            ttfb = time.monotonic() - started
+            if not kwargs.get("stream"):
+                response.content # Read the body here so latency includes the download, requests reads it anyway
+        except Exception as e:
+            self.trace.record(request.method, request.url, None, time.monotonic() - started, reused=not self._local.opened, error=e.__class__.__name__)
+            raise
+        self.trace.record(request.method, request.url, response.status_code, time.monotonic() - started, ttfb=ttfb,
+                          bytes_down=self._bytes_received(response), reused=not self._local.opened)
+        return response
+
+    @staticmethod
+    def _bytes_received(response) -> int:
+        """Size of status line, headers and body as received (compressed)"""
+        body = response.raw.tell() if hasattr(response.raw, "tell") else len(response.content or b"")
+        return 15 + len(response.reason or "") + sum(len(k) + len(v) + 4 for k, v in response.headers.items()) + body
+
+    def _count_connections(self, manager):
+        stats, local = self.stats, self._local
+        def counting(pool_class):
+            class CountingConnectionPool(pool_class):
+                def _new_conn(self):
+                    stats.connection_opened()
+                    local.opened = True
+                    return super()._new_conn()
+            return CountingConnectionPool
+        manager.pool_classes_by_scheme = {scheme: counting(pool_class) for scheme, pool_class in manager.pool_classes_by_scheme.items()}
+
+
+class ScanHttpClient(HttpClient):
+    """
+    Scan-wide HTTP client shared by all modules.
+
+    All requests go through one requests.Session whose connection pool is sized to --threads,
+    so keep-alive connections and TLS sessions are reused by every module.
+    Requests in flight and request rate of every host adapt to 429/503 and WAF block pages (rate_control).
+    """
+    _instance = None
+    global_request_slots = None # Requests in flight of all targets in batch mode, set by batch workers
+    THROTTLED_RETRIES = 3       # Throttled requests are repeated after the host pause
+
+    def __init__(self, args=None, ptjsonlib=None):
+        if hasattr(self, '_initialized'):
+            return
+        super().__init__(args=args, ptjsonlib=ptjsonlib)
+        threads = max(1, getattr(args, "threads", 1) or 1)
+        # One global limit for requests in flight, regardless of how many tests run concurrently
+        self._request_slots = BoundedSemaphore(threads)
+        self.stats = TransportStats()
+        self.trace = RequestTrace(getattr(args, "trace", None))
+        self.session = requests.Session()
+        self.session.cookies.set_policy(_RejectCookiesPolicy())
+        adapter = PooledAdapter(self.stats, pool_maxsize=threads, trace=self.trace)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        memo_size = getattr(args, "memo_size", 64)
+        self.memo = ResponseMemo(max_bytes=memo_size * 1024 * 1024) if memo_size else None
+        self.disk_cache = DiskCache(args.cache_dir, ttl=args.cache_ttl * 3600, max_bytes=args.cache_size * 1024 * 1024) if getattr(args, "cache", False) else None
+        block_wait = getattr(args, "block_wait", None)
+        self.rate_control = RateController(threads, min_interval=(getattr(args, "delay", 0) or 0) / 1000, block_wait=block_wait / 1000 if block_wait is not None else None)
+
+    def send_request(self, url, method="GET", *, headers=None, data=None, params=None, proxies=None, max_retries: int = 2, allow_redirects=True, cookies: dict | None = None, timeout=None, verify=False, cache=None, dump=False, store_urls=False, merge_headers=True, test_fpd=False, verbose=True, memo=True, **kwargs):
+        """
+        Same as HttpClient.send_request, but the request is sent through the pooled session of the scan.
+        GET and HEAD responses are memoized for the whole scan, pass memo=False to always reach the server.
+        """
+        try:
+            if cache is None and getattr(self, "args", None) is not None:
+                cache = getattr(self.args, "cache", None)
+
+            final_headers = self._merge_headers(headers, merge_headers)
+            request_kwargs = dict(proxies=proxies if proxies else self.proxy if self.proxy else {}, data=data, timeout=timeout or self.timeout,
+                                  allow_redirects=allow_redirects, verify=verify, params=params, cookies=cookies, **kwargs)
+            send = lambda: self._load_url(url, method, final_headers, cache, max_retries, **request_kwargs)
+            if memo and self.memo and method.upper() in ("GET", "HEAD") and not (data or kwargs):
+                response = self.memo.fetch(self.memo.make_key(method, url, final_headers, params, cookies), allow_redirects, send)
+            else:
+                response = send()
+
+            test_fpd = self.test_fpd if self.test_fpd else test_fpd
+            # Body of streamed responses is read by the caller, possibly only in part
+            if test_fpd and method.upper() == "GET" and not kwargs.get("stream") and not hasattr(response, "_is_fpd_vuln"):
+                with self._lock:
+                    self._check_fpd_in_response(response, verbose)
+
+            if self._store_urls or store_urls:
+                if response.status_code != 404:
+                    with self._lock:
+                        self._stored_urls.add(response.url)
+
+            return response if not dump else (response, ptmisclib.get_response_data_dump(response))
+
+        except HostBlockedError:
+            raise
+        except Exception as e:
+            self._remap_requests_exception(e)
+
+    def _load_url(self, url, method, headers, cache, max_retries, **request_kwargs) -> requests.Response:
+        """Return response from the disk cache (--cache) or from the network."""
+        cacheable = method.upper() in ("GET", "HEAD") and not any(request_kwargs.get(k) for k in ("data", "params", "stream"))
+        if not (cache and self.disk_cache and cacheable):
+            return self._send_limited(url, method, headers, max_retries, **request_kwargs)
+
+        return self.disk_cache.load(method, url, headers, request_kwargs["allow_redirects"],
+                                    lambda conditional_headers: self._send_limited(url, method, {**headers, **conditional_headers}, max_retries, **request_kwargs))
+
+    def _send_limited(self, url, method, headers, max_retries, **request_kwargs) -> requests.Response:
+        """
+        Send request within the limit of requests in flight and the rate allowed by the host, repeat it when throttled.
+        Raises HostBlockedError once the host is blocked (rate_control), its throttled responses are not repeated then.
+        """
+        rate = self.rate_control.for_url(url)
+        for attempt in range(0, self.THROTTLED_RETRIES + 1):
+            started, response = rate.acquire(), None
+            try:
+                with self._request_slots:
+                    if self.global_request_slots is None:
+                        response = self._get_response(url, method, headers, max_retries, **request_kwargs)
+                    else:
+                        with self.global_request_slots:
+                            response = self._get_response(url, method, headers, max_retries, **request_kwargs)
+            finally:
+                rate.release(started, response)
+            if attempt == self.THROTTLED_RETRIES or rate.blocked or not is_throttling_response(response):
+                return response
+
+    def _get_response(self, url, method, headers, max_retries, **request_kwargs) -> requests.Response:
+        if request_kwargs.get("cookies") is None:
+            request_kwargs["cookies"] = ptmisclib._get_cookies_from_headers(headers)
+        for attempt in range(0, max_retries + 1):
+            try:
+                return self.session.request(method, url, headers=headers, **request_kwargs)
+            except requests.exceptions.RequestException as error:
+                if attempt < max_retries:
+                    time.sleep(1)
+                else:
+                    raise error
@@ -0,0 +1,184 @@
+"""Scan journal (--journal), records finished work so an interrupted scan can be resumed (--resume)."""
+
+import os
+import json
+import time
+import hashlib
+
+from threading import RLock
+
+
+class ScanJournal:
+    """
+    Append-only JSON lines file with the progress of one scan.
+
+    Records are buffered in memory and written at most every FLUSH_INTERVAL seconds, when a test
+    finishes and when the scan ends, so journaling costs one small write per interval. Values
+    registered by track() are written only when they changed since the last flush, sets registered
+    by track_set() only with items added since the last flush.
+    A journal opened with resume=True is loaded first, further records are appended to it.
+    """
+    _instance = None
+    FLUSH_INTERVAL = 5
+    PROBES_CHECKPOINT = 1000 # Dictionary probes between two checkpoints
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, path=None, url=None, resume=False):
+        if hasattr(self, '_initialized'):
+            return
+        self.path = path
+        self.enabled = bool(path)
+        self.resumed = False
+        self.recorded_url = None
+        self._tests = {}    # test name -> printed output
+        self._probes = {}   # probe key -> {"digest": str, "done": int, "found": list}
+        self._pages = {}    # posts page -> {"posts": list, "emails": list, "links": list}
+        self._values = {}   # tracked value name -> value
+        self._tracked = {}  # tracked value name -> getter
+        self._written = {}  # tracked value name -> JSON of value written last time
+        self._tracked_sets = {} # tracked set name -> getter
+        self._written_sets = {} # tracked set name -> items written so far
+        self._pending = []  # serialized records waiting for flush
+        self._last_flush = time.monotonic()
+        self._lock = RLock()
+        self._file = None
+        self._initialized = True
+        if not self.enabled:
+            return
+
+        if resume and os.path.isfile(path):
+            self._load(path)
+            self.resumed = True
+        self._file = open(path, "a" if self.resumed else "w", encoding="utf-8")
+        if not self.resumed:
+            self._append({"type": "scan", "url": url, "started": time.time()})
+            self.flush()
+
+    def _load(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError: # Last line of an interrupted write
+                    continue
+                kind = record.get("type")
+                if kind == "scan":
+                    self.recorded_url = record.get("url")
+                elif kind == "test":
+                    self._tests[record["name"]] = record.get("output", "")
+                elif kind == "probes":
+                    probes = self._probes.get(record["key"])
+                    if not probes or probes["digest"] != record["digest"]:
+                        probes = self._probes[record["key"]] = {"digest": record["digest"], "done": 0, "found": []}
+                    probes["done"] = record["done"]
+                    probes["found"].extend(record["found"])
+                elif kind == "page":
+                    self._pages[record["page"]] = record
+                elif kind == "items":
+                    self._written_sets.setdefault(record["name"], set()).update(record["items"])
+                elif kind == "value":
+                    self._values[record["name"]] = record["value"]
+                    self._written[record["name"]] = json.dumps(record["value"], default=str)
+
+    @property
+    def finished_tests(self) -> list:
+        return list(self._tests)
+
+    def track(self, name, getter, restore=None):
+        """Record getter() whenever it changed, restore(value) is called now with the value of the resumed scan"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._tracked[name] = getter
+        if restore and name in self._values:
+            restore(self._values[name])
+
+    def track_set(self, name, getter, restore=None):
+        """Same as track() for sets only growing during the scan, only new items are recorded"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._tracked_sets[name] = getter
+            items = self._written_sets.setdefault(name, set())
+        if restore and items:
+            restore(items)
+
+    def is_test_finished(self, name) -> bool:
+        return name in self._tests
+
+    def get_test_output(self, name) -> str:
+        return self._tests.get(name, "")
+
+    def test_finished(self, name, output):
+        if self.enabled:
+            self._append({"type": "test", "name": name, "output": output})
+            self.flush()
+
+    @staticmethod
+    def digest(items) -> str:
+        """Identifies list of probed URLs, checkpoints of other list are not reused"""
+        return hashlib.sha1("\n".join(items).encode()).hexdigest()
+
+    def get_probes(self, key, digest) -> tuple:
+        """Returns (number of probes done, found results) recorded for key"""
+        probes = self._probes.get(key)
+        if not probes or probes["digest"] != digest:
+            return 0, []
+        return probes["done"], list(probes["found"])
+
+    def probes_done(self, key, digest, done, found):
+        """Record that the first done probes of key were sent, found are results discovered since previous checkpoint"""
+        if self.enabled:
+            self._append({"type": "probes", "key": key, "digest": digest, "done": done, "found": found})
+
+    def get_page(self, page):
+        """Returns recorded posts page {"posts", "emails", "links"} or None"""
+        return self._pages.get(page)
+
+    def page_crawled(self, page, posts, emails, links):
+        if self.enabled:
+            self._append({"type": "page", "page": page, "posts": posts, "emails": sorted(emails or []), "links": list(links or [])})
+
+    def _append(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._pending.append(line)
+            if time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+                self.flush()
+
+    def flush(self):
+        """Write buffered records and changed tracked values"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._file is None:
+                return
+            for name, getter in self._tracked.items():
+                try:
+                    value = json.dumps(getter(), default=str)
+                except Exception:
+                    continue
+                if self._written.get(name) != value:
+                    self._written[name] = value
+                    self._pending.append('{"type": "value", "name": %s, "value": %s}' % (json.dumps(name), value))
+            for name, getter in self._tracked_sets.items():
+                new_items = getter() - self._written_sets[name]
+                if new_items:
+                    self._written_sets[name].update(new_items)
+                    self._pending.append(json.dumps({"type": "items", "name": name, "items": sorted(new_items)}))
+            if self._pending:
+                self._file.write("".join(line + "\n" for line in self._pending))
+                self._file.flush()
+                self._pending = []
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._file:
+                self._file.close()
+                self._file = None
@@ -2,10 +2,12 @@ import re
 from ptlibs import ptprinthelper, ptmisclib
 
 from modules.file_writer import write_to_file
+from modules.events import EventStream
 
 
 class Emails:
     _instance = None
+    _tlds = None # Lowercase IANA TLDs, loaded by the first parsed response
     def __new__(cls, args=None):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
@@ -15,20 +17,28 @@ class Emails:
     def __init__(self, args):
         self.args = args
         self.emails = set()
-        self._tlds = ptmisclib.get_tlds()
 
-    def parse_emails_from_response(self, response):
-        """Retrieve emails from response"""
-        #print(response.json)
-        response_text = response.text.replace(r"\r\n", " ").replace(r"\n", " ")
+    def parse_emails_from_response(self, response) -> set:
+        """Retrieve emails from response, returns emails found in the response"""
+        return self.parse_emails_from_text(response.text.replace(r"\r\n", " ").replace(r"\n", " "))
 
+    def parse_emails_from_text(self, text) -> set:
+        """Retrieve emails from text, returns emails found in the text"""
         email_regex = r"[\w\.-]+@[\w\.-]+\.[a-zA-Z]{2,3}"
-        emails = re.findall(email_regex, response_text)
+        emails = re.findall(email_regex, text)
 
+        if Emails._tlds is None:
+            Emails._tlds = {tld.lower() for tld in ptmisclib.get_tlds()}
+        found = set()
         for email in emails:
             email = email.lower()
-            if any(email.endswith(f".{tld.lower()}") for tld in self._tlds):
-                self.emails.add(email)
+            if email.rpartition(".")[2] in self._tlds: # The regex ends with the last label, which is the TLD
+                found.add(email)
+        events = EventStream()
+        for email in found - self.emails:
+            events.emit("email", email=email)
+        self.emails.update(found)
+        return found
 
     def print_result(self):
         ptprinthelper.ptprint("Discovered e-mail addresses (from posts)", "TITLE", condition=not self.args.json, flush=True, indent=0, clear_to_eol=True, colortext="TITLE", newline_above=True)
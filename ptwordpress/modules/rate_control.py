@@ -0,0 +1,206 @@
+"""Per-host adaptive rate control (AIMD) shared by all requests of the scan."""
+
+import time
+import urllib.parse
+import email.utils
+
+from threading import Condition, Lock
+
+import requests
+
+
+# Block pages of web application firewalls, looked for in 403 responses
+CHALLENGE_MARKERS = [
+    "cf-chl-", "challenge-platform", "attention required! | cloudflare", "just a moment...",
+    "sucuri website firewall", "access denied - sucuri", "your access to this site has been limited",
+    "_incapsula_resource", "request unsuccessful. incapsula",
+]
+
+
+class HostBlockedError(requests.exceptions.RequestException):
+    """Request not sent, the host throttled every request until the backoff reached its cap, it has banned the scan"""
+
+
+def is_throttling_response(response) -> bool:
+    """True for 429 and 503 responses and for WAF challenge pages"""
+    if response is None:
+        return False
+    if response.status_code in (429, 503):
+        return True
+    if response.headers.get("cf-mitigated", "").lower() == "challenge":
+        return True
+    if response.status_code == 403:
+        body = (response.content or b"")[:16384].decode("utf-8", errors="ignore").lower()
+        return any(marker in body for marker in CHALLENGE_MARKERS)
+    return False
+
+
+def get_retry_after(response, max_wait: float = 600):
+    """Seconds to wait from Retry-After header (delay-seconds or HTTP-date), None if missing"""
+    value = response.headers.get("Retry-After", "").strip() if response is not None else ""
+    if not value:
+        return None
+    if value.isdigit():
+        return min(int(value), max_wait)
+    try:
+        return min(max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0), max_wait)
+    except (TypeError, ValueError):
+        return None
+
+
+class HostRateControl:
+    """
+    Requests in flight and request rate allowed for one host.
+
+    Throttling responses (429, 503, WAF challenge pages) halve both limits and pause the host for Retry-After,
+    --block-wait or an exponential backoff. Limits are lowered once per congestion, responses to requests sent
+    before the previous decrease only extend the pause. Every window of successful responses adds one request
+    in flight and one request per second back, until the limits set by --threads and --delay are reached.
+    A host still throttling after BLOCKED_AFTER congestions paused for MAX_BACKOFF in a row is blocked,
+    its requests raise HostBlockedError until unblock().
+    """
+    MAX_INTERVAL = 10
+    MAX_BACKOFF = 60
+    BLOCKED_AFTER = 2
+
+    def __init__(self, max_concurrency: int, min_interval: float = 0, block_wait: float = None):
+        """
+        Args:
+            max_concurrency (int): Requests in flight when the host does not throttle (--threads).
+            min_interval (float): Seconds between two requests when the host does not throttle (--delay).
+            block_wait (float): Seconds to pause when throttled without Retry-After, backoff when None.
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_interval = min_interval
+        self.block_wait = block_wait
+        self.concurrency = self.max_concurrency
+        self.interval = min_interval
+        self.in_flight = 0
+        self.throttled = 0
+        self.paused_until = 0.0
+        self.blocked = False
+        self._next_send = 0.0
+        self._decreased_at = 0.0
+        self._backoff = 0
+        self._capped = 0 # Congestions in a row paused for MAX_BACKOFF
+        self._successes = 0
+        self._condition = Condition(Lock())
+
+    def acquire(self) -> float:
+        """Wait until a request may be sent, returns its start time for release()"""
+        with self._condition:
+            while True:
+                if self.blocked:
+                    raise HostBlockedError("The tested server has banned you")
+                if self.in_flight < self.concurrency:
+                    delay = self._reserve()
+                    if delay <= 0:
+                        self.in_flight += 1
+                        return time.monotonic()
+                    self._condition.wait(delay)
+                else:
+                    self._condition.wait()
+
+    def release(self, started: float, response) -> None:
+        """Adjust limits by the response of the request started at started, response is None on error"""
+        with self._condition:
+            self.in_flight -= 1
+            self._update(started, response)
+            self._condition.notify_all()
+
+    def try_reserve(self) -> float:
+        """Reserve time for one request sent outside acquire(), returns 0 or seconds to wait before trying again"""
+        with self._condition:
+            if self.blocked:
+                raise HostBlockedError("The tested server has banned you")
+            return self._reserve()
+
+    def update(self, started: float, response) -> None:
+        """Same as release() for requests reserved by try_reserve()"""
+        with self._condition:
+            self._update(started, response)
+            self._condition.notify_all()
+
+    def block(self) -> None:
+        """Fail further requests to the host, it has banned the scan"""
+        with self._condition:
+            self.blocked = True
+            self._condition.notify_all()
+
+    def unblock(self) -> None:
+        """Allow requests again (--block-wait), a host still throttling is blocked again after BLOCKED_AFTER capped congestions"""
+        with self._condition:
+            self.blocked = False
+            self._capped = 0
+            self.paused_until = 0.0
+            self._condition.notify_all()
+
+    def scaled(self, ceiling: int) -> int:
+        """Requests in flight for a client allowed ceiling requests when the host does not throttle"""
+        return max(1, ceiling * self.concurrency // self.max_concurrency)
+
+    def _reserve(self) -> float:
+        now = time.monotonic()
+        wait_until = max(self.paused_until, self._next_send)
+        if now < wait_until:
+            return wait_until - now
+        self._next_send = now + self.interval
+        return 0
+
+    def _update(self, started, response):
+        if response is None:
+            return
+        if is_throttling_response(response):
+            self._decrease(started, get_retry_after(response))
+        else:
+            self._capped = 0
+            self._increase()
+
+    def _decrease(self, started, retry_after):
+        now = time.monotonic()
+        self.throttled += 1
+        self._successes = 0
+        congestion = started >= self._decreased_at # Not a response to request sent before previous decrease
+        if congestion:
+            self._decreased_at = now
+            self._backoff += 1
+            self.concurrency = max(1, self.concurrency // 2)
+            self.interval = min(max(self.interval * 2, 0.1), self.MAX_INTERVAL)
+
+        backoff = min(2 ** (self._backoff - 1), self.MAX_BACKOFF)
+        if retry_after is None:
+            retry_after = self.block_wait if self.block_wait is not None else backoff
+        self.paused_until = max(self.paused_until, now + retry_after)
+
+        if congestion and max(backoff, retry_after) >= self.MAX_BACKOFF:
+            self._capped += 1
+            self.blocked = self._capped >= self.BLOCKED_AFTER
+
+    def _increase(self):
+        self._successes += 1
+        if self._successes < self.concurrency:
+            return
+        self._successes = 0
+        self._backoff = 0
+        self.concurrency = min(self.concurrency + 1, self.max_concurrency)
+        if self.interval > self.min_interval:
+            self.interval = 1 / (1 / self.interval + 1) # One request per second more
+            if self.interval < max(self.min_interval, 0.01):
+                self.interval = self.min_interval
+
+
+class RateController:
+    """HostRateControl of every host contacted by the scan."""
+    def __init__(self, max_concurrency: int, min_interval: float = 0, block_wait: float = None):
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval
+        self.block_wait = block_wait
+        self.hosts: dict = {}
+        self._lock = Lock()
+
+    def for_url(self, url: str) -> HostRateControl:
+        host = urllib.parse.urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostRateControl(self.max_concurrency, self.min_interval, self.block_wait)
+            return self.hosts[host]
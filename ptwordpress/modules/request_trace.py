@@ -0,0 +1,53 @@
+"""Per-request trace (--trace) and per-test cost of the scan."""
+
+import json
+import time
+import statistics
+
+from threading import Lock
+
+from modules.scheduler import current_test
+
+
+class RequestTrace:
+    """
+    Records every request sent over the network, tagged with the test that sent it.
+
+    With path set, each request is written as one JSON line (test, method, url, status, latency, ttfb,
+    bytes, reused). Per-test totals are always kept for summary(). Requests sent outside of tests
+    (target checks before the tests start) are tagged BOOTSTRAP.
+    """
+    def __init__(self, path: str = None):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8") if path else None
+        self._tests: dict = {} # test -> {"requests": int, "latencies": list, "bytes": int}
+        self._lock = Lock()
+
+    def record(self, method, url, status, latency: float, ttfb: float = None, bytes_down: int = 0, reused: bool = None, error: str = None) -> None:
+        test = current_test.get() or "BOOTSTRAP"
+        with self._lock:
+            totals = self._tests.setdefault(test, {"requests": 0, "latencies": [], "bytes": 0})
+            totals["requests"] += 1
+            totals["latencies"].append(latency)
+            totals["bytes"] += bytes_down
+            if self._file:
+                record = {"time": round(time.time(), 3), "test": test, "method": method.upper(), "url": url, "status": status,
+                          "latency": round(latency, 4), "ttfb": round(ttfb, 4) if ttfb is not None else None,
+                          "bytes": bytes_down, "reused": reused}
+                if error:
+                    record["error"] = error
+                self._file.write(json.dumps(record) + "\n")
+
+    def summary(self) -> list:
+        """Requests, total and median latency (seconds) and bytes received by every test, most expensive first"""
+        with self._lock:
+            rows = [{"test": test, "requests": totals["requests"], "totalLatency": round(sum(totals["latencies"]), 3),
+                     "medianLatency": round(statistics.median(totals["latencies"]), 4), "bytes": totals["bytes"]}
+                    for test, totals in self._tests.items()]
+        return sorted(rows, key=lambda row: row["totalLatency"], reverse=True)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from threading import Event, Lock
+
+
+class ResponseMemo:
+    """
+    Scan-wide memo of GET and HEAD responses.
+
+    Responses are keyed by (method, URL, params, cookies, request headers except User-Agent), so the same
+    request sent by different tests reaches the server only once. Requests for a key already in flight
+    wait for that response instead of sending a duplicate. Responses are held in an LRU bounded by max_bytes,
+    counting the body and RESPONSE_OVERHEAD for the response object, its headers and request.
+    """
+    IGNORED_HEADERS = {"user-agent"}
+    RESPONSE_OVERHEAD = 8192 # Measured size of an empty requests.Response
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> {allow_redirects: response}
+        self._sizes = {}              # key -> bytes held for key
+        self._size = 0
+        self._in_flight = {}          # (key, allow_redirects) -> Event
+        self._lock = Lock()
+
+    @classmethod
+    def make_key(cls, method, url, headers, params=None, cookies=None) -> tuple:
+        relevant_headers = tuple(sorted((k.lower(), str(v)) for k, v in (headers or {}).items() if k.lower() not in cls.IGNORED_HEADERS))
+        return (method.upper(), url, relevant_headers, repr(params) if params else None, repr(sorted(cookies.items())) if cookies else None)
+
+    def fetch(self, key, allow_redirects: bool, send):
+        """Return memoized response for key, otherwise call send() once and memoize its response"""
+        while True:
+            with self._lock:
+                response = self._lookup(key, allow_redirects)
+                if response is not None:
+                    self.hits += 1
+                    return response
+                event = self._in_flight.get((key, allow_redirects))
+                if event is None:
+                    event = self._in_flight[(key, allow_redirects)] = Event()
+                    self.misses += 1
+                    break
+            event.wait() # Same request is in flight, look up its response once it is done
+
+        try:
+            response = send()
+            self._store(key, allow_redirects, response)
+            return response
+        finally:
+            with self._lock:
+                del self._in_flight[(key, allow_redirects)]
+            event.set()
+
+    def _lookup(self, key, allow_redirects):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        if allow_redirects in entry:
+            return entry[allow_redirects]
+
+        # A response fetched with the other redirect mode can answer the request when no redirect was involved
+        other = entry[not allow_redirects]
+        if allow_redirects:
+            return None if other.is_redirect else other
+        return other.history[0] if other.history else other
+
+    def _store(self, key, allow_redirects, response):
+        # Do not keep transient errors, a later request may succeed
+        if response is None or response.status_code == 429 or response.status_code >= 500:
+            return
+        size = len(response.content or b"") + self.RESPONSE_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._entries.setdefault(key, {})[allow_redirects] = response
+            self._entries.move_to_end(key)
+            self._sizes[key] = self._sizes.get(key, 0) + size
+            self._size += size
+            while self._size > self.max_bytes and self._entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._size -= self._sizes.pop(old_key, 0)
@@ -0,0 +1,106 @@
+"""Pagination of WordPress REST API collections (posts, users, media, comments)."""
+
+import requests
+
+from modules.scheduler import ContextThreadPoolExecutor
+
+
+class RestPaginator:
+    """
+    Fetches every page of a REST API collection.
+
+    The first page is fetched alone, X-WP-TotalPages of its response tells how many pages there are and exactly
+    the remaining pages are fetched in parallel, requests in flight are limited by the shared ScanHttpClient.
+    When the header is stripped (caching proxies, security plugins), pages are probed in windows of
+    args.threads pages until a page is empty or not 200.
+    """
+    MAX_PAGES = 1000 # Last page probed when the number of pages is not known
+
+    def __init__(self, args, http_client):
+        self.args = args
+        self.http_client = http_client
+
+    @staticmethod
+    def page_url(url, page: int, per_page: int = 100) -> str:
+        return f"{url}{'&' if '?' in url else '?'}per_page={per_page}&page={page}"
+
+    def fetch(self, url, per_page: int = 100, on_page=None, max_pages: int = None, known_page=None, keep_items: bool = True, **request_kwargs) -> tuple:
+        """
+        Fetch all pages of collection url.
+
+        Args:
+            url (str): Collection endpoint, e.g. <rest url>/wp/v2/media, may contain query parameters.
+            on_page (callable): Called with (page, items) for every page in page order, as soon as the page and all pages before it arrived.
+            max_pages (int): Last page fetched, MAX_PAGES by default.
+            known_page (callable): Called with page number, returns items of a page fetched before (resumed scan) or None to request it.
+            keep_items (bool): When False, items are only passed to on_page and an empty list is returned for a collection.
+            request_kwargs: Passed to ScanHttpClient.send_request.
+
+        Returns:
+            tuple: (response to the first page, items of all pages in page order), items are None when the first page is not a JSON list.
+        """
+        max_pages = max_pages or self.MAX_PAGES
+        first = self.http_client.send_request(self.page_url(url, 1, per_page), method="GET", **request_kwargs)
+        items = self._items(first)
+        if items is None:
+            return first, None
+        result = list(items) if keep_items else []
+        if on_page:
+            on_page(1, items)
+
+        def fetch_page(page):
+            items = known_page(page) if known_page else None
+            if items is not None:
+                return items
+            try:
+                return self._items(self.http_client.send_request(self.page_url(url, page, per_page), method="GET", **request_kwargs))
+            except requests.exceptions.RequestException:
+                return None
+
+        total_pages = self._total_pages(first)
+        with ContextThreadPoolExecutor(max_workers=self.args.threads) as executor:
+            if total_pages is not None:
+                pages = range(2, min(total_pages, max_pages) + 1)
+                for page, page_items in zip(pages, executor.map(fetch_page, pages)):
+                    if page_items:
+                        if keep_items:
+                            result.extend(page_items)
+                        if on_page:
+                            on_page(page, page_items)
+                return first, result
+
+            # Number of pages is not known, a page shorter than per_page is the last one
+            page, window = 2, max(1, self.args.threads)
+            last_items = items
+            while len(last_items) >= per_page and page <= max_pages:
+                pages = range(page, min(page + window, max_pages + 1))
+                for page, page_items in zip(pages, executor.map(fetch_page, pages)):
+                    last_items = page_items or []
+                    if not last_items:
+                        break
+                    if keep_items:
+                        result.extend(last_items)
+                    if on_page:
+                        on_page(page, last_items)
+                    if len(last_items) < per_page:
+                        break
+                page += 1
+        return first, result
+
+    @staticmethod
+    def _total_pages(response):
+        value = response.headers.get("X-WP-TotalPages", "").strip()
+        return int(value) if value.isdigit() else None
+
+    @staticmethod
+    def _items(response):
+        """Items of a page, None if response is not 200 with a JSON list"""
+        if response is None or response.status_code != 200:
+            return None
+        if response.content.startswith(b'\xef\xbb\xbf'): # BOM for UTF-8
+            response.encoding = 'utf-8-sig'
+        try:
+            data = response.json()
+        except ValueError: # json.JSONDecodeError
+            return None
+        return data if isinstance(data, list) else None
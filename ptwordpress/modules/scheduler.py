@@ -0,0 +1,204 @@
+"""Dependency-aware scheduler running independent tests concurrently."""
+
+import sys
+import threading
+import contextvars
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from ptlibs import ptprinthelper
+
+current_test = contextvars.ContextVar("current_test", default=None)
+_node_output = contextvars.ContextVar("node_output", default=None)
+
+
+class ScanAborted(Exception):
+    """Raised by a test to end the whole scan (e.g. banned by the server), TestScheduler.run() re-raises it in the main thread."""
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that runs every task in a copy of the submitting thread's context.
+
+    Tests spawn their own worker pools; copying the context keeps the test name
+    and the test's output buffer visible in those worker threads as well.
+    """
+    def submit(self, fn, /, *args, **kwargs):
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
+
+
+class TestNode:
+    def __init__(self, name, func, requires=(), provides=(), barrier=False, silent=False):
+        """
+        Args:
+            name (str): Test name (e.g. "DANGEROUS"), also used to tag requests of the test.
+            func (callable): Function running the test.
+            requires (iterable): Resources the test needs (e.g. "users", "posts", "plugins").
+                The test waits for every previously declared test providing one of them.
+            provides (iterable): Resources produced by the test.
+            barrier (bool): Wait for all previously declared tests.
+            silent (bool): Discard the test's output (internal helper nodes).
+        """
+        self.name = name
+        self.func = func
+        self.requires = set(requires)
+        self.provides = set(provides)
+        self.barrier = barrier
+        self.silent = silent
+        self.depends_on: set = set()
+        self.output = None
+        self.done = False
+
+
+class _NodeOutput:
+    """Output of one test, buffered until all tests declared before it were printed."""
+    def __init__(self, stream, silent=False):
+        self._stream = stream
+        self._chunks = []
+        self._transcript = [] # Whole output of the test, recorded in the scan journal
+        self._transcript_size = 0
+        self._live = False
+        self._silent = silent
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            if self._silent:
+                return len(text)
+            self._record(text)
+            if self._live:
+                self._stream.write(text)
+            else:
+                self._chunks.append(text)
+        return len(text)
+
+    def go_live(self):
+        """Print buffered output and pass further output straight to the stream."""
+        with self._lock:
+            if not self._silent:
+                self._stream.write(_collapse_progress_lines("".join(self._chunks)))
+                self._stream.flush()
+            self._chunks = []
+            self._live = True
+
+    def _record(self, text):
+        self._transcript.append(text)
+        self._transcript_size += len(text)
+        if self._transcript_size > 65536: # Do not keep thousands of progress lines of dictionary tests
+            self._transcript = [_collapse_progress_lines("".join(self._transcript))]
+            self._transcript_size = len(self._transcript[0])
+
+    @property
+    def text(self) -> str:
+        with self._lock:
+            return _collapse_progress_lines("".join(self._transcript))
+
+
+class _ContextStdout:
+    """sys.stdout replacement routing writes to the output buffer of the current test."""
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        output = _node_output.get()
+        if output is None:
+            return self._stream.write(text)
+        return output.write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _collapse_progress_lines(text: str) -> str:
+    """Drop progress lines (terminated by '\\r') that would have been overwritten on a terminal."""
+    return "\n".join(line.rsplit("\r", 1)[-1] for line in text.split("\n"))
+
+
+class TestScheduler:
+    def __init__(self, max_workers: int, json_output: bool = False, journal=None):
+        """
+        Args:
+            max_workers (int): Number of tests running at once.
+            json_output (bool): Do not print errors of failed tests.
+            journal (ScanJournal): Journal recording finished tests, tests finished in a resumed scan are not run again.
+        """
+        self.max_workers = max(1, max_workers)
+        self.json_output = json_output
+        self.journal = journal
+        self.nodes: list = []
+
+    def add(self, name, func, requires=(), provides=(), barrier=False, silent=False) -> TestNode:
+        """Declare a test. Dependencies resolve against tests declared before it."""
+        node = TestNode(name, func, requires=requires, provides=provides, barrier=barrier, silent=silent)
+        for previous in self.nodes:
+            if node.barrier or (node.requires & previous.provides):
+                node.depends_on.add(previous)
+        self.nodes.append(node)
+        return node
+
+    def run(self) -> None:
+        """
+        Run all declared tests, independent tests concurrently, printing output in declaration order.
+        A test raising ScanAborted stops scheduling, tests already running finish, output of all tests run
+        is printed and ScanAborted is raised here.
+        """
+        if not self.nodes:
+            return
+
+        real_stdout = sys.stdout
+        sys.stdout = _ContextStdout(real_stdout)
+        for node in self.nodes:
+            node.output = _NodeOutput(real_stdout, silent=node.silent)
+
+        next_to_print = 0
+        pending = list(self.nodes)
+        running = {}
+        aborted = None
+        try:
+            with ContextThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while pending or running:
+                    # Submit in declaration order every test whose dependencies are done
+                    for node in [n for n in pending if all(d.done for d in n.depends_on)]:
+                        pending.remove(node)
+                        running[executor.submit(self._run_node, node)] = node
+
+                    if next_to_print < len(self.nodes) and self.nodes[next_to_print] in running.values():
+                        self.nodes[next_to_print].output.go_live()
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        running.pop(future).done = True
+                        if aborted is None and isinstance(future.exception(), ScanAborted):
+                            aborted = future.exception()
+                            pending = []
+
+                    while next_to_print < len(self.nodes) and self.nodes[next_to_print].done:
+                        self.nodes[next_to_print].output.go_live()
+                        next_to_print += 1
+
+            for node in self.nodes[next_to_print:]: # Tests run before the scan was aborted
+                if node.done:
+                    node.output.go_live()
+        finally:
+            sys.stdout = real_stdout
+        if aborted is not None:
+            raise aborted
+
+    def _run_node(self, node: TestNode) -> None:
+        current_test.set(node.name)
+        _node_output.set(node.output)
+        if self.journal and self.journal.is_test_finished(node.name):
+            if not self.json_output:
+                sys.stdout.write(self.journal.get_test_output(node.name))
+            return
+        try:
+            node.func()
+            if self.journal:
+                self.journal.test_finished(node.name, node.output.text)
+        except ScanAborted:
+            raise
+        except Exception as e:
+            ptprinthelper.ptprint(f"Test {node.name} failed: {e}", "ERROR", condition=not self.json_output, indent=4)
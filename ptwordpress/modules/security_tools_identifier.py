@@ -1,13 +1,13 @@
 import requests
 from urllib.parse import urljoin
-from ptlibs.http.http_client import HttpClient
+from modules.http_client import ScanHttpClient
 from urllib.parse import urljoin
 
 class SecurityToolsIdentifier:
     def __init__(self, args, ptjsonlib):
         self.args = args
         self.ptjsonlib = ptjsonlib
-        self.http_client = HttpClient(self.args, self.ptjsonlib)
+        self.http_client = ScanHttpClient(self.args, self.ptjsonlib)
         self.plugins = {
 
             "Wordfence Security": {
@@ -99,6 +99,13 @@ class SecurityToolsIdentifier:
         }
 
 
+    def get_urls(self) -> list:
+        """URLs requested by detect_plugins"""
+        urls = [self.args.url]
+        for data in self.plugins.values():
+            urls += [urljoin(self.args.url, path) for path in data["paths"] + data["rest"]]
+        return urls
+
     def detect_plugins(self):
         found = {}
 
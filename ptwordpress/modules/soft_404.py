@@ -0,0 +1,193 @@
+"""Soft-404 calibration of dictionary probes, responses of the target to paths that do not exist."""
+
+import html
+import random
+import string
+import hashlib
+import urllib.parse
+
+from threading import Lock
+
+from modules.rate_control import is_throttling_response
+
+NOT_FOUND_STATUSES = (404, 410)
+
+
+def split_probe_url(url) -> tuple:
+    """Returns (directory URL, last path segment, its extension, "/" when the URL is a directory)"""
+    parsed = urllib.parse.urlsplit(url)
+    directory, _, segment = parsed.path.rpartition("/")
+    trailing = ""
+    if not segment and directory:
+        directory, _, segment = directory.rpartition("/")
+        trailing = "/"
+    extension = segment.rpartition(".")[2] if "." in segment else ""
+    return f"{parsed.scheme}://{parsed.netloc}{directory}/", segment, extension, trailing
+
+
+class NotFoundFingerprint:
+    """
+    Response of one directory to paths that do not exist, built from calibration responses to random names
+    of different lengths. Pages reflecting the requested name grow with it, the expected length of a response
+    is fitted on the name length, the name is removed from bodies and Location before they are compared.
+    """
+    LENGTH_TOLERANCE = 32     # Bytes a response may differ from the expected length
+    LENGTH_TOLERANCE_RATIO = 0.02
+
+    def __init__(self, samples: list):
+        """
+        Args:
+            samples (list): (name, response) of GET requests to random names, all with the same status code.
+        """
+        self.status = samples[0][1].status_code
+        locations = {self._normalize_location(response, name) for name, response in samples}
+        self.location = locations.pop() if len(locations) == 1 else None
+        hashes = {self._body_hash(response, name) for name, response in samples}
+        self.body_hash = hashes.pop() if len(hashes) == 1 else None
+        self.lengths = self._fit([(len(name), len(response.content or b"")) for name, response in samples])
+        content_lengths = [(len(name), response.headers.get("Content-Length")) for name, response in samples]
+        self.content_lengths = self._fit([(size, int(value)) for size, value in content_lengths]) if all(value and value.isdigit() for _, value in content_lengths) else None
+
+    @property
+    def needs_body(self) -> bool:
+        """True when a 200 response cannot be told from this fingerprint by its headers"""
+        return self.status == 200 and self.content_lengths is None
+
+    def matches(self, url, response, has_body: bool) -> bool | None:
+        """True if response to url looks like the response to a path that does not exist, None if its body is needed to tell"""
+        if response.status_code != self.status:
+            return False
+        name = split_probe_url(url)[1]
+        if self.location is not None and response.headers.get("Location"):
+            return self._normalize_location(response, name) == self.location
+        if has_body:
+            if self.body_hash is not None and self._body_hash(response, name) == self.body_hash:
+                return True
+            return self._length_matches(self.lengths, len(name), len(response.content or b""))
+        content_length = response.headers.get("Content-Length")
+        if self.content_lengths is not None and content_length and content_length.isdigit():
+            return self._length_matches(self.content_lengths, len(name), int(content_length))
+        return None if self.status == 200 else True # Only 200 is reported as discovered, other statuses need no certainty
+
+    @staticmethod
+    def _reflections(name) -> set:
+        return {name, urllib.parse.quote(name), html.escape(name)}
+
+    def _normalize_location(self, response, name) -> str:
+        location = response.headers.get("Location") or ""
+        for reflection in self._reflections(name):
+            location = location.replace(reflection, "{}")
+        return location
+
+    def _body_hash(self, response, name) -> str:
+        body = response.content or b""
+        for reflection in self._reflections(name):
+            body = body.replace(reflection.encode("utf-8"), b"")
+        return hashlib.sha1(body).hexdigest()
+
+    @staticmethod
+    def _fit(points) -> tuple:
+        """Least squares line of response length by name length, returns (intercept, slope, tolerance)"""
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        variance = sum((x - mean_x) ** 2 for x, _ in points)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / variance if variance else 0
+        intercept = mean_y - slope * mean_x
+        residual = max(abs(y - (intercept + slope * x)) for x, y in points)
+        return intercept, slope, residual
+
+    def _length_matches(self, model, name_length, length) -> bool:
+        intercept, slope, residual = model
+        expected = intercept + slope * name_length
+        return abs(length - expected) <= max(self.LENGTH_TOLERANCE, 2 * residual, expected * self.LENGTH_TOLERANCE_RATIO)
+
+
+class SoftNotFoundCalibration:
+    """
+    Fingerprints of responses to paths that do not exist, one per directory and extension.
+
+    A directory is calibrated when the first of its probes would be reported, so probes answered by 404 cost
+    nothing extra. It gets a GET of a random name with the extension of the probed path, when answered by 404
+    or 410 the probes are classified by status code as before. Otherwise (catch-all pages, redirects of unknown
+    paths to the homepage, ...) two more random names are requested and probes matching their fingerprint are
+    not reported. Where a HEAD response cannot be told from the fingerprint, later probes of the directory are
+    sent as GET.
+    """
+    NAME_LENGTHS = (8, 16, 24) # Random names of different lengths reveal how much of the name a page reflects
+    _FAILED = object()         # Calibration request failed or throttled, nothing is known about the directory
+
+    def __init__(self, http_client, enabled: bool = True, on_calibrated=None):
+        """
+        Args:
+            http_client (ScanHttpClient): Shared client the calibration requests are sent by.
+            enabled (bool): When False, probes are classified by status code only.
+            on_calibrated (callable): Called with (directory, extension, fingerprint) for directories answering paths that do not exist.
+        """
+        self.http_client = http_client
+        self.enabled = enabled
+        self.on_calibrated = on_calibrated
+        self._fingerprints = {}
+        self._locks = {}
+        self._lock = Lock()
+
+    def calibrate(self, url) -> NotFoundFingerprint | None:
+        """Calibrate directory of url unless already done, returns its fingerprint, None for plain 404 responses"""
+        if not self.enabled:
+            return None
+        directory, _, extension, trailing = split_probe_url(url)
+        key = (directory, extension, trailing)
+        if key in self._fingerprints:
+            return self._fingerprints[key]
+        with self._lock:
+            key_lock = self._locks.setdefault(key, Lock())
+        with key_lock: # Tests probing the same directory wait for one calibration
+            if key not in self._fingerprints:
+                fingerprint = self._calibrate(directory, extension, trailing)
+                if fingerprint is self._FAILED: # Calibrated again by the next probe of the directory
+                    return None
+                self._fingerprints[key] = fingerprint
+                if fingerprint is not None and self.on_calibrated:
+                    self.on_calibrated(directory, extension, fingerprint)
+        return self._fingerprints[key]
+
+    def get(self, url) -> NotFoundFingerprint | None:
+        """Fingerprint of the directory of url if it was calibrated"""
+        directory, _, extension, trailing = split_probe_url(url)
+        return self._fingerprints.get((directory, extension, trailing))
+
+    def probe_method(self, url, method: str) -> str:
+        """HEAD is replaced by GET in directories where a soft-404 can be told only by its body"""
+        fingerprint = self.get(url)
+        return "GET" if method.upper() == "HEAD" and fingerprint is not None and fingerprint.needs_body else method
+
+    def is_soft_404(self, url, response, method: str) -> bool:
+        """True if response to url matches the response of its directory to paths that do not exist"""
+        if not self.enabled or response.status_code in NOT_FOUND_STATUSES:
+            return False
+        fingerprint = self.calibrate(url)
+        if fingerprint is None:
+            return False
+        matches = fingerprint.matches(url, response, has_body=method.upper() != "HEAD")
+        if matches is None: # HEAD sent before the directory was calibrated
+            try:
+                matches = fingerprint.matches(url, self.http_client.send_request(url, method="GET", allow_redirects=False), has_body=True)
+            except Exception:
+                return False
+        return matches
+
+    def _calibrate(self, directory, extension, trailing):
+        samples = []
+        for length in self.NAME_LENGTHS:
+            name = "".join(random.choices(string.ascii_lowercase + string.digits, k=length)) + (f".{extension}" if extension else "")
+            try:
+                response = self.http_client.send_request(f"{directory}{name}{trailing}", method="GET", allow_redirects=False, memo=False, cache=False)
+            except Exception:
+                return self._FAILED
+            if response is None or is_throttling_response(response):
+                return self._FAILED
+            if response.status_code in NOT_FOUND_STATUSES and not samples:
+                return None
+            if samples and response.status_code != samples[0][1].status_code:
+                return None # Unstable responses, cannot be fingerprinted
+            samples.append((name, response))
+        return NotFoundFingerprint(samples)
@@ -3,23 +3,32 @@ import sys
 import io
 import os
 import re
+import time
+import urllib
 import requests
 import http.client
 import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from itertools import chain
+from concurrent.futures import as_completed
+import itertools
 from queue import Queue
 
 import ptlibs.tldparser as tldparser
 
 from ptlibs.ptprinthelper import ptprint
 from ptlibs import ptprinthelper
-from ptlibs.http.http_client import HttpClient
+from modules.http_client import ScanHttpClient
+from modules.scheduler import ContextThreadPoolExecutor, current_test
+from modules.journal import ScanJournal
+from modules.events import EventStream
+from modules.soft_404 import SoftNotFoundCalibration
+from modules.rest_paginator import RestPaginator
 
 from modules.file_writer import write_to_file
-from modules.helpers import print_api_is_not_available, load_wordlist_file, Helpers
+from modules.helpers import print_api_is_not_available, load_wordlist_file, user_names_by_id, Helpers
 
 class SourceDiscover:
+    PROBES_WINDOW = 4 # Candidates waiting or in flight per thread
+
     def __init__(self, base_url, args, ptjsonlib, head_method_allowed: bool, target_is_case_sensitive: bool):
         self.args = args
         self.BASE_URL = base_url
@@ -34,7 +43,11 @@ class SourceDiscover:
         self.full_domain = f"{self.scheme}://{self.domain}"
         self.target_is_case_sensitive = target_is_case_sensitive
         self.helpers = Helpers(args=self.args, ptjsonlib=self.ptjsonlib)
-        self.http_client = HttpClient(self.args, self.ptjsonlib)
+        self.http_client = ScanHttpClient(self.args, self.ptjsonlib)
+        self.events = EventStream()
+        self.journal = ScanJournal()
+        self.component_versions = {"plugin": {}, "theme": {}} # Versions read from readme.txt and style.css, passed to WPScan
+        self.soft_404 = SoftNotFoundCalibration(self.http_client, enabled=not getattr(args, "no_calibration", False), on_calibrated=self._print_calibration)
 
     def discover_xml_rpc(self):
         """Discover XML-RPC API"""
@@ -57,50 +70,76 @@ class SourceDiscover:
         """Test wp-trackback.php"""
         pass
 
-    def wordlist_discovery(self, wordlist=None, title="files", url_path=None, show_responses=False, search_in_response="", method=None):
+    VERSION_PROBE_BYTES = 8192 # Header of readme.txt and style.css with the version
+    VERSION_SOURCES = {
+        "plugin": ("readme.txt", r"^[ \t]*Stable tag:[ \t]*([\w.\-]+)"),
+        "theme":  ("style.css", r"^[ \t*]*Version:[ \t]*([\w.\-]+)"),
+    }
+
+    # Extensions tried for wordlist entries ending with "." (backups of the named file)
+    BACKUP_EXTENSIONS = ['sql', 'sql.gz', 'zip', 'rar', 'tar', 'tar.gz', 'tgz', '7z', 'arj']
+    CONFIG_EXTENSIONS = ['php_', 'php~', 'bak', 'old', 'zal', 'backup', 'bck', 'php.bak', 'php.old', 'php.zal', 'php.bck', 'php.backup']
+
+    def wordlist_discovery(self, wordlist=None, title="files", url_path=None, show_responses=False, search_in_response="", method=None, budget=None):
+        """
+        Probe every URL generated from wordlist, returns discovered URLs.
+
+        Candidates are generated from the wordlist file while probes run, at most PROBES_WINDOW per thread
+        are waiting or in flight, so memory does not grow with the size of the dictionary and first hits
+        are printed before the whole wordlist is read. Entries are probed in the order of the wordlist,
+        with budget ("requests", count) or ("seconds", seconds) probing stops when the budget is spent.
+        """
         ptprint(f"{title.capitalize()} discovery", "TITLE", condition=not self.args.json, newline_above=True, indent=0, colortext=True)
 
-        # Variable wordlist can be filename or list of files
-        if isinstance(wordlist, str):
-            wordlist_file = load_wordlist_file(f"{wordlist}.txt", args_wordlist=self.args.wordlist)
-            with open(wordlist_file, "r") as file:
-                lines = file.readlines()
+        wordlist_file = load_wordlist_file(f"{wordlist}.txt", args_wordlist=self.args.wordlist) if isinstance(wordlist, str) else None
+        if budget and wordlist == "plugins" and not self._has_active_installs(wordlist_file):
+            ptprinthelper.ptprint("Plugins dictionary has no active installs, budget is spent in its order, not on the most popular plugins (rebuild it by --get-plugins)",
+                                  "WARNING", condition=not self.args.json, indent=4)
+        url_paths = [url_path] if isinstance(url_path, str) else sorted(url_path) if url_path else [None]
+
+        # Probes sent before the resumed scan was interrupted are skipped, their results are printed again
+        journal_key = f"{current_test.get()}:{title}"
+        digest = self.journal.digest(self._describe_candidates(wordlist, wordlist_file, url_paths))
+        done, result = self.journal.get_probes(journal_key, digest)
+        for url in result:
+            if isinstance(url, str):
+                ptprinthelper.ptprint(f"[200] {url}", "VULN", condition=not self.args.json, end="\n", flush=True, indent=4, clear_to_eol=True)
+                self.events.emit("url", url=url, status=200, wordlist=wordlist if isinstance(wordlist, str) else None, title=title)
+
+        # Probes complete out of order, checkpoint is the number of leading candidates all probed
+        checkpoint = {"done": done, "recorded": done, "completed": set(), "found": {}}
+        rate = self.http_client.rate_control.for_url(self.BASE_URL)
+        def collect(index, found):
+            if not found and rate.blocked:
+                return # Probe not sent or throttled, the candidate is probed again by a resumed scan
+            if found:
+                result.append(found)
+                checkpoint["found"][index] = found
+            checkpoint["completed"].add(index)
+            while checkpoint["done"] in checkpoint["completed"]:
+                checkpoint["completed"].remove(checkpoint["done"])
+                checkpoint["done"] += 1
+            if self.journal.enabled and checkpoint["done"] - checkpoint["recorded"] >= self.journal.PROBES_CHECKPOINT:
+                record_checkpoint()
+
+        def record_checkpoint():
+            found = [checkpoint["found"].pop(index) for index in sorted(checkpoint["found"]) if index < checkpoint["done"]]
+            self.journal.probes_done(journal_key, digest, checkpoint["done"], found)
+            checkpoint["recorded"] = checkpoint["done"]
+
+        candidates = itertools.islice(enumerate(self._generate_candidate_urls(wordlist, wordlist_file, url_paths)), done, None)
+        stopped_at = []
+        if budget:
+            candidates = self._limit_candidates(candidates, budget, stopped_at)
+        candidates = itertools.takewhile(lambda candidate: not rate.blocked, candidates) # Banned, checked below
+        if self.args.async_engine:
+            self.check_urls_async(candidates, collect, wordlist, show_responses, search_in_response, method)
         else:
-            lines = wordlist
-
-        if not self.target_is_case_sensitive:
-            lines = sorted(set(word.lower() for word in lines))
-
-        if wordlist == "plugins":
-            lines = [f"/wp-content/plugins/{line}" for line in lines]
-
-        tested_files = (path.strip() for path in lines if not path.rstrip().endswith('.'))
-        tested_files2 = (path.strip() for path in lines if path.rstrip().endswith('.'))
-
-        # if backupfiles are searching, add variations od domain name (example. example_com. example-com.) to wordlist
-        if (wordlist == "backups"):
-            tested_files2 = chain(tested_files2, ["/" + self.domain2th + ".", "/" + self.domain2th + "_" + self.tld + ".", "/" + self.domain2th + "-" + self.tld + "."])
-
-        # add files with extensions to testing list for wordlist items endings with "."
-        combinations = (f"{tf}{ext}" for tf in tested_files2 for ext in ['sql', 'sql.gz', 'zip', 'rar', 'tar', 'tar.gz', 'tgz', '7z', 'arj'])
-        tested_files = chain(tested_files, combinations)
-
-        if (wordlist == "configs"):
-            combinations = ([f"{tf}{ext}" for tf in tested_files2 for ext in ['php_', 'php~', 'bak', 'old', 'zal', 'backup', 'bck', 'php.bak', 'php.old', 'php.zal', 'php.bck', 'php.backup']])
-            tested_files = chain(tested_files, combinations)
-
-        if (url_path):
-            # url_path can be one path or list of paths
-            if isinstance(url_path, str):
-                urls = [url_path + tested_file for tested_file in tested_files]
-            else:
-                tested_files_list = list(tested_files)
-                urls = ([f"{up}{tf}" for up in url_path for tf in tested_files_list])
-        else:
-            urls = [self.scheme + "://"+ self.domain + tested_file for tested_file in tested_files]
-
-        with ThreadPoolExecutor(max_workers=self.args.threads) as executor:
-            result = list(executor.map(self.check_url, urls, [wordlist] * len(urls), [show_responses] * len(urls), [search_in_response] * len(urls), [method] * len(urls)))
+            self._probe_candidates(candidates, collect, wordlist, show_responses, search_in_response, method)
+        if self.journal.enabled:
+            record_checkpoint()
+        if stopped_at:
+            ptprinthelper.ptprint(f"{title.capitalize()}: budget spent after {stopped_at[0]} candidates, the rest is skipped", "WARNING", condition=not self.args.json, indent=4, clear_to_eol=True)
 
         if wordlist == "dangerous":
             _res = self.discover_xml_rpc()
@@ -115,6 +154,99 @@ class SourceDiscover:
         self.helpers._check_if_blocked_by_server(self.BASE_URL)
         return [r for r in result if r]
 
+    @staticmethod
+    def _has_active_installs(wordlist_file) -> bool:
+        """True for plugins dictionary written by --get-plugins, slug and active installs on every line, most popular first"""
+        with open(wordlist_file, "r") as file:
+            return "\t" in file.readline()
+
+    @staticmethod
+    def _limit_candidates(candidates, budget, stopped_at):
+        """Yields candidates until budget is spent, index of the first candidate not probed is appended to stopped_at"""
+        kind, limit = budget
+        deadline = time.monotonic() + limit
+        for sent, (index, url) in enumerate(candidates):
+            if (sent >= limit) if kind == "requests" else (time.monotonic() >= deadline):
+                stopped_at.append(index)
+                return
+            yield index, url
+
+    def _describe_candidates(self, wordlist, wordlist_file, url_paths) -> list:
+        """Identifies candidates of wordlist_discovery for the journal without generating them"""
+        if wordlist_file:
+            stat = os.stat(wordlist_file)
+            source = [wordlist_file, str(stat.st_size), str(stat.st_mtime_ns)]
+        else:
+            source = list(wordlist)
+        return [self.BASE_URL, str(wordlist), str(self.target_is_case_sensitive), *source, *(str(path) for path in url_paths)]
+
+    def _read_wordlist(self, wordlist, wordlist_file):
+        """Yields entries of the wordlist, a wordlist file is read line by line, data after a tab (active installs of plugins) is dropped"""
+        if wordlist_file:
+            with open(wordlist_file, "r") as file:
+                for line in file:
+                    yield line.split("\t", 1)[0]
+        else:
+            yield from wordlist
+
+    def _generate_paths(self, wordlist, wordlist_file):
+        """Yields paths to probe, lowercased and without case duplicates on case insensitive targets"""
+        mixed_case = set()
+        if not self.target_is_case_sensitive:
+            # Only entries with upper case letters can collide after lowercasing, remember just those
+            mixed_case = {line.strip().lower() for line in self._read_wordlist(wordlist, wordlist_file) if line.strip() != line.strip().lower()}
+        seen = set()
+
+        for line in self._read_wordlist(wordlist, wordlist_file):
+            path = line.strip()
+            if not path:
+                continue
+            if not self.target_is_case_sensitive:
+                path = path.lower()
+                if path in mixed_case:
+                    if path in seen:
+                        continue
+                    seen.add(path)
+            if wordlist == "plugins":
+                path = f"/wp-content/plugins/{path}"
+
+            if not path.endswith("."):
+                yield path
+                continue
+            # Entries ending with "." are names of files tried with backup extensions
+            yield from (f"{path}{ext}" for ext in (self.CONFIG_EXTENSIONS if wordlist == "configs" else self.BACKUP_EXTENSIONS))
+
+        # Backups named by the domain (example. example_com. example-com.)
+        if wordlist == "backups":
+            for name in ["/" + self.domain2th + ".", "/" + self.domain2th + "_" + self.tld + ".", "/" + self.domain2th + "-" + self.tld + "."]:
+                yield from (f"{name}{ext}" for ext in self.BACKUP_EXTENSIONS)
+
+    def _generate_candidate_urls(self, wordlist, wordlist_file, url_paths):
+        """Yields URLs to probe, every path of the wordlist in every url_path (root of the target when None)"""
+        root = urllib.parse.urlparse(self.BASE_URL)
+        for url_path in url_paths:
+            prefix = url_path if url_path is not None else f"{root.scheme}://{root.netloc}" # netloc keeps non-default port
+            for path in self._generate_paths(wordlist, wordlist_file):
+                yield prefix + path
+
+    def _print_calibration(self, directory, extension, fingerprint):
+        ptprinthelper.ptprint(f"{directory}*{'.' + extension if extension else ''} answers [{fingerprint.status}] to paths that do not exist, matching responses are ignored",
+                              "ADDITIONS", condition=not self.args.json and self.args.verbose, colortext=True, indent=4, clear_to_eol=True)
+
+    def _probe_candidates(self, candidates, collect, wordlist=None, show_responses=False, search_in_response="", method=None):
+        """Probe (index, url) candidates by args.threads threads, collect(index, result) is called in this thread"""
+        window = max(1, self.args.threads) * self.PROBES_WINDOW
+        with ContextThreadPoolExecutor(max_workers=self.args.threads) as executor:
+            pending = {}
+            for index, url in candidates:
+                pending[executor.submit(self.check_url, url, wordlist, show_responses, search_in_response, method)] = index
+                if len(pending) >= window:
+                    finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        collect(pending.pop(future), future.result())
+            for future in concurrent.futures.as_completed(pending):
+                collect(pending[future], future.result())
+
     def check_url(self, url, wordlist=None, show_responses=False, search_in_response="", method=None):
         method = method or ("HEAD" if self.head_method_allowed else "GET")
         try:
@@ -124,80 +256,71 @@ class SourceDiscover:
                 return getattr(response, "_is_fpd_vuln", False)
 
             else:
-                ptprinthelper.ptprint(f"{url}", "ADDITIONS", condition=not self.args.json, end="\r", flush=True, colortext=True, indent=4, clear_to_eol=True)
+                method = self.soft_404.probe_method(url, method)
+                self._print_probe_progress(url)
                 response = self.http_client.send_request(url, method=method, allow_redirects=False)
-                if response.status_code == 200 and search_in_response in response.text.lower():
-                    if (wordlist == "dangerous") and \
-                    (("/wp-admin/maint/repair.php" in url) and ("define('WP_ALLOW_REPAIR', true);".lower() in response.text.lower())) or \
-                    (("/wp-admin/maint/wp-signup.php" in url) and ("Registration has been disabled".lower() in response.text.lower())):
-                        return
-
-                    ptprinthelper.ptprint(f"[{response.status_code}] {url}", "VULN", condition=not self.args.json, end="\n", flush=True, indent=4, clear_to_eol=True)
-                    return url
-                else:
-                    if show_responses:
-                        ptprinthelper.ptprint(f"[{response.status_code}] {url}", "OK", condition=not self.args.json, end="\n", flush=True, indent=4, clear_to_eol=True)
+                return self._evaluate_probe_response(url, response, wordlist, show_responses, search_in_response, method)
 
         except requests.exceptions.RequestException as e:
             return
 
+    def check_urls_async(self, candidates, collect, wordlist=None, show_responses=False, search_in_response="", method=None):
+        """Same as _probe_candidates, but probes are sent by the asyncio engine with args.async_engine requests in flight"""
+        from modules.async_prober import AsyncProber # Loads aiohttp
+        if wordlist == "fpd":
+            return AsyncProber(self.args, self.http_client).stream(candidates, "GET", lambda url, response, sent: getattr(response, "_is_fpd_vuln", False), collect, test_fpd=True)
+
+        method = (method or ("HEAD" if self.head_method_allowed else "GET")).upper()
+        return AsyncProber(self.args, self.http_client).stream(
+            candidates, lambda url: self.soft_404.probe_method(url, method),
+            lambda url, response, sent: self._evaluate_probe_response(url, response, wordlist, show_responses, search_in_response, sent),
+            collect, on_request=self._print_probe_progress
+        )
+
+    def _print_probe_progress(self, url):
+        ptprinthelper.ptprint(f"{url}", "ADDITIONS", condition=not self.args.json, end="\r", flush=True, colortext=True, indent=4, clear_to_eol=True)
+
+    def _evaluate_probe_response(self, url, response, wordlist=None, show_responses=False, search_in_response="", method="GET"):
+        """Print probe result, returns url if the probed file was discovered"""
+        # Responses searched for content are not classified by status, others are compared with responses to paths that do not exist
+        if not search_in_response and (response.status_code == 200 or show_responses) and self.soft_404.is_soft_404(url, response, method):
+            return
+
+        if response.status_code == 200 and search_in_response in response.text.lower():
+            if (wordlist == "dangerous") and \
+            (("/wp-admin/maint/repair.php" in url) and ("define('WP_ALLOW_REPAIR', true);".lower() in response.text.lower())) or \
+            (("/wp-admin/maint/wp-signup.php" in url) and ("Registration has been disabled".lower() in response.text.lower())):
+                return
+
+            ptprinthelper.ptprint(f"[{response.status_code}] {url}", "VULN", condition=not self.args.json, end="\n", flush=True, indent=4, clear_to_eol=True)
+            self.events.emit("url", url=url, status=response.status_code, wordlist=wordlist if isinstance(wordlist, str) else None)
+            return url
+        else:
+            if show_responses:
+                ptprinthelper.ptprint(f"[{response.status_code}] {url}", "OK", condition=not self.args.json, end="\n", flush=True, indent=4, clear_to_eol=True)
+
 
     def print_media(self, enumerated_users):
         """Print all media discovered via API"""
+        authors = user_names_by_id(enumerated_users)
         def get_user_slug_or_name(user_id):
-            for user in enumerated_users:
-                if user["id"] == str(user_id):
-                    return user.get("slug") or user.get("name") or user_id
-            return str(user_id)
-
-        def fetch_page(page):
-            try:
-                scrapped_media = []
-                url = f"{self.BASE_URL}/wp-json/wp/v2/media?page={page}&per_page=100"
-                ptprinthelper.ptprint(f"{url}", "ADDITIONS", condition=not self.args.json, end="\r", flush=True, colortext=True, indent=4, clear_to_eol=True)
-                response = self.http_client.send_request(url, method="GET")
-                if response.status_code == 200 and response.json():
-                    for m in response.json():
-                        scrapped_media.append({"source_url": m.get("source_url"), "author_id": m.get("author"), "uploaded": m.get("date_gmt"), "modified": m.get("modified_gmt"), "title": m["title"].get("rendered")})
-                    return scrapped_media
-            except Exception as e:
-                return
+            return authors.get(str(user_id), str(user_id))
 
-        result = []
-        source_urls = set()
-
-        # Try get & parse Page 1
+        # Get all pages, number of pages is given by the first one
         ptprinthelper.ptprint(f"Discovered media {'(link, title, author, uploaded, modified)' if self.args.verbose else ('links')}", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
         try:
-            response = self.http_client.send_request(f"{self.BASE_URL}/wp-json/wp/v2/media?page=1&per_page=100", method="GET", allow_redirects=False)
-            for m in response.json():
-                result.append({"source_url": m.get("source_url"), "author_id": m.get("author"), "uploaded": m.get("date_gmt"), "modified": m.get("modified_gmt"), "title": m.get("title").get("rendered")})
-            if response.status_code != 200:
-                raise ValueError
-
-        except Exception as e:
-            print_api_is_not_available(status_code=getattr(response, "status_code", None))
+            response, items = RestPaginator(self.args, self.http_client).fetch(f"{self.BASE_URL}/wp-json/wp/v2/media", allow_redirects=False)
+        except requests.exceptions.RequestException:
+            response, items = None, None
+        if items is None:
+            print_api_is_not_available(status_code=getattr(response, "status_code", None), json_output=self.args.json)
             return set()
-
-        # Try get a parse Page 2-99
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.args.threads) as executor:
-            page_range = range(2, 100)  # Pages from 2 to 99
-            for i in range(0, len(page_range), 10):  # Send 10 requests to pages together
-                futures = {executor.submit(fetch_page, page_range[j]): page_range[j] for j in range(i, min(i + 10, len(page_range)))}
-                stop_processing = False
-                for future in concurrent.futures.as_completed(futures):
-                    data = future.result()
-                    if data is None:
-                        stop_processing = True
-                        break
-                    else:
-                        result.extend(data)
-                if stop_processing:
-                    break
+        result = [{"source_url": m.get("source_url"), "author_id": m.get("author"), "uploaded": m.get("date_gmt"), "modified": m.get("modified_gmt"), "title": (m.get("title") or {}).get("rendered")} for m in items]
 
         source_urls = set()
         for media in result:
             source_urls.add(media.get("source_url"))
+            self.events.emit("media", url=media.get("source_url"), title=media.get("title"), author=get_user_slug_or_name(media.get("author_id")), uploaded=media.get("uploaded"), modified=media.get("modified"))
 
             ptprinthelper.ptprint(media.get("source_url"), "TEXT", colortext=False, condition=not self.args.json, indent=4, clear_to_eol=True)
             if self.args.verbose:
@@ -217,13 +340,11 @@ class SourceDiscover:
         with open(csv_filename, "w", newline="", encoding="utf-8") as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(["TITLE", "AUTHOR", "UPLOADED", "MODIFIED", "URL"])
+            authors = user_names_by_id(enumerated_users)
 
             for media in result:
                 # Extract fields
-                author = media.get("author_id")
-                for user in enumerated_users:
-                    if user["id"] == author:
-                        author = user.get("slug") or user.get("name") or author
+                author = authors.get(str(media.get("author_id")), media.get("author_id"))
                 title = media.get("title")
                 uploaded = media.get("uploaded")
                 modified = media.get("modified")
@@ -232,23 +353,20 @@ class SourceDiscover:
                 # Write CSV row
                 writer.writerow([title, author, uploaded, modified, url])
 
-    def plugin_themes_discovery(self, response, content_type) -> list:
+    def plugin_themes_discovery(self, homepage, content_type) -> list:
         """General discovery for theme or plugin."""
         if content_type == "theme":
             ptprinthelper.ptprint("Theme discovery", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
-            pattern = r"([^\"'()]*wp-content\/themes\/)(.*?)(?=[\"')])"
         elif content_type == "plugin":
             ptprinthelper.ptprint("Plugin discovery", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
-            pattern = r"([^\"'()]*wp-content\/plugins\/)(.*?)(?=[\"')])"
 
-        paths = re.findall(pattern, response.text, re.IGNORECASE)
-        paths = sorted(paths, key=lambda x: x[0]) if paths else paths
         names = set()
         paths_to_resources = set()
         resources = {}
+        resource_paths = {}
 
-        for full_url, relative_path in paths:
-            path_to_resource = full_url.split("/" + relative_path.split("/")[0])[0] + relative_path.split("/")[0]
+        for full_url, relative_path, resource_name, version in homepage.assets[content_type]:
+            path_to_resource = full_url.split("/" + resource_name)[0] + resource_name
 
             if not path_to_resource.startswith("http"):
                 if not path_to_resource.startswith("/"):
@@ -256,12 +374,12 @@ class SourceDiscover:
                 path_to_resource = self.BASE_URL + path_to_resource
 
             paths_to_resources.add(path_to_resource)
-            resource_name = relative_path.split("/")[0]
             names.add(resource_name)
+            resource_paths.setdefault(resource_name, path_to_resource)
 
             # Handle plugin versions (for plugins only)
             if content_type == "plugin":
-                version = relative_path.split('?ver')[-1].split("=")[-1] if "?ver" in relative_path else "unknown-version"
+                version = version or "unknown-version"
                 if resource_name not in resources:
                     resources[resource_name] = {}
                 if version not in resources[resource_name]:
@@ -273,11 +391,18 @@ class SourceDiscover:
             ptprint(f"No {content_type} discovered", "OK", condition=not self.args.json, indent=4)
             return []
 
+        versions = self.probe_versions(content_type, resource_paths)
+        self.component_versions[content_type].update(versions)
+
         if content_type == "plugin":
+            for name, version in versions.items():
+                resources[name].setdefault(version, []).append(f"{resource_paths[name]}/readme.txt")
             self.print_plugin_versions(resources)
 
         if content_type == "theme":
-            ptprint('\n    '.join(names), "TEXT", condition=not self.args.json, indent=4)
+            ptprint('\n    '.join(f"{name} ({versions[name]})" if name in versions else name for name in names), "TEXT", condition=not self.args.json, indent=4)
+            for name in sorted(names):
+                self.events.emit("theme", name=name, version=versions.get(name))
 
 
         ## Extend found directories to test for directory listing
@@ -292,6 +417,37 @@ class SourceDiscover:
         return list(names)
 
 
+    def probe_versions(self, content_type, resource_paths: dict) -> dict:
+        """Versions of plugins (Stable tag of readme.txt) or themes (Version of style.css) by name, probed concurrently"""
+        filename, pattern = self.VERSION_SOURCES[content_type]
+        def probe(name):
+            head = self._read_head(f"{resource_paths[name]}/{filename}", self.VERSION_PROBE_BYTES)
+            match = re.search(pattern, head, re.IGNORECASE | re.MULTILINE) if head else None
+            return name, match.group(1) if match and match.group(1).lower() != "trunk" else None
+
+        with ContextThreadPoolExecutor(max_workers=self.args.threads) as executor:
+            return {name: version for name, version in executor.map(probe, sorted(resource_paths)) if version}
+
+    def _read_head(self, url, size) -> str:
+        """First size bytes of url requested by Range, download from servers ignoring Range is cut off after size bytes"""
+        try:
+            response = self.http_client.send_request(url, method="GET", headers={"Range": f"bytes=0-{size - 1}", "Accept-Encoding": "identity"}, allow_redirects=False, stream=True)
+        except requests.exceptions.RequestException:
+            return None
+        try:
+            if response.status_code not in (200, 206):
+                return None
+            head = b""
+            for chunk in response.iter_content(chunk_size=size): # Body may be already read by the FPD test
+                head += chunk
+                if len(head) >= size:
+                    break
+            return head[:size].decode(response.encoding or "utf-8", errors="replace")
+        except Exception:
+            return None
+        finally:
+            response.close()
+
     def print_plugin_versions(self, resources):
         """Helper function to print the plugin versions."""
         for plugin_name, versions in resources.items():
@@ -315,6 +471,7 @@ class SourceDiscover:
             all_urls = []
             for version_urls in versions.values():
                 all_urls.extend(version_urls)  # Collect all URLs from different versions
+            self.events.emit("plugin", name=plugin_name, versions=sorted_version_list, urls=sorted(set(all_urls)))
 
             if self.args.verbose:
                 for url in sorted(set(all_urls)):  # Remove duplicates and sort URLs
@@ -3,26 +3,33 @@ import os
 import json
 import urllib
 
-from queue import Queue
 from threading import Lock
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 
 
 import requests
 import ptlibs.tldparser as tldparser
-import defusedxml.ElementTree as ET
 
 from ptlibs import ptprinthelper
-from ptlibs.http.http_client import HttpClient
+from modules.http_client import ScanHttpClient
+from modules.scheduler import ContextThreadPoolExecutor
+from modules.journal import ScanJournal
+from modules.rest_paginator import RestPaginator
+from modules.events import EventStream
 
 from modules.file_writer import write_to_file
 from modules.plugins.yoast import YoastScraper
 from modules.plugins.emails import Emails, get_emails_instance
 from modules.helpers import print_api_is_not_available, load_wordlist_file
 
+# Fields of crawled posts kept in memory and in the scan journal
+POST_RECORD_FIELDS = ["id", "author", "date", "modified", "slug", "status", "type", "link", "title"]
 
 
 class UserDiscover:
+    TITLE_PROBE_BYTES = 65536 # Author archive is read at most this far when looking for its <title>
+    MAX_AUTHOR_ID = 99999     # Author IDs are not probed past this, same as the limit of --author-range
+
     def __init__(self, base_url, args, ptjsonlib, head_method_allowed):
         self.ptjsonlib = ptjsonlib
         self.args = args
@@ -35,13 +42,18 @@ class UserDiscover:
 
         self.all_posts = []
         self.was_crawled_posts = False
-        self.external_links = []
+        self.posts_status_code = None
+        self.posts_lock = Lock()
+        self.external_links: set = set()
         self.yoast_scraper = YoastScraper(args=self.args)
         self.email_scraper = get_emails_instance(args=self.args)
-        self.http_client = HttpClient(self.args, self.ptjsonlib)
+        self.http_client = ScanHttpClient(self.args, self.ptjsonlib)
+        self.journal = ScanJournal()
+        self.journal.track("users", self.USERS_TABLE.get_users, restore=lambda users: [self.USERS_TABLE.update_queue(user) for user in users])
 
-    def run(self):
-        test_to_method: dict = {
+    def get_tests(self) -> dict:
+        """Returns user enumeration methods by test name"""
+        return {
             "UESRRSS": self._enumerate_users_by_rss_feed,
             "USERDICT": self._enumerate_users_by_author_name,     # /author/<username>
             "USERPARAM": self._enumerate_users_by_author_id,      # /?author=<id>
@@ -50,24 +62,20 @@ class UserDiscover:
             "YOAST": self.yoast_scraper.print_result,
         }
 
-        user_tests_ran = False  # track if any user-related test ran
-
-        # Run methods for selected tests
-        for test_name, func in test_to_method.items():
-            if test_name in set(self.args.tests): # Check if test specified
-                try:
-                    func()
-                    user_tests_ran = True
-                except Exception:
-                    continue
-
-        # Run the print/output functions only if at least one user test ran
-        if user_tests_ran:
-            for func in [self.print_unique_logins, self.print_enumerated_users_table]:
-                try:
-                    func()
-                except Exception:
-                    continue
+    def print_summary(self):
+        """Print discovered logins and users, call after all user enumeration tests finished"""
+        for func in [self.print_unique_logins, self.print_enumerated_users_table]:
+            try:
+                func()
+            except Exception:
+                continue
+
+    def crawl_posts(self) -> list:
+        """Crawls posts once, subsequent calls return the already crawled posts"""
+        with self.posts_lock:
+            if not self.was_crawled_posts:
+                self.all_posts = self._scrape_posts() or []
+        return self.all_posts
 
     def print_unique_logins(self):
         users = self.USERS_TABLE.get_users()
@@ -115,15 +123,8 @@ class UserDiscover:
     def enumerate_by_users_endpoint(self) -> list:
         """Enumerate users via /wp/v2/users/?per_page=100&page=<number> endpoint"""
         ptprinthelper.ptprint(f"User enumeration via API users ({self.BASE_URL}/wp-json/wp/v2/users)", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
-        for i in range(1, 100):
-            response = self.http_client.send_request(f"{self.REST_URL}/wp/v2/users/?per_page=100&page={i}", method="GET")
-            response_data = self.load_prepare_response_json(response)
-
-            if response.status_code != 200:
-                print_api_is_not_available(status_code=getattr(response, "status_code", None))
-                return
-
-            for user_dict in response_data:
+        def print_users(page, users):
+            for user_dict in users:
                 result = {"id": str(user_dict.get("id", "")), "slug": user_dict.get("slug", ""), "name": user_dict.get("name", "")}
                 ptprinthelper.ptprint(f"{result['id']}{' '*(8-len(result['id']))}{result['slug']}{' '*(40-len(result['slug']))}{result['name']}", "VULN", condition=not self.args.json, flush=True, indent=4, clear_to_eol=True)
 
@@ -131,10 +132,14 @@ class UserDiscover:
                 if user_dict.get("id"):
                     self.vulnerable_endpoints.add(f"{self.REST_URL}/wp/v2/users/")
 
-    def scrape_external_links(self, response):
-
-        text = str(self.load_prepare_response_json(response))
+        try:
+            response, users = RestPaginator(self.args, self.http_client).fetch(f"{self.REST_URL}/wp/v2/users/", on_page=print_users)
+        except requests.exceptions.RequestException:
+            response, users = None, None
+        if users is None:
+            print_api_is_not_available(status_code=getattr(response, "status_code", None), json_output=self.args.json)
 
+    def scrape_external_links(self, text) -> set:
         # find all HTTP/HTTPS URLs
         urls = re.findall(r'https?://[^\s"\'<>]+', text)
 
@@ -142,68 +147,71 @@ class UserDiscover:
         base_domain = urllib.parse.urlparse(self.BASE_URL).netloc
 
         # filter out only external links
-        external_links = list(set([url for url in urls if urllib.parse.urlparse(url).netloc != base_domain]))
-        self.external_links.extend(external_links)
+        external_links = set([url for url in urls if urllib.parse.urlparse(url).netloc != base_domain])
+        self.external_links.update(external_links)
         return external_links
 
+    def _posts_fields(self) -> list:
+        """Fields of posts requested via _fields=, only those needed by the selected tests"""
+        tests = set(self.args.tests)
+        fields = ["id", "author"]
+        if "POSTS" in tests:
+            fields += ["date", "modified", "slug", "status", "type", "link", "title"]
+        if tests & {"EMAILS", "EXTURLS"}:
+            fields += ["title", "excerpt", "content"]
+        if "YOAST" in tests:
+            fields += ["yoast_head", "yoast_head_json"]
+        return list(dict.fromkeys(fields))
+
+    @staticmethod
+    def _compact_post(post) -> dict:
+        """Fields of post kept after its page was parsed, title is the rendered title"""
+        record = {key: post[key] for key in POST_RECORD_FIELDS if key in post}
+        if isinstance(record.get("title"), dict):
+            record["title"] = record["title"].get("rendered", "")
+        return record
+
     def _scrape_posts(self) -> list:
-        """Scrapes and returns all site posts"""
+        """Scrapes and returns all site posts as compact records (POST_RECORD_FIELDS)"""
         posts: list = []
         self.was_crawled_posts = True
-        # Get first page of posts
-        response = self.http_client.send_request(url=f"{self.REST_URL}/wp/v2/posts/?per_page=100&page=1", method="GET")
+        tests = set(self.args.tests)
+        url = f"{self.REST_URL}/wp/v2/posts/?_fields={','.join(self._posts_fields())}"
+
+        def parse_page(page, items):
+            # Pages crawled before the resumed scan was interrupted are not requested again
+            crawled = self.journal.get_page(page) if page > 1 else None
+            if crawled:
+                self.email_scraper.emails.update(crawled["emails"])
+                self.external_links.update(crawled["links"])
+                posts.extend(self._compact_post(post) for post in crawled["posts"])
+                return
+
+            ptprinthelper.ptprint(RestPaginator.page_url(url, page), "ADDITIONS", condition=not self.args.json, end="\r", flush=True, colortext=True, indent=4, clear_to_eol=True)
+            emails, links = set(), set()
+            if tests & {"EMAILS", "EXTURLS"}:
+                text = " ".join(post[key].get("rendered", "") for post in items for key in ["title", "excerpt", "content"] if isinstance(post.get(key), dict))
+                emails = self.email_scraper.parse_emails_from_text(text)
+                links = self.scrape_external_links(text)
+            if "YOAST" in tests:
+                self.yoast_scraper.parse_posts(data=items)
+            records = [self._compact_post(post) for post in items]
+            posts.extend(records)
+            if not self.journal.get_page(page):
+                self.journal.page_crawled(page, records, emails, links)
+
+        known_page = lambda page: (self.journal.get_page(page) or {}).get("posts")
+        try:
+            response, items = RestPaginator(self.args, self.http_client).fetch(url, on_page=parse_page, known_page=known_page, keep_items=False)
+        except requests.exceptions.RequestException:
+            response, items = None, None
 
         # Check stability
-        if response.status_code != 200:
-            print_api_is_not_available(status_code=getattr(response, "status_code", None))
+        if items is None:
+            self.posts_status_code = getattr(response, "status_code", None)
+            print_api_is_not_available(status_code=self.posts_status_code, json_output=self.args.json)
             return
 
-        # Scrape mails
-        self.email_scraper.parse_emails_from_response(response=response)
-
-        # scrape links
-        self.scrape_external_links(response=response)
-
-        # Add to posts
-        posts.extend(self.load_prepare_response_json(response))
-
-        def fetch_page(page):
-            url = f"{self.REST_URL}/wp/v2/posts/?per_page=100&page={page}"
-            try:
-                response = self.http_client.send_request(url, method="GET")
-                ptprinthelper.ptprint(url, "ADDITIONS", condition=not self.args.json, end="\r", flush=True, colortext=True, indent=4, clear_to_eol=True)
-                with self.thread_lock:
-                    self.email_scraper.parse_emails_from_response(response=response)
-                    self.scrape_external_links(response=response)
-
-
-                posts: list = self.load_prepare_response_json(response) #response.json() # List
-                return posts if response.status_code == 200 else []
-            except Exception as e:
-                return []
-
-        # Scrape rest of posts in paralell
-        with ThreadPoolExecutor(max_workers=self.args.threads) as executor:
-            for start_page in range(2, 999, 5):
-                # Define the current batch of pages
-                batch_pages = range(start_page, start_page + 8)
-
-                # Fetch all pages in this batch in parallel
-                batch_results = list(executor.map(fetch_page, batch_pages))
-
-                # Flatten results and add to posts
-                for page_posts in batch_results:
-                    if page_posts:
-                        posts.extend(page_posts)
-
-                 # Stop if any page returned no posts
-                if any(len(page_posts) == 0 for page_posts in batch_results):
-                    break
-
-        # Run Yoast Scanner againsts all posts.
-        if "YOAST" in self.args.tests:
-            self.yoast_scraper.parse_posts(data=posts)
-
         return posts
 
 
@@ -211,7 +219,10 @@ class UserDiscover:
         """Retrieve users via /wp-json/wp/v2/posts/?per_page=100&page=<number> endpoint"""
         ptprinthelper.ptprint(f"User enumeration via API posts ({self.BASE_URL}/wp-json/wp/v2/posts)", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
 
-        self.all_posts = self._scrape_posts() if not self.was_crawled_posts else self.all_posts
+        self.crawl_posts()
+        if self.posts_status_code:
+            print_api_is_not_available(status_code=self.posts_status_code, json_output=self.args.json)
+            return
 
         # Collect all new user IDs
         ids_to_enumerate = set()
@@ -225,7 +236,7 @@ class UserDiscover:
         space = max(1, len(str(max(ids_to_enumerate, default=1))))
         for uid in ids_to_enumerate:
             #user = self.enumerate_via_author_id_endpoint(uid, space=space)
-            user = self.check_author_id(uid)
+            user = self.check_author_id(uid) or {"id": uid, "slug": "", "name": ""}
 
             if not user["slug"] and not user["name"]:
                 user = self.enumerate_via_users_id_endpoint(user_id=uid)
@@ -242,7 +253,7 @@ class UserDiscover:
         else:
             ptprinthelper.ptprint(f"No users discovered", "OK", condition=not self.args.json, indent=4, clear_to_eol=True)
 
-    def enumerate_via_users_id_endpoint(self, user_id, max_length):
+    def enumerate_via_users_id_endpoint(self, user_id, max_length=0):
         """Retrieve user information by users/<id> endpoint"""
         url = f"{self.REST_URL}/wp/v2/users/{user_id}"
         response = self.http_client.send_request(url, method="GET", allow_redirects=True)
@@ -253,63 +264,99 @@ class UserDiscover:
             result = {"id": user_id, "slug": data.get("slug"), "name": data.get("name", "")}
             if data.get("slug") or data.get("name"):
                 #ptprinthelper.ptprint(f"ID: {user_id}{' '*max_length}   → {' '*max_length} →   {data.get("slug")}", "VULN", condition=not self.args.json, indent=4, clear_to_eol=True)
-                ptprinthelper.ptprint(f"ID: {author_id}{' '*max_length}   → {url}{' '*max_length} →   {data.get('name', '')} {' '*nickname_max_length}{data.get('slug', '')}", "VULN", condition=not self.args.json, indent=4, clear_to_eol=True)
+                ptprinthelper.ptprint(f"ID: {user_id}{' '*max_length}   → {url}{' '*max_length} →   {data.get('name', '')} {' '*max(1, 20 - len(data.get('name', '')))}{data.get('slug', '')}", "VULN", condition=not self.args.json, indent=4, clear_to_eol=True)
             return result
         else:
             result = {"id": user_id, "slug": "", "name": ""}
             return result
 
     def check_author_id(self, author_id: int):
+        """
+        Check /?author=<id>, returns user or None. Sent as HEAD, the slug is taken from Location of the redirect
+        to the author archive. The archive is read only up to its <title> and only when the name is not known yet,
+        a GET of /?author=<id> is sent only when it answers 200 (archive without redirect).
+        """
         url = f"{self.BASE_URL}/?author={author_id}"
         ptprinthelper.ptprint(f"{url}", "ADDITIONS", condition=not self.args.json, end="\r", flush=True, colortext=True, indent=4, clear_to_eol=True)
-        response = self.http_client.send_request(url, method="GET", allow_redirects=False)
+        method = "HEAD" if self.head_method_allowed else "GET"
+        response = self.http_client.send_request(url, method=method, allow_redirects=False)
+        if method == "HEAD" and response.status_code in (200, 405, 501): # Archive without redirect or HEAD refused, body is needed
+            response = self.http_client.send_request(url, method="GET", allow_redirects=False)
 
-        username_from_response = self._find_author_username(response)
         max_length = len(str(self.args.author_range[-1])) - len(str(author_id))
-        user_id = response.url.split("=")[-1]
+        user_id = str(author_id)
         if response.status_code == 200:
+            username_from_response = self._find_author_username(response)
             name_from_title = self._extract_name_from_title(response) # Extracts name from title
             if name_from_title:
                 nickname_max_length =  (20 - len(str(name_from_title)))
                 ptprinthelper.ptprint(f"[{response.status_code}] {url}{' '*max_length} →   {name_from_title} {' '*nickname_max_length}{username_from_response}", "VULN", condition=not self.args.json, indent=4)
-                return {"id": str(user_id) if user_id.isdigit() else "", "name": name_from_title, "slug": username_from_response}
+                return {"id": user_id if user_id.isdigit() else "", "name": name_from_title, "slug": username_from_response}
 
         elif response.is_redirect:
-            location = response.headers.get("Location")
-            location = (self.BASE_URL + location) if location and location.startswith("/") else location
-
-            # Extracts username from Location header if possible.
-            new_response = self.http_client.send_request(location, method="GET", allow_redirects=False) # For title extraction
+            location = response.headers.get("Location", "")
+            location = (self.BASE_URL + location) if location.startswith("/") else location
 
-            name_from_title = self._extract_name_from_title(new_response)
-            if not name_from_title:
-                name_from_title = ""
-
-            re_pattern = r"/author/(.*)/$" # Check if author in redirect
-            match = re.search(re_pattern, response.headers.get("location", ""))
+            match = re.search(r"/author/([^/]+)/?$", urllib.parse.urlparse(location).path) # Check if author in redirect
             if match:
                 slug = match.group(1)
+                known = self.USERS_TABLE.find(slug=slug) or self.USERS_TABLE.find(user_id=user_id) or {}
+                name_from_title = known.get("name") or self._read_author_name(location) or ""
                 nickname_max_length =  (20 - len(str(name_from_title)))
-                ptprinthelper.ptprint(f"[{response.status_code}] {response.url}{' '*max_length} →   {name_from_title} {' '*nickname_max_length}{slug}", "VULN", condition=not self.args.json, indent=4)
-                return {"id": str(user_id) if user_id.isdigit() else "", "name": name_from_title, "slug": slug}
+                ptprinthelper.ptprint(f"[{response.status_code}] {url}{' '*max_length} →   {name_from_title} {' '*nickname_max_length}{slug}", "VULN", condition=not self.args.json, indent=4)
+                return {"id": user_id if user_id.isdigit() else "", "name": name_from_title, "slug": slug}
+
+    def _read_author_name(self, url) -> str:
+        """Name from <title> of author archive, the page is read only up to its </title>"""
+        try:
+            response = self.http_client.send_request(url, method="GET", allow_redirects=False, stream=True)
+        except requests.exceptions.RequestException:
+            return None
+        try:
+            if response.status_code != 200:
+                return None
+            head = b""
+            for chunk in response.iter_content(chunk_size=4096):
+                head += chunk
+                if b"</title>" in head.lower() or len(head) >= self.TITLE_PROBE_BYTES:
+                    break
+            return self._extract_name_from_html(head.decode(response.encoding or "utf-8", errors="replace"))
+        except Exception:
+            return None
+        finally:
+            response.close()
 
     def _enumerate_users_by_author_id(self) -> list:
-        """Enumerate users via /?author=<id> query."""
+        """
+        Enumerate users via /?author=<id> query. IDs of --author-range are checked first, then the range is
+        extended until --author-misses consecutive IDs without user (0 keeps the fixed range).
+        """
         results: list = []
-        ptprinthelper.ptprint(f"User enumeration via author parameter ({self.BASE_URL}/?author=<{self.args.author_range[0]}-{self.args.author_range[1]}>)", "TITLE", condition=not self.args.json, colortext=True, newline_above=False)
-        with ThreadPoolExecutor(max_workers=self.args.threads) as executor:
-            futures = [executor.submit(self.check_author_id, i) for i in range(self.args.author_range[0], self.args.author_range[1])]
-            for future in as_completed(futures):
-                result = future.result()
-                if result is not None:
-                    results.append(result)
+        first, last = self.args.author_range
+        misses = max(0, getattr(self.args, "author_misses", 0) or 0)
+        ptprinthelper.ptprint(f"User enumeration via author parameter ({self.BASE_URL}/?author=<{first}-{last}{'+' if misses else ''}>)", "TITLE", condition=not self.args.json, colortext=True, newline_above=False)
+        last_hit, slugs = first - 1, set()
+        ids = range(first, last + 1)
+        with ContextThreadPoolExecutor(max_workers=self.args.threads) as executor:
+            while ids:
+                for author_id, result in zip(ids, executor.map(self.check_author_id, ids)):
+                    if result is not None:
+                        results.append(result)
+                        # Only a new slug extends the range, pages answering every ID (same author, homepage) do not
+                        if result.get("slug") and result["slug"] not in slugs:
+                            slugs.add(result["slug"])
+                            last_hit = max(last_hit, author_id)
+                # Extend the range by one window of IDs while the last hit is closer than misses
+                start = ids[-1] + 1
+                remaining = min(misses - (start - 1 - last_hit), self.MAX_AUTHOR_ID + 1 - start)
+                ids = range(start, start + min(max(1, self.args.threads), remaining)) if remaining > 0 else range(0)
 
-            if results:
-                self.vulnerable_endpoints.add(f"{self.BASE_URL}/?author=<id>")
-                for result in results:
-                    self.USERS_TABLE.update_queue(result)
-            else:
-                ptprinthelper.ptprint(f"No users discovered", "OK", condition=not self.args.json, indent=4, clear_to_eol=True)
+        if results:
+            self.vulnerable_endpoints.add(f"{self.BASE_URL}/?author=<id>")
+            for result in results:
+                self.USERS_TABLE.update_queue(result)
+        else:
+            ptprinthelper.ptprint(f"No users discovered", "OK", condition=not self.args.json, indent=4, clear_to_eol=True)
 
     def _find_author_username(self, response) -> str:
         """Find author in response.text"""
@@ -351,7 +398,7 @@ class UserDiscover:
 
         results = []
         ptprinthelper.ptprint(f"User enumeration via dictionary ({self.BASE_URL}/author/<name>/)", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
-        with ThreadPoolExecutor(max_workers=self.args.threads) as executor:
+        with ContextThreadPoolExecutor(max_workers=self.args.threads) as executor:
             usernames_wordlist_path: str = load_wordlist_file("usernames.txt", args_wordlist=self.args.wordlist)
             formatting_length = max((len(word.strip()) for word in open(usernames_wordlist_path)), default=1)
             futures = [executor.submit(check_author_name, author_name) for author_name in self.wordlist_generator(wordlist_path=usernames_wordlist_path)]
@@ -368,19 +415,9 @@ class UserDiscover:
             ptprinthelper.ptprint(f"No users discovered", "OK", condition=not self.args.json, indent=4, clear_to_eol=True, end="\n\n")
 
     def _enumerate_users_via_comments(self):
-        for i in range(1, 100):
-            url = f"{self.REST_URL}/wp/v2/comments/?per_page=100&page={i}"
-            response = self.http_client.send_request(url, method="GET", allow_redirects=True)
-            data = self.load_prepare_response_json(response)
-            if response.status_code == 200:
-                if not data:
-                    break
-                for comment in data:
-                    author_id, author_name, author_slug = comment.get("author"), comment.get("author"), comment.get("author")
-                    if author_id:
-                        self.vulnerable_endpoints.add(response.url)
-            if response.status_code != 200:
-                break
+        response, comments = RestPaginator(self.args, self.http_client).fetch(f"{self.REST_URL}/wp/v2/comments/", allow_redirects=True)
+        if any(comment.get("author") for comment in comments or []):
+            self.vulnerable_endpoints.add(f"{self.REST_URL}/wp/v2/comments/")
 
     def _enumerate_users_by_rss_feed(self):
         """User enumeration via RSS feed"""
@@ -389,6 +426,7 @@ class UserDiscover:
         response = self.http_client.send_request(f"{self.BASE_URL}/feed", method="GET")
 
         if response.status_code == 200:
+            import defusedxml.ElementTree as ET
             try:
                 root = ET.fromstring(response.text.strip())
             except:
@@ -408,7 +446,7 @@ class UserDiscover:
             if not creators:
                 ptprinthelper.ptprint(f"No authors discovered via RSS feed", "OK", condition=not self.args.json, indent=4)
         else:
-            print_api_is_not_available(status_code=getattr(response, "status_code", None))
+            print_api_is_not_available(status_code=getattr(response, "status_code", None), json_output=self.args.json)
 
     def load_prepare_response_json(self, response):
         if response.content.startswith(b'\xef\xbb\xbf'):  # BOM for UTF-8
@@ -423,6 +461,7 @@ class UserDiscover:
 
     def parse_feed(self, response):
         rss_authors = set()
+        import defusedxml.ElementTree as ET
         try:
             root = ET.fromstring(response.text.strip())
             # Define the namespace dictionary
@@ -481,8 +520,12 @@ class UserDiscover:
 
     def _extract_name_from_title(self, response, base_title=None):
         """Extracts full name from response title"""
+        return self._extract_name_from_html(response.text)
+
+    def _extract_name_from_html(self, html):
+        """Extracts full name from title of html"""
         try:
-            title = re.search(r"<title>(.*?)</title>", response.text, re.IGNORECASE | re.DOTALL).groups()[0]
+            title = re.search(r"<title>(.*?)</title>", html, re.IGNORECASE | re.DOTALL).groups()[0]
 
             email_from_title = re.match(r"([\w\.-]+@[\w\.-]+\.?\w+)", title)
             name_from_title = None
@@ -503,77 +546,106 @@ class UserDiscover:
 
 
 class EnumeratedUserTable:
+    """
+    Users discovered by all user enumeration tests, in order of discovery.
+
+    Entries are indexed by id, slug and name, so a merge or a lookup does not scan the table.
+    Enumeration tests run concurrently, the table is read and changed under its lock.
+    """
     def __init__(self):
-        self.RESULT_QUERY = Queue()
+        self._users = {}   # key -> entry, in order of discovery
+        self._by_id = {}   # str(id) -> key
+        self._by_slug = {} # slug -> key
+        self._by_name = {} # name -> key
+        self._next_key = 0
+        self._lock = Lock() # User enumeration tests may run concurrently
 
     def get_users(self):
         """
-        Returns a list of users currently in the queue.
+        Returns a list of users in order of discovery.
         """
-        return list(self.RESULT_QUERY.queue)
+        with self._lock:
+            return [dict(user) for user in self._users.values()]
 
     def update_queue(self, user_data: dict) -> None:
         """
-        Updates the queue with a user entry.
+        Merges a user entry into the table.
 
         Rules:
             1. If a user with the same ID exists, fill in missing 'name' or 'slug'.
-            2. Remove any entries with empty ID if they duplicate an existing 'name' or 'slug'.
+            2. Remove any entries with empty ID if they duplicate the 'name' or 'slug' of the new user.
             3. Add the new user only if no duplicate exists.
         """
-        temp_queue = Queue()
-        user_id = user_data.get("id")
+        with self._lock:
+            changed = self._update_queue(user_data)
+        if changed:
+            EventStream().emit("user", **changed)
+
+    def _update_queue(self, user_data: dict) -> dict:
+        """Returns the added or completed entry, None when nothing changed"""
+        user_id = str(user_data.get("id") or "")
         user_name = user_data.get("name")
         user_slug = user_data.get("slug")
-
-        found = False
-        duplicate = False
-
-        while not self.RESULT_QUERY.empty():
-            item = self.RESULT_QUERY.get()
-
-            # Update existing ID
-            if user_id and item.get("id") == user_id:
-                found = True
-                if not item.get("name") and user_name:
-                    item["name"] = user_name
-                if not item.get("slug") and user_slug:
-                    item["slug"] = user_slug
-
-            # Detect duplicates by name or slug
-            if (user_name and user_name == item.get("name")) or (user_slug and user_slug == item.get("slug")):
-                duplicate = True
-
-            # Only keep item if it’s not an empty ID duplicate
-            if not (item.get("id") == "" and duplicate):
-                temp_queue.put(item)
-
-        # Add new entry only if it’s not a duplicate and not found by ID
-        if not duplicate and not found:
-            temp_queue.put(user_data)
-
-        self.RESULT_QUERY = temp_queue
+        changed = None
+
+        key = self._by_id.get(user_id) if user_id else None
+        if key is not None:
+            item = self._users[key]
+            for field, value in [("name", user_name), ("slug", user_slug)]:
+                if not item.get(field) and value:
+                    item[field] = value
+                    changed = dict(item)
+
+        duplicates = {self._by_slug.get(user_slug) if user_slug else None, self._by_name.get(user_name) if user_name else None} - {None}
+        for duplicate in duplicates:
+            if self._users[duplicate].get("id") == "":
+                self._remove(duplicate)
+        if key is not None:
+            self._index(key) # Completed entry may share name or slug with a removed one
+
+        if key is None and not duplicates:
+            changed = dict(self._users[self._add(user_data)])
+        return changed
+
+    def _add(self, user_data: dict) -> int:
+        key = self._next_key
+        self._next_key += 1
+        self._users[key] = dict(user_data)
+        self._index(key)
+        return key
+
+    def _index(self, key: int) -> None:
+        item = self._users[key]
+        for index, value in [(self._by_id, str(item.get("id") or "")), (self._by_slug, item.get("slug")), (self._by_name, item.get("name"))]:
+            if value:
+                index.setdefault(value, key)
+
+    def _remove(self, key: int) -> None:
+        item = self._users.pop(key)
+        for index, value in [(self._by_id, str(item.get("id") or "")), (self._by_slug, item.get("slug")), (self._by_name, item.get("name"))]:
+            if value and index.get(value) == key:
+                del index[value]
+
+    def find(self, user_id=None, slug=None) -> dict:
+        """Returns copy of the user with user_id or slug, None if not in the table"""
+        with self._lock:
+            key = self._by_id.get(str(user_id)) if user_id else self._by_slug.get(slug) if slug else None
+            return dict(self._users[key]) if key is not None else None
 
     def needs_enumeration(self, user_id: str) -> bool:
         """
-        Returns True if the queue contains an entry with the given user_id
+        Returns True if the table contains an entry with the given user_id
         but is missing 'slug' or 'name'.
         """
-        for item in self.RESULT_QUERY.queue:
-            if item.get("id") == user_id:
-                if not item.get("slug") or not item.get("name"):
-                    return True
-                else:
-                    return False
-        return False
-
+        with self._lock:
+            key = self._by_id.get(str(user_id))
+            return key is not None and (not self._users[key].get("slug") or not self._users[key].get("name"))
 
     def get_user_slug_or_name(self, user_id):
         """
         Returns the 'slug' if present, otherwise 'name', for the given user_id.
         If neither exists, returns the user_id itself.
         """
-        for user in self.RESULT_QUERY.queue:
-            if str(user.get("id")) == str(user_id):
-                return user.get("slug") or user.get("name") or str(user_id)
-        return str(user_id)
\ No newline at end of file
+        with self._lock:
+            user = self._users.get(self._by_id.get(str(user_id)), {})
+            return user.get("slug") or user.get("name") or str(user_id)
@@ -1,114 +1,126 @@
-import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from collections import defaultdict
-import csv
 import hashlib
-from ptlibs.http.http_client import HttpClient
+import math
+from modules.http_client import ScanHttpClient
+from modules.scheduler import ContextThreadPoolExecutor
+from functools import reduce
+from operator import or_
+from modules.fingerprint_index import FingerprintIndex, popcount
 import sys
 from urllib.parse import urljoin
 
 class VersionBySourcesIdentifier:
+    """
+    Identifies WordPress version by MD5 of static files compared to sources2versions.csv (FingerprintIndex).
+
+    Files are requested one by one, each time the file whose hash best splits the versions still possible
+    (highest entropy of the partition of candidates by expected hash). Versions inconsistent with the hash
+    received are removed, probing ends when at most --version-candidates versions remain confirmed by a known
+    hash, or when no file can tell the remaining versions apart. A version found by passive tests (generator
+    tag, RSS, ...) seeds the candidates, files are chosen to confirm it first, which usually leaves only a few
+    versions to tell apart. A seed contradicted by the files is dropped, the result are always versions consistent
+    with all hashes received.
+    """
     def __init__(self, args, ptjsonlib):
         self.args = args
         self.ptjsonlib = ptjsonlib
-        self.http_client = HttpClient(self.args, self.ptjsonlib)
-
-    def identify_version_by_sources(self):
-        mapping_md5 = self.load_minimal_csv(os.path.join(os.path.abspath(__file__.rsplit("/", 1)[0]), "wordlists", "sources2versions.csv"))
-        files = self.read_unique_list(os.path.join(os.path.join(os.path.abspath(__file__.rsplit("/", 1)[0]), "wordlists", "unique_sources_for_version_identify.txt")))
-        aggregated_versions = set()
-        matches_for_csv = []
+        self.http_client = ScanHttpClient(self.args, self.ptjsonlib)
 
-        with ThreadPoolExecutor(max_workers=max(1, self.args.threads)) as ex:
-            futures = {ex.submit(self.fetch_and_hash, self.args.url, path): path for path in files}
-            for fut in as_completed(futures):
-                res = fut.result()
-                if res.get("status") != "ok" or not res.get("md5"):
-                    continue
+    def identify_version_by_sources(self, hint: str = None) -> list:
+        """Returns sorted versions the received hashes cannot tell apart, empty list when no file matched a known hash"""
+        index = FingerprintIndex(self.args)
+        fingerprints = {} # {file: ({md5: bitset of versions}, bitset of versions the file is known in)}
+        for file_id, path in enumerate(index.files):
+            hashes = dict(index.file_hashes(file_id))
+            fingerprints[path] = (hashes, reduce(or_, hashes.values(), 0))
+        files = list(fingerprints)
+        max_candidates = max(1, getattr(self.args, "version_candidates", 1) or 1)
 
-                file_path = res["file"]
-                md5 = res["md5"].lower()
-                # versions = set()
-                versions = set(mapping_md5.get(md5, []))
-
-                if not versions:
-                    continue
+        candidates = index.all_versions
+        seed = self.seed_candidates(hint, index)
+        matched = False
+        batch = 1
+        with ContextThreadPoolExecutor(max_workers=max(1, self.args.threads)) as ex:
+            while files:
+                if matched and popcount(candidates) <= max_candidates:
+                    break
+                pool = seed if seed and not matched else candidates # The passive version is probed until a hash confirms or contradicts it
+                paths = self.next_probes(fingerprints, files, pool, candidates, need_match=not matched, count=batch)
+                if not paths:
+                    break
+                for path in paths:
+                    files.remove(path)
+                for path, res in zip(paths, ex.map(lambda path: self.fetch_and_hash(self.args.url, path), paths)):
+                    hashes, known = fingerprints[path]
+                    if res["status"] == "ok":
+                        observed = hashes.get(res["md5"].lower()) # None for unknown content, not one of the versions the file is known in
+                    elif res["http_status"] in (404, 410):
+                        observed = None
+                    else:
+                        continue # Blocked or failed, tells nothing
 
-                aggregated_versions.update(versions)
-                matches_for_csv.append({
-                    "File": file_path,
-                    "URL": res.get("url",""),
-                    "MD5": md5,
-                    "Versions": ";".join(sorted(versions, key=self.version_sort_key)),
-                    "HTTPStatus": res.get("http_status",""),
-                })
+                    consistent = candidates & (observed if observed is not None else ~known)
+                    if not consistent:
+                        continue # Modified copy of the file
+                    candidates = consistent
+                    matched = matched or observed is not None
+                    seed &= candidates # Empty when the files contradict the passive version
+                # Target not serving known files costs rounds, not requests one by one
+                batch = 1 if matched else min(batch * 2, max(1, self.args.threads))
 
-        versions_list = sorted(aggregated_versions, key=self.version_sort_key)
-        return versions_list
-    
+        return index.versions_of(candidates) if matched else []
 
-    def parse_version_tuple(self,ver_str, parts=4):
-        if ver_str is None:
-            ver_str = ""
-        s = ver_str.strip()
-        if s == "":
-            vals = [0]
-        else:
-            parts_raw = [p for p in s.split('.') if p != ""]
-            vals = []
-            for p in parts_raw:
-                try:
-                    vals.append(int(p))
-                except ValueError:
-                    num = ""
-                    for ch in p:
-                        if ch.isdigit():
-                            num += ch
-                        else:
-                            break
-                    vals.append(int(num) if num else 0)
-        if len(vals) < parts:
-            vals = vals + [0] * (parts - len(vals))
-        else:
-            vals = vals[:parts]
-        return tuple(vals)
+    @staticmethod
+    def _split(cells, fingerprint) -> list:
+        """Cells (bitsets) of a partition of versions split by hashes of the file"""
+        hashes, known = fingerprint
+        split = []
+        for cell in cells:
+            split.extend(cell & versions for versions in hashes.values() if cell & versions)
+            if cell & ~known:
+                split.append(cell & ~known)
+        return split
 
-    def version_sort_key(self, v):
-        return self.parse_version_tuple(v, parts=4)
+    @staticmethod
+    def _entropy(cells, total: int) -> float:
+        return -sum(popcount(cell) / total * math.log2(popcount(cell) / total) for cell in cells)
 
-    def load_minimal_csv(self, path):
-        mapping_md5 = defaultdict(set)
-        try:
-            with open(path, newline='', encoding='utf-8') as fh:
-                reader = csv.DictReader(fh)
-                fields = reader.fieldnames or []
-                if "File" not in fields or "MD5" not in fields or "Version" not in fields:
-                    raise SystemExit(f'CSV {path} musí obsahovat sloupce "Version","File","MD5". Dostupné: {fields}')
-                for r in reader:
-                    f = (r.get("File") or "").strip()
-                    m = (r.get("MD5") or "").strip().lower()
-                    v = (r.get("Version") or "").strip()
-                    if not m or not v:
-                        continue
-                    mapping_md5[m].add(v)
-        except FileNotFoundError:
-            raise SystemExit(f'Nepodařilo se najít minimal CSV: {path}')
-        return mapping_md5
+    def next_probes(self, fingerprints, files, pool: int, candidates: int, need_match: bool, count: int = 1) -> list:
+        """
+        Up to count files splitting pool (seeded or all candidates) best together, chosen one by one by entropy
+        of the partition of pool by hashes of the files chosen so far. Until a hash matched, files known in
+        versions of the pool are preferred so the result is confirmed, ties go to the file leaving the fewest
+        candidates when it does. Returns empty list when no file can tell the versions apart or confirm them.
+        """
+        chosen = []
+        cells, total = [pool], popcount(pool)
+        while len(chosen) < count:
+            best, best_score = None, None
+            for path in files:
+                if path in chosen:
+                    continue
+                hashes, known = fingerprints[path]
+                coverage = popcount(pool & known) / total if need_match and not chosen else 0
+                if coverage and pool != candidates: # Fewest candidates left when the file confirms the passive version
+                    confirming = reduce(or_, (versions for versions in hashes.values() if versions & pool), 0)
+                    specificity = -popcount(candidates & confirming) / popcount(candidates)
+                else:
+                    specificity = 0
+                score = (self._entropy(self._split(cells, fingerprints[path]), total), coverage, specificity)
+                if best_score is None or score > best_score:
+                    best, best_score = path, score
+            if best is None or (best_score[0] - self._entropy(cells, total) < 1e-9 and best_score[1] == 0):
+                break
+            chosen.append(best)
+            cells = self._split(cells, fingerprints[best])
+        return chosen
 
-    def read_unique_list(self, path):
-        try:
-            with open(path, encoding='utf-8') as fh:
-                lines = [ln.strip() for ln in fh]
-        except FileNotFoundError:
-            raise SystemExit(f'Nepodařilo se najít unique list: {path}')
-        out = []
-        seen = set()
-        for ln in lines:
-            if not ln:
-                continue
-            if ln not in seen:
-                out.append(ln); seen.add(ln)
-        return out
+    @staticmethod
+    def seed_candidates(hint, index) -> int:
+        """Bitset of versions matching version found by passive tests, e.g. 6.4.2 or all 6.4.x for 6.4"""
+        if not hint:
+            return 0
+        hint = str(hint).strip()
+        return index.mask_of(version for version in index.versions if version == hint or version.startswith(hint + "."))
 
     def fetch_and_hash(self, base, path):
         """
@@ -61,16 +61,19 @@ class WordpressPluginsDownloader:
 
         self.args = args
         self.wordlist_path = self.output_file
-        self.existing_plugins = set()
+        self.existing_plugins = {} # slug -> active installs
         self.load_existing_plugins()
 
         print("Saving to:", self.wordlist_path)
 
     def load_existing_plugins(self):
-        """Load existing plugins from the wordlist"""
+        """Load existing plugins and their active installs (slug<TAB>installs, plain slug for unknown) from the wordlist"""
         if os.path.exists(self.wordlist_path):
             with open(self.wordlist_path, "r") as f:
-                self.existing_plugins = set(f.read().splitlines())
+                for line in f:
+                    slug, _, installs = line.strip().partition("\t")
+                    if slug:
+                        self.existing_plugins[slug] = int(installs) if installs.isdigit() else 0
             print(f"Loaded {len(self.existing_plugins)} existing plugins from the wordlist.")
         else:
             print("No existing wordlist found. Starting fresh.")
@@ -99,20 +102,22 @@ class WordpressPluginsDownloader:
         print(f"Pages to download: {total_pages}")
 
         # Setup tqdm for the progress bar based on total pages
-        with tqdm(total=total_pages, desc="Fetching plugins", unit="page", ncols=100, position=0, leave=True) as pbar:
-            with ThreadPoolExecutor(max_workers=self.args.threads) as executor:
-                future_to_page = {executor.submit(self.fetch_page_plugins, url_template, page, pbar): page for page in range(1, total_pages + 1)}
-
-                for future in as_completed(future_to_page):
-                    page = future_to_page[future]
-                    try:
-                        new_plugins = future.result()
-                        if new_plugins:
-                            self.save_wordlist(new_plugins)
-                            plugins.update(new_plugins)
-                    except Exception as e:
-                        print(f"Error on page {page}: {e}")
-                    pbar.update(1)
+        try:
+            with tqdm(total=total_pages, desc="Fetching plugins", unit="page", ncols=100, position=0, leave=True) as pbar:
+                with ThreadPoolExecutor(max_workers=self.args.threads) as executor:
+                    future_to_page = {executor.submit(self.fetch_page_plugins, url_template, page, pbar): page for page in range(1, total_pages + 1)}
+
+                    for future in as_completed(future_to_page):
+                        page = future_to_page[future]
+                        try:
+                            page_plugins = future.result()
+                            plugins.update(set(page_plugins) - set(self.existing_plugins))
+                            self.existing_plugins.update(page_plugins)
+                        except Exception as e:
+                            print(f"Error on page {page}: {e}")
+                        pbar.update(1)
+        finally:
+            self.save_wordlist()
 
         print(f"Total new plugins fetched: {len(plugins)}")
 
@@ -122,26 +127,13 @@ class WordpressPluginsDownloader:
 
         if response.status_code == 200:
             data = response.json()
-            page_plugins = [plugin["slug"] for plugin in data.get("plugins", [])]
-            new_plugins = set(page_plugins) - self.existing_plugins
-            return new_plugins
+            return {plugin["slug"]: int(plugin.get("active_installs") or 0) for plugin in data.get("plugins", [])}
         else:
             print(f"Failed to fetch page {page}")
-            return set()
-
-    def save_wordlist(self, plugins):
-        if plugins:
-            with open(self.wordlist_path, "a") as f:
-                f.write("\n".join(plugins) + "\n")
-
-        self.existing_plugins.update(plugins)
-
-        self.sort_wordlist()
+            return {}
 
-    def sort_wordlist(self):
-        file_path = self.wordlist_path
-        with open(file_path, "r") as file:
-            lines = file.readlines()
-        lines.sort()
-        with open(file_path, "w") as file:
-            file.writelines(lines)
\ No newline at end of file
+    def save_wordlist(self):
+        """Write plugins with active installs, most popular first, the plugins dictionary is probed in this order"""
+        plugins = sorted(self.existing_plugins.items(), key=lambda plugin: (-plugin[1], plugin[0]))
+        with open(self.wordlist_path, "w") as f:
+            f.writelines(f"{slug}\t{installs}\n" for slug, installs in plugins)
\ No newline at end of file
@@ -1,18 +1,99 @@
 import os
 import re
+import csv
 import requests
 import zipfile
 import hashlib
 import json
-from io import BytesIO
+from collections import defaultdict, Counter
 from bs4 import BeautifulSoup
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from modules.fingerprint_index import version_key
+
+__version__ = "0.0.2"
+
+WORDLISTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "wordlists"))
+
+# Files of a release served as they are, their hashes identify the version
+FINGERPRINT_DIRS = ("wp-includes/", "wp-admin/")
+STATIC_EXTENSIONS = {".js", ".css", ".scss", ".map", ".json", ".txt", ".html", ".xml", ".png", ".gif", ".jpg", ".svg", ".ico", ".swf", ".gz", ".woff", ".woff2", ".ttf", ".eot"}
+BADGE_FILE = "wp-admin/images/about-release-badge.svg"
+FAVICON_FILE = "wp-includes/images/w-logo-blue-white-bg.png" # Served for /favicon.ico by WordPress without a site icon
+FAVICON_NAME = "WordPress default site icon"
+
+
+def hash_release(zip_path) -> dict:
+    """
+    Hash static assets of release zip without extracting it, runs in worker processes of the build.
+    Returns {"files": {path: [md5, size]}, "sha256": {path: sha256}} with SHA256 of the badge and the favicon.
+    """
+    files, sha256 = {}, {}
+    with zipfile.ZipFile(zip_path) as z:
+        for info in z.infolist():
+            if info.is_dir():
+                continue
+            path = info.filename.split("/", 1)[-1] # Members are in wordpress/
+            if not path.startswith(FINGERPRINT_DIRS) or os.path.splitext(path)[1].lower() not in STATIC_EXTENSIONS:
+                continue
+            data = z.read(info)
+            files[path] = [hashlib.md5(data).hexdigest(), len(data)]
+            if path in (BADGE_FILE, FAVICON_FILE):
+                sha256[path] = hashlib.sha256(data).hexdigest()
+    return {"files": files, "sha256": sha256}
+
+
+def select_sources(releases: dict) -> list:
+    """
+    Rows of sources2versions.csv for releases {version: {path: [md5, size]}}, one per version.
+
+    A (file, MD5) tells versions apart only when the releases it is found in are one run of consecutive versions,
+    the run is its MinVersion..MaxVersion and a scan seeing the hash keeps exactly these versions. Every version
+    gets the usable (file, MD5) with the shortest run, smaller files first. Versions without any (releases with no
+    static files) get the row of the nearest version, with Reason "nearest".
+    """
+    versions = sorted(releases, key=version_key)
+    positions = defaultdict(list)
+    sizes = {}
+    for position, version in enumerate(versions):
+        for path, (md5, size) in releases[version].items():
+            positions[(path, md5)].append(position)
+            sizes[path] = max(size, sizes.get(path, 0))
+
+    best = {}
+    for (path, md5), found in positions.items():
+        low, high = found[0], found[-1]
+        if high - low + 1 != len(found):
+            continue # The hash returns in later releases, it cannot be told by a range
+        rank = (high - low, sizes[path], path)
+        for position in found:
+            if position not in best or rank < best[position][0]:
+                best[position] = (rank, path, md5, versions[low], versions[high])
+
+    rows = []
+    for position, version in enumerate(versions):
+        reason = "contained"
+        if position not in best:
+            if not best:
+                break
+            position = min(best, key=lambda other: abs(other - position))
+            reason = "nearest"
+        _, path, md5, min_version, max_version = best[position]
+        rows.append({"Version": version, "File": path, "MD5": md5, "MinVersion": min_version, "MaxVersion": max_version, "Reason": reason})
+    return rows
 
-__version__ = "0.0.1"
 
 class WordpressDownloader:
-    def __init__(self, download_path=None):
+    """
+    Downloads every WordPress release and builds the fingerprint databases of the scanner from them
+    (sources2versions.csv, unique_sources_for_version_identify.txt, favicons.csv, release badge hashes).
+
+    Releases are downloaded by threads and hashed by a pool of processes as soon as each zip arrives. Hashes of
+    every release are kept in <download path>/downloads/fingerprints/<version>.json, later runs download and hash
+    only new releases and build the databases again from all of them.
+    """
+    def __init__(self, download_path=None, ptjsonlib=None):
 
         if not download_path:
             return
@@ -24,10 +105,13 @@ class WordpressDownloader:
             self.downloads_dir = os.path.join(download_path , "downloads", "wp")
 
         self.db_file = os.path.join(os.path.dirname(self.downloads_dir), "hashes.json")
+        self.fingerprints_dir = os.path.join(os.path.dirname(self.downloads_dir), "fingerprints")
 
         print("WP Download path:",  self.downloads_dir)
         os.makedirs(self.downloads_dir, exist_ok=True)
+        os.makedirs(self.fingerprints_dir, exist_ok=True)
         self.max_parallel_downloads = 5
+        self.max_workers = os.cpu_count() or 1
         self.main()
 
     def load_existing_hashes(self):
@@ -38,7 +122,7 @@ class WordpressDownloader:
 
     def save_hashes(self, hashes):
         # Sort the dictionary by version (keys)
-        sorted_hashes = dict(sorted(hashes.items(), key=lambda item: [int(x) for x in item[0].split('.')], reverse=True))
+        sorted_hashes = dict(sorted(hashes.items(), key=lambda item: version_key(item[0]), reverse=True))
 
         with open(self.db_file, "w") as f:
             json.dump(sorted_hashes, f, indent=4)
@@ -76,116 +160,122 @@ class WordpressDownloader:
                 versions.append(match.group(1))
 
         # Remove duplicates and sort versions
-        return sorted(set(versions), key=lambda v: [int(x) for x in v.split('.')], reverse=True)
+        return sorted(set(versions), key=version_key, reverse=True)
 
-    def compute_hash(self, data):
-        return hashlib.sha256(data).hexdigest()
+    def fingerprint_path(self, version):
+        return os.path.join(self.fingerprints_dir, f"{version}.json")
 
-    def download_and_check_svg(self, version, existing_hashes):
+    def download_release(self, version):
+        """Download release zip unless already downloaded, returns its path or None"""
         zip_url = f"https://wordpress.org/wordpress-{version}.zip"
         version_dir = os.path.join(self.downloads_dir, version)
+        zip_file_path = os.path.join(version_dir, f"wordpress-{version}.zip")
 
         # Skip if already downloaded
-        if os.path.exists(version_dir):
-            print(f"{version} already downloaded.")
-            return
+        if os.path.exists(zip_file_path) and zipfile.is_zipfile(zip_file_path):
+            return zip_file_path
 
         os.makedirs(version_dir, exist_ok=True)
-
-        # Add tqdm for download progress
-        zip_file_path = os.path.join(version_dir, f"wordpress-{version}.zip")
         with requests.get(zip_url, stream=True) as response:
-            total_size = int(response.headers.get('Content-Length', 0))
-            with open(zip_file_path, 'wb') as f:
-                for data in tqdm(response.iter_content(1024), total=total_size//1024, unit='KB', desc=f"Downloading {version}"):
+            if response.status_code != 200:
+                print(f"Failed to download {version}")
+                return None
+            with open(zip_file_path + ".part", 'wb') as f:
+                for data in response.iter_content(1 << 16):
                     f.write(data)
-
-        if response.status_code == 200:
-            with zipfile.ZipFile(zip_file_path) as z:
-                svg_path = f"wordpress-{version}/wp-admin/images/about-release-badge.svg"
-                if svg_path in z.namelist():
-                    svg_data = z.read(svg_path)
-                    hash_value = self.compute_hash(svg_data)
-                    existing_hashes[version] = {'sha256': hash_value, 'has_svg': True}
-
-                    # Create output folder and save SVG
-                    output_dir = os.path.join("badges", version)
-                    os.makedirs(output_dir, exist_ok=True)
-                    with open(f"{output_dir}/about-release-badge.svg", "wb") as f:
-                        f.write(svg_data)
-                    print(f"Extracted {version}, hash: {hash_value}")
-                else:
-                    existing_hashes[version] = {'sha256': None, 'has_svg': False}
-                    print(f"No badge found in {version}")
-        else:
-            print(f"Failed to download {version}")
-
-    def download_versions_in_parallel(self, versions, existing_hashes):
-        with ThreadPoolExecutor(max_workers=self.max_parallel_downloads) as executor:
-            futures = [executor.submit(self.download_and_check_svg, version, existing_hashes) for version in versions]
-            for future in tqdm(futures, desc="Downloading versions", total=len(versions)):
-                future.result()
-
-    def filter_versions(self, versions):
-        """
-        Filter out redundant minor versions. Only keep the highest version for each major.minor combination.
-        """
-        seen = set()
-        filtered_versions = []
-
-        for version in versions:
-            major_minor = '.'.join(version.split('.')[:2])  # Extract the major.minor part
-            if major_minor not in seen:
-                filtered_versions.append(version)
-                seen.add(major_minor)
-
-        return filtered_versions
-
-    def process_existing_downloads(self, existing_hashes):
-        """
-        If hashes.json is missing, go through the downloaded WordPress versions and rebuild the hashes.
-        """
-        for version_dir in os.listdir(self.downloads_dir):
-            version_path = os.path.join(self.downloads_dir, version_dir)
-            if os.path.isdir(version_path):
-                # Process the version
-                svg_path = f"wordpress/wp-admin/images/about-release-badge.svg"
-                zip_file_path = os.path.join(version_path, f"wordpress-{version_dir}.zip")
-                if os.path.exists(zip_file_path):
-                    with zipfile.ZipFile(zip_file_path) as z:
-                        if svg_path in z.namelist():
-                            svg_data = z.read(svg_path)
-                            hash_value = self.compute_hash(svg_data)
-                            existing_hashes[version_dir] = {'sha256': hash_value, 'has_svg': True}
-                            print(f"Recomputed {version_dir} hash: {hash_value}")
-                        else:
-                            existing_hashes[version_dir] = {'sha256': None, 'has_svg': False}
-                            print(f"No badge found in {version_dir}")
+        os.replace(zip_file_path + ".part", zip_file_path)
+        return zip_file_path
+
+    def save_fingerprint(self, version, fingerprint):
+        """Hashes of one release are saved as soon as they are computed, an interrupted build keeps them"""
+        path = self.fingerprint_path(version)
+        with open(path + ".tmp", "w") as f:
+            json.dump(fingerprint, f)
+        os.replace(path + ".tmp", path)
+
+    def fingerprint_releases(self, versions):
+        """Download releases by threads and hash each of them in the process pool as soon as it is downloaded"""
+        with ThreadPoolExecutor(max_workers=self.max_parallel_downloads) as downloads, ProcessPoolExecutor(max_workers=self.max_workers) as workers:
+            downloaded = {downloads.submit(self.download_release, version): version for version in versions}
+            hashed = {}
+            for future in tqdm(as_completed(downloaded), desc="Downloading releases", total=len(downloaded)):
+                try:
+                    zip_file_path = future.result()
+                except Exception as e:
+                    print(f"Failed to download {downloaded[future]}: {e}")
+                    continue
+                if zip_file_path:
+                    hashed[workers.submit(hash_release, zip_file_path)] = downloaded[future]
+
+            for future in tqdm(as_completed(hashed), desc="Hashing releases", total=len(hashed)):
+                try:
+                    self.save_fingerprint(hashed[future], future.result())
+                except Exception as e:
+                    print(f"Failed to hash {hashed[future]}: {e}")
+
+    def load_fingerprints(self):
+        """{version: fingerprint} of all hashed releases"""
+        fingerprints = {}
+        for name in os.listdir(self.fingerprints_dir):
+            if name.endswith(".json"):
+                with open(os.path.join(self.fingerprints_dir, name)) as f:
+                    fingerprints[name[:-len(".json")]] = json.load(f)
+        return fingerprints
+
+    def write_databases(self, fingerprints):
+        """Write sources2versions.csv, unique_sources_for_version_identify.txt and favicons.csv to the wordlists"""
+        rows = select_sources({version: fingerprint["files"] for version, fingerprint in fingerprints.items()})
+        self._write_csv(os.path.join(WORDLISTS_DIR, "sources2versions.csv"), ["Version", "File", "MD5", "MinVersion", "MaxVersion", "Reason"], rows)
+
+        # Files telling apart the most versions first
+        sources = Counter(row["File"] for row in rows)
+        self._write(os.path.join(WORDLISTS_DIR, "unique_sources_for_version_identify.txt"), "".join(f"{path}\n" for path, _ in sorted(sources.items(), key=lambda source: (-source[1], source[0]))))
+
+        favicons_path = os.path.join(WORDLISTS_DIR, "favicons.csv")
+        favicons = {}
+        if os.path.exists(favicons_path):
+            with open(favicons_path, newline="", encoding="utf-8") as f:
+                favicons = {row["SHA256"]: row["Name"] for row in csv.DictReader(f) if row.get("SHA256")}
+        for fingerprint in fingerprints.values():
+            if FAVICON_FILE in fingerprint["sha256"]:
+                favicons.setdefault(fingerprint["sha256"][FAVICON_FILE], FAVICON_NAME)
+        self._write_csv(favicons_path, ["SHA256", "Name"], [{"SHA256": sha256, "Name": name} for sha256, name in favicons.items()])
+
+        print(f"Versions: {len(rows)}, files identifying them: {len(sources)}, favicons: {len(favicons)}")
+
+    def _write_csv(self, path, fields, rows):
+        with open(path + ".tmp", "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(path + ".tmp", path)
+
+    def _write(self, path, text):
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
 
     def main(self,):
         existing_hashes = self.load_existing_hashes()
 
-        if not existing_hashes:
-            print("hashes.json is missing, rebuilding from existing downloads...")
-            self.process_existing_downloads(existing_hashes)
-
         versions = self.get_wordpress_versions()
         print(f"Found {len(versions)} versions")
 
-        # Filter out redundant minor versions
-        versions = self.filter_versions(versions)
-        print(f"Filtered to {len(versions)} versions")
-
-        # Only download versions that are not in the existing hashes or have not been downloaded
-        versions_to_download = [version for version in versions if version not in existing_hashes or not os.path.exists(os.path.join(self.downloads_dir, version))]
-        print(f"Downloading {len(versions_to_download)} versions")
+        # Only releases not hashed by previous runs are downloaded and hashed
+        versions_to_fingerprint = [version for version in versions if not os.path.exists(self.fingerprint_path(version))]
+        print(f"Fingerprinting {len(versions_to_fingerprint)} new versions")
 
-        self.download_versions_in_parallel(versions_to_download, existing_hashes)
+        self.fingerprint_releases(versions_to_fingerprint)
+        fingerprints = self.load_fingerprints()
+        self.write_databases(fingerprints)
 
+        for version, fingerprint in fingerprints.items():
+            badge_hash = fingerprint["sha256"].get(BADGE_FILE)
+            existing_hashes[version] = {'sha256': badge_hash, 'has_svg': bool(badge_hash)}
         self.save_hashes(existing_hashes)
         existing_hashes = self.save_existing_hashes(existing_hashes)
 
         print("\n", "SVG Hashes:", json.dumps(existing_hashes, indent=4), sep="\n")
 
 if __name__ == "__main__":
-    WordpressDownloader().main()
\ No newline at end of file
+    WordpressDownloader().main()
@@ -1,8 +1,10 @@
+import re
 import requests
 import json
 from datetime import datetime
 from ptlibs.ptprinthelper import ptprint
-from ptlibs.http.http_client import HttpClient
+from modules.http_client import ScanHttpClient
+from modules.events import EventStream
 
 class WPScanAPI:
     def __init__(self, args, ptjsonlib):
@@ -12,9 +14,11 @@ class WPScanAPI:
         self.API_KEY = args.wpscan_key
         self.headers = {}
         self.headers.update({"Authorization": f"Token token={args.wpscan_key}"})
-        self.http_client = HttpClient(self.args, self.ptjsonlib)
+        self.http_client = ScanHttpClient(self.args, self.ptjsonlib)
 
-    def run(self, wp_version: str, plugins: list, themes: list):
+    def run(self, wp_version: str, plugins: list, themes: list, versions: dict = None):
+        """versions: {"plugin": {name: version}, "theme": {name: version}} of installed components, vulnerabilities fixed in them are not reported"""
+        versions = versions or {}
         ptprint(f"WPScan", "INFO", not self.args.json, colortext=True, newline_above=True)
         if not self.API_KEY or len(self.API_KEY) != 43:
             ptprint(f"Valid API key is required for WPScan information (--wpscan-key)", "WARNING", condition=not self.args.json, indent=4)
@@ -37,14 +41,14 @@ class WPScanAPI:
         if plugins:
             ptprint(f"Plugins known vulnerabilities:", "INFO", not self.args.json and plugins, colortext=True, newline_above=True)
             for plugin in plugins:
-                self.get_plugin_vulnerabilities(plugin)
+                self.get_plugin_vulnerabilities(plugin, versions.get("plugin", {}).get(plugin))
                 if plugin != plugins[-1]:
                     ptprint(" ", "TEXT", condition=not self.args.json)
 
         if themes:
             ptprint(f"Themes known vulnerabilities:", "INFO", not self.args.json and themes, colortext=True, newline_above=True)
             for theme in themes:
-                self.get_theme_vulnerabilities(theme)
+                self.get_theme_vulnerabilities(theme, versions.get("theme", {}).get(theme))
                 if theme != themes[-1]:
                     ptprint(" ", "TEXT", condition=not self.args.json)
 
@@ -68,22 +72,33 @@ class WPScanAPI:
             status = response_data.get("status", "")
             ptprint(f"Status: {status}", "ADDITIONS", colortext=True, condition=not self.args.json and status, indent=4)
         
-        self.show_vulerabilities(response_data=response_data)
+        self.show_vulerabilities(response_data=response_data, component=f"wordpress:{version}")
 
-    def get_plugin_vulnerabilities(self, plugin: str):
+    def get_plugin_vulnerabilities(self, plugin: str, version: str = None):
         response_data = self.send_request(url=self.API_URL + f"/plugins/{plugin}").json()
         if response_data.get(plugin) and "is_error" not in response_data.keys():
             response_data = response_data[plugin]
-            self.show_vulerabilities(response_data=response_data)
+            self.show_vulerabilities(response_data=response_data, component=f"plugin:{plugin}", version=version)
 
-    def get_theme_vulnerabilities(self, theme: str):
+    def get_theme_vulnerabilities(self, theme: str, version: str = None):
         response_data = self.send_request(url=self.API_URL + f"/themes/{theme}").json()
         if response_data.get(theme) and "is_error" not in response_data.keys():
             response_data = response_data[theme]
-            self.show_vulerabilities(response_data=response_data)
+            self.show_vulerabilities(response_data=response_data, component=f"theme:{theme}", version=version)
 
-    def show_vulerabilities(self, response_data: dict):
+    @staticmethod
+    def _version_tuple(version):
+        """Comparable numeric version, None for versions that are not numeric (hashes, trunk)"""
+        return tuple(int(part) for part in version.split(".")) if version and re.fullmatch(r"\d+(\.\d+)*", version) else None
+
+    def show_vulerabilities(self, response_data: dict, component: str = None, version: str = None):
         vulnerabilities = response_data.get("vulnerabilities", [])
+        installed = self._version_tuple(version)
+        if installed:
+            fixed = [v for v in vulnerabilities if self._version_tuple(v.get("fixed_in")) and self._version_tuple(v.get("fixed_in")) <= installed]
+            vulnerabilities = [v for v in vulnerabilities if v not in fixed]
+            if fixed:
+                ptprint(f"{len(fixed)} known vulnerabilities fixed in installed version {version}", "OK", condition=not self.args.json, indent=4)
         if vulnerabilities:
             vulnerabilities_sorted = sorted(
                 vulnerabilities,
@@ -94,6 +109,7 @@ class WPScanAPI:
                 cves_output_list = ", ".join(f"CVE-{c}" for c in cves)
                 cves_output_list = f" - {cves_output_list}" if cves_output_list else ""
                 ptprint(f"{vulnerability.get('title')} ({vulnerability.get('vuln_type')}){cves_output_list}", "VULN", condition=not self.args.json, indent=4)
+                EventStream().emit("vulnerability", component=component, title=vulnerability.get("title"), type=vulnerability.get("vuln_type"), cves=[f"CVE-{c}" for c in cves], fixed_in=vulnerability.get("fixed_in"), installed=version)
 
                 if self.args.verbose:
                     ptprint(f"Fixed in: {vulnerability.get('fixed_in')}", "ADDITIONS", colortext=True, condition=not self.args.json, indent=4+4)
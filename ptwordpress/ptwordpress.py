@@ -19,54 +19,97 @@ along with ptwordpress.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 import argparse
+import importlib.util
 import os
+import signal
 import urllib
 import sys; sys.path.append(__file__.rsplit("/", 1)[0])
 
 from _version import __version__
-from ptlibs import ptjsonlib, ptprinthelper, ptmisclib, ptnethelper, ptnethelper
+from ptlibs import ptjsonlib, ptprinthelper
 from ptlibs.ptprinthelper import ptprint
-from ptlibs.http.http_client import HttpClient
 
-from modules.plugins.emails import get_emails_instance
-from modules.plugins.media_downloader import MediaDownloader
-from modules.user_discover   import UserDiscover
-from modules.source_discover import SourceDiscover
-from modules.wpscan_api import WPScanAPI
-from modules.routes_walker import APIRoutesWalker
-from modules.plugins.hashes import Hashes
-from modules.security_tools_identifier import SecurityToolsIdentifier
-from modules.helpers import Helpers, print_api_is_not_available, load_wordlist_file
-
-from modules.guessing import Guessing
-
-from modules.wordpress_downloader.wordpres_downloader import WordpressDownloader
-from modules.wordpress_downloader.plugins_downloader import WordpressPluginsDownloader
+# Modules of the scan (requests, bs4, aiohttp, downloaders) are imported by the code using them,
+# -h, -v and scans of a few tests do not load modules they never use. Import budget: benchmarks/startup.py
 
 class PtWordpress:
-    def __init__(self, args):
+    def __init__(self, args, ptjsonlib_object=None):
+        from modules.http_client import ScanHttpClient
+        from modules.helpers import Helpers
+        from modules.journal import ScanJournal
+        from modules.events import EventStream
+
         self.args                        = args
-        self.ptjsonlib: object           = ptjsonlib.PtJsonLib()
+        self.ptjsonlib: object           = ptjsonlib_object or ptjsonlib.PtJsonLib()
         self.base_response: object       = None
+        self.homepage: object            = None
         self.rest_response: object       = None
         self.rss_response: object        = None
         self.robots_txt_response: object = None
         self.is_enum_protected: bool     = None # Server returns 429 too many requests error
         self.wp_version: str             = None
-        self.http_client                 = HttpClient(args=self.args, ptjsonlib=self.ptjsonlib)
+        self.is_administration_available = False
+        self.plugins: list               = []
+        self.themes: list                = []
+        self.http_client                 = ScanHttpClient(args=self.args, ptjsonlib=self.ptjsonlib)
         self.http_client._store_urls     = True
         self.http_client.test_fpd        = True
         #self.http_client._base_headers   = self.args.headers
         self.helpers                     = Helpers(args=self.args, ptjsonlib=self.ptjsonlib)
+        self.journal                     = ScanJournal(getattr(self.args, "journal", None), url=self.args.url, resume=bool(getattr(self.args, "resume", None)))
+        self.events                      = EventStream(args=self.args, ptjsonlib=self.ptjsonlib)
 
     def run(self, args) -> None:
         """Main method"""
+        from modules.scheduler import ScanAborted
+        terminate = signal.getsignal(signal.SIGINT)
+        if self.journal.enabled or self.events.enabled:
+            signal.signal(signal.SIGINT, lambda sig, frame: self._save_journal_and_terminate(terminate, sig, frame))
+        try:
+            self._run(args)
+        except ScanAborted as e:
+            # Ended from the main thread, output of tests was printed and journal records and events are written first
+            self.events.emit("finished", status="error", message=str(e))
+            self.journal.close()
+            self.events.close()
+            self.ptjsonlib.end_error(str(e), self.args.json)
+        finally:
+            self.journal.close()
+            self.events.close()
+            signal.signal(signal.SIGINT, terminate)
+
+    def _save_journal_and_terminate(self, terminate, sig, frame):
+        """Write buffered journal records and queued events before the SIGINT handler (ptlibs) terminates the scan"""
+        self.events.emit("interrupted")
+        self.events.close()
+        if self.journal.enabled:
+            self.journal.close()
+            ptprinthelper.ptprint(f"Scan progress saved, continue by --resume {self.journal.path}", "INFO", condition=not self.args.json, newline_above=True, clear_to_eol=True)
+        if callable(terminate):
+            terminate(sig, frame)
+        raise KeyboardInterrupt
+
+    def _run(self, args) -> None:
+        from modules.source_discover import SourceDiscover
+        from modules.user_discover import UserDiscover
+        from modules.wpscan_api import WPScanAPI
+        from modules.plugins.emails import get_emails_instance
+        from modules.scheduler import TestScheduler
+        from modules.homepage_analyzer import HomepageAnalysis
+
+        if self.journal.resumed:
+            if self.journal.recorded_url != args.url:
+                self.ptjsonlib.end_error(f"Journal {self.journal.path} was recorded for {self.journal.recorded_url}", self.args.json)
+            ptprinthelper.ptprint(f"Resuming scan from {self.journal.path} ({len(self.journal.finished_tests)} finished tests)", "INFO", condition=not self.args.json)
+
+        self.events.emit("started", resumed=self.journal.resumed)
         self.base_response: object  = self.helpers._get_base_response(url=args.url)
         self.BASE_URL, self.REST_URL = self.helpers.construct_wp_api_url(self.base_response.url) # FINAL URLs.
 
-        self.rest_response, self.rss_response, self.robots_txt_response = self.helpers.fetch_responses_in_parallel() # Parallel response retrieval
+        self.rest_response, self.rss_response, self.robots_txt_response = self.helpers.prefetch_bootstrap_responses(set(self.args.tests)) # Requests of bootstrap and tests sent at once
         self.helpers.check_if_target_is_wordpress(base_response=self.base_response, wp_json_response=None)
-        self.helpers._extract_all_links_from_homepage(self.base_response)
+        self.homepage = HomepageAnalysis(self.base_response) # Parsed once, shared by all tests reading the homepage
+        self.helpers._extract_all_links_from_homepage(self.homepage)
 
         self.is_cloudflare = self.helpers.check_if_behind_cloudflare(base_response=self.base_response)
         self.head_method_allowed: bool      = self.helpers._is_head_method_allowed(url=self.BASE_URL)
@@ -77,9 +120,9 @@ class PtWordpress:
             self.target_is_case_sensitive = False
 
         if "TECH" in self.args.tests:
-            meta_tags = self.helpers.extract_and_print_meta_tags(response=self.base_response)
+            self.meta_tags = self.helpers.extract_and_print_meta_tags(homepage=self.homepage)
         else:
-            meta_tags = []
+            self.meta_tags = []
 
         self.helpers._check_if_blocked_by_server(self.base_response.url)
 
@@ -90,189 +133,244 @@ class PtWordpress:
 
         self.helpers._check_if_blocked_by_server(self.base_response.url)
 
-        if "INFO" in self.args.tests:
-            self.helpers.parse_site_info_from_rest(rest_response=self.rest_response, base_response=self.base_response, is_cloudflare=self.is_cloudflare)
-
-        if "ICONS" in self.args.tests:
-            self.helpers.collect_favicon_hashes_from_html(response=self.base_response)
-
-        if "GOOGLE" in self.args.tests:
-            self.helpers.parse_google_identifiers(response=self.base_response)
-
-        if "COMMENTS" in self.args.tests:
-            self.helpers.extract_and_print_html_comments(response=self.base_response)
-
-        if "WPS" in self.args.tests or "VERSION" in self.args.tests:
-            self.wp_version = self.helpers.get_wordpress_version(base_response=self.base_response, rss_response=self.rss_response, meta_tags=meta_tags, head_method_allowed=self.head_method_allowed)
-
-        if "VERSION" in self.args.tests:
-            self.helpers.print_supported_wordpress_versions(wp_version=self.wp_version)
-
-        if "ROBOTS" in self.args.tests:
-            self.helpers.print_robots_txt(robots_txt_response=self.robots_txt_response)
-
-        if "SITEMAP" in self.args.tests:
-            self.helpers.process_sitemap(robots_txt_response=self.robots_txt_response)
-
-        if "DANGEROUS" in self.args.tests:
-            self.source_discover.wordlist_discovery("dangerous", title="access to dangerous scripts", method="get", show_responses=True)
+        # Results of finished tests needed by the tests still to run
+        for name in ["wp_version", "is_administration_available", "plugins", "themes"]:
+            self.journal.track(name, lambda name=name: getattr(self, name), restore=lambda value, name=name: setattr(self, name, value))
+        self.journal.track_set("stored_urls", self.http_client._stored_urls.copy, restore=self.http_client._stored_urls.update)
+
+        scheduler = TestScheduler(max_workers=self.args.threads, json_output=self.args.json, journal=self.journal)
+        self.schedule_tests(scheduler)
+        scheduler.run()
+        if self.http_client.rate_control.for_url(self.BASE_URL).blocked: # Tests not checking for a ban ended early
+            self.helpers._check_if_blocked_by_server(self.BASE_URL)
+
+        stats = self.http_client.stats
+        ptprinthelper.ptprint(f"HTTP connections: {stats.connections_opened} opened, {stats.connections_reused} reused ({stats.requests_sent} requests)", "INFO", condition=self.args.verbose and not self.args.json, newline_above=True)
+        if self.http_client.memo:
+            ptprinthelper.ptprint(f"HTTP response memo: {self.http_client.memo.hits} hits, {self.http_client.memo.misses} misses", "INFO", condition=self.args.verbose and not self.args.json)
+        if self.http_client.disk_cache:
+            cache = self.http_client.disk_cache
+            ptprinthelper.ptprint(f"HTTP disk cache: {cache.hits} hits, {cache.revalidated} revalidated, {cache.misses} misses", "INFO", condition=self.args.verbose and not self.args.json)
+        for host, rate in self.http_client.rate_control.hosts.items():
+            if rate.throttled:
+                ptprinthelper.ptprint(f"Rate control {host}: {rate.throttled} throttled responses, {rate.concurrency}/{rate.max_concurrency} requests in flight, {rate.interval:.2f}s between requests", "INFO", condition=self.args.verbose and not self.args.json)
+
+        self.http_client.trace.close()
+        self.ptjsonlib.add_properties({"requestsByTest": self.http_client.trace.summary()})
+        if self.args.verbose:
+            self.print_requests_by_test()
 
-        self.helpers._check_if_blocked_by_server(self.base_response.url)
-
-        if "SETTINGS" in self.args.tests:
-            self.source_discover.wordlist_discovery("settings", title="settings files")
+        self.ptjsonlib.set_status("finished")
+        self.events.emit("finished", status="finished", requestsByTest=self.http_client.trace.summary())
+        if not self.events.to_stdout: # Streamed result replaces the final JSON
+            ptprinthelper.ptprint(self.ptjsonlib.get_result_json(), "", self.args.json)
+
+    def print_requests_by_test(self):
+        ptprinthelper.ptprint(f"Requests by test", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
+        ptprinthelper.ptprint(f"TEST         REQUESTS  TIME [s]  MEDIAN [ms]  KB", "TEXT", condition=not self.args.json, indent=4, colortext="TITLE")
+        for row in self.http_client.trace.summary():
+            ptprinthelper.ptprint(f"{row['test']:<13}{row['requests']:>8}{row['totalLatency']:>10.1f}{row['medianLatency'] * 1000:>13.1f}{row['bytes'] // 1024:>8}", "TEXT", condition=not self.args.json, indent=4)
+
+    def schedule_tests(self, scheduler) -> None:
+        """
+        Declares selected tests with the resources they need and provide.
+        Independent tests run concurrently, output is printed in declaration order.
+        """
+        tests = set(self.args.tests)
+        wordlist_tests = [
+            ("DANGEROUS", dict(wordlist="dangerous", title="access to dangerous scripts", method="get", show_responses=True)),
+            ("SETTINGS",  dict(wordlist="settings", title="settings files")),
+            ("FPD",       dict(wordlist="fpd", title="Full Path Disclosure vulnerability", method="get")),
+            ("CONFIG",    dict(wordlist="configs", title="configuration files or pages")),
+            ("LOGS",      dict(wordlist="logs", title="log files")),
+            ("MNGMNT",    dict(wordlist="managements", title="management interface")),
+            ("INFPG",     dict(wordlist="informations", title="information pages")),
+            ("STATS",     dict(wordlist="statistics", title="statistics")),
+            ("BACKUP",    dict(wordlist="backups", title="backup files or directories")),
+            ("REPO",      dict(wordlist="repositories", title="repositories")),
+            ("README",    dict(wordlist="readme" if self.args.readme else "readme_small_root", title="readme files in root directory")),
+        ]
 
-        if "FPD" in self.args.tests:
-            self.source_discover.wordlist_discovery("fpd", title="Full Path Disclosure vulnerability", method="get")
+        if "INFO" in tests:
+            scheduler.add("INFO", lambda: self.helpers.parse_site_info_from_rest(rest_response=self.rest_response, base_response=self.base_response, is_cloudflare=self.is_cloudflare))
+        if "ICONS" in tests:
+            scheduler.add("ICONS", lambda: self.helpers.collect_favicon_hashes_from_html(homepage=self.homepage))
+        if "GOOGLE" in tests:
+            scheduler.add("GOOGLE", lambda: self.helpers.parse_google_identifiers(homepage=self.homepage))
+        if "COMMENTS" in tests:
+            scheduler.add("COMMENTS", lambda: self.helpers.extract_and_print_html_comments(homepage=self.homepage))
+        if "WPS" in tests or "VERSION" in tests:
+            scheduler.add("VERSION", self._test_version, provides=["version"])
+        if "ROBOTS" in tests:
+            scheduler.add("ROBOTS", lambda: self.helpers.print_robots_txt(robots_txt_response=self.robots_txt_response))
+        if "SITEMAP" in tests:
+            scheduler.add("SITEMAP", lambda: self.helpers.process_sitemap(robots_txt_response=self.robots_txt_response))
+
+        for test_name, discovery_kwargs in wordlist_tests:
+            if test_name in tests:
+                scheduler.add(test_name, lambda kwargs=discovery_kwargs: self.source_discover.wordlist_discovery(**kwargs))
+            if test_name == "FPD" and ("ADMIN" in tests or self.args.password):
+                scheduler.add("ADMIN", self._test_admin, provides=["admin"])
+
+        if "PLUGINS" in tests:
+            scheduler.add("PLUGINS", self._test_plugins, provides=["plugins", "themes"])
+
+        if "WPS" in tests:
+            scheduler.add("WPS", self._test_wpscan, requires=["version", "plugins", "themes"])
+
+        if "API" in tests:
+            scheduler.add("API", lambda: self.helpers.parse_namespaces_from_rest(rest_response=self.rest_response))
+
+        # Users, posts crawl is shared by all tests working with posts
+        user_tests = self.user_discover.get_tests()
+        if tests & {"USERAPIP", "YOAST", "EMAILS", "POSTS", "EXTURLS"}:
+            scheduler.add("CRAWL", self.user_discover.crawl_posts, provides=["posts"], silent=True)
+        for test_name, func in user_tests.items():
+            if test_name in tests:
+                scheduler.add(test_name, func, requires=["posts"] if test_name in ["USERAPIP", "YOAST"] else [], provides=["users"])
+        if tests & set(user_tests):
+            scheduler.add("USERS", self.user_discover.print_summary, requires=["users"])
 
-        if "ADMIN" in self.args.tests or self.args.password:
-            is_administration_available = self.source_discover.wordlist_discovery("admins", title="admin pages", show_responses=True)
+        if self.args.password:
+            scheduler.add("PASSWORD", self._test_password_guessing, requires=["users", "admin"])
 
-        if "CONFIG" in self.args.tests:
-            self.source_discover.wordlist_discovery("configs", title="configuration files or pages")
+        if "EMAILS" in tests:
+            scheduler.add("EMAILS", self.email_scraper.print_result, requires=["posts"])
 
-        if "LOGS" in self.args.tests:
-            self.source_discover.wordlist_discovery("logs", title="log files")
+        if "POSTS" in tests:
+            scheduler.add("POSTS", self._test_posts, requires=["posts", "users"])
 
-        if "MNGMNT" in self.args.tests:
-            self.source_discover.wordlist_discovery("managements", title="management interface")
+        if "MEDIA" in tests:
+            scheduler.add("MEDIA", self._test_media, requires=["users"])
 
-        if "INFPG" in self.args.tests:
-            self.source_discover.wordlist_discovery("informations", title="information pages")
+        if "EXTURLS" in tests:
+            scheduler.add("EXTURLS", self._test_external_urls, requires=["posts"])
 
-        if "STATS" in self.args.tests:
-            self.source_discover.wordlist_discovery("statistics", title="statistics")
+        if "DIRLIST" in tests:
+            # Directory listing is tested on directories collected by all previous tests
+            scheduler.add("DIRLIST", self._test_directory_listing, barrier=True)
 
-        if "BACKUP" in self.args.tests:
-            self.source_discover.wordlist_discovery("backups", title="backup files or directories")
+    def _test_version(self):
+        self.wp_version = self.helpers.get_wordpress_version(base_response=self.base_response, rss_response=self.rss_response, meta_tags=self.meta_tags, head_method_allowed=self.head_method_allowed)
+        if self.wp_version:
+            self.events.emit("version", version=self.wp_version)
+        if "VERSION" in self.args.tests:
+            self.helpers.print_supported_wordpress_versions(wp_version=self.wp_version)
 
-        if "REPO" in self.args.tests:
-            self.source_discover.wordlist_discovery("repositories", title="repositories")
+    def _test_admin(self):
+        self.is_administration_available = self.source_discover.wordlist_discovery("admins", title="admin pages", show_responses=True)
 
-        if "README" in self.args.tests:
-            if self.args.readme:
-                self.source_discover.wordlist_discovery("readme", title="readme files in root directory")
-            else:
-                self.source_discover.wordlist_discovery("readme_small_root", title="readme files in root directory")
-
-        if "PLUGINS" in self.args.tests:
-            ptprinthelper.ptprint(f"Security plugins detection", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
-            sectoolident = SecurityToolsIdentifier(self.args, self.ptjsonlib)
-            results = sectoolident.detect_plugins()
-            if not results:
-                ptprinthelper.ptprint(f"No security plugin detected", "VULN", condition=not self.args.json, indent=4)
-            else:
-                for plugin, evidence in results.items():
-                    ptprinthelper.ptprint(f"{plugin}", "OK", condition=not self.args.json, indent=4)
-                    if self.args.verbose:
-                        for item in evidence:
-                            ptprinthelper.ptprint(f"{item}", "ADDITIONS", colortext=True, condition=not self.args.json, indent=8)
-
-            plugins: list = self.source_discover.plugin_themes_discovery(response=self.base_response, content_type="plugin")
-            if self.args.plugins:
-                self.source_discover.wordlist_discovery("plugins", title="Dictionary plugins")
-            themes: list = self.source_discover.plugin_themes_discovery(response=self.base_response, content_type="theme")
+    def _test_plugins(self):
+        from modules.security_tools_identifier import SecurityToolsIdentifier
+        ptprinthelper.ptprint(f"Security plugins detection", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
+        sectoolident = SecurityToolsIdentifier(self.args, self.ptjsonlib)
+        results = sectoolident.detect_plugins()
+        if not results:
+            ptprinthelper.ptprint(f"No security plugin detected", "VULN", condition=not self.args.json, indent=4)
         else:
-            plugins, themes = [], []
-
-        if "WPS" in self.args.tests:
-            try:
-                self.wpscan_api.run(wp_version=self.wp_version, plugins=plugins, themes=themes)
-            except Exception as e:
-                pass
-
-        if "API" in self.args.tests:
-            self.helpers.parse_namespaces_from_rest(rest_response=self.rest_response)
-
-        self.user_discover.run()
-        enumerated_users = self.user_discover.USERS_TABLE.get_users()
-
-        if self.args.password:
-            ptprinthelper.ptprint(f"Password guessing attack", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
-
-            if is_administration_available:
-                guessing = Guessing(args, self.ptjsonlib)
-                usernames = [user.get("slug") for user in self.user_discover.USERS_TABLE.get_users() if user.get("slug")]
-                weak_passwords = [line.strip() for line in open(load_wordlist_file("passwords.txt", None), "r", encoding="utf-8")]
-
-                successful_logins, status = guessing.test_login_protection_and_weak_passwords(usernames, weak_passwords)
-                if successful_logins:
-                    for l, p in successful_logins:
-                        ptprinthelper.ptprint(f"{l} : {p}", "VULN", condition=not self.args.json, indent=4)
-                else:
-                    ptprinthelper.ptprint(f"No accounts guessed", "OK", condition=not self.args.json, indent=4)
-
-                if status == "blocked":
-                    ptprinthelper.ptprint(f"Login attempts were blocked by protection mechanisms", "OK", condition=not self.args.json, indent=4)
-            else:
-                ptprinthelper.ptprint(f"Administration area is not accessible, skipping password attack", "OK", condition=not self.args.json, indent=4)
-
-        if "EMAILS" in self.args.tests:
-            self.email_scraper.print_result()
-
-        if "POSTS" in self.args.tests:
-            all_posts = self.user_discover._scrape_posts() if not self.user_discover.was_crawled_posts else self.user_discover.all_posts
-            extracted = []
-            ptprinthelper.ptprint(f"Discovered posts ({'links' if not self.args.verbose else 'link, id, author, date, title'})", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
-            for post in all_posts:
-                extracted.append({
-                    "id": post["id"],
-                    "date": post["date"],
-                    "modified": post["modified"],
-                    "slug": post["slug"],
-                    "status": post["status"],
-                    "type": post["type"],
-                    "link": post["link"],
-                    "title": post["title"]["rendered"],
-                    "author": post["author"]
-                })
-
-                ptprinthelper.ptprint(post["link"], "Text", colortext=False, condition=not self.args.json, indent=4, clear_to_eol=True)
+            for plugin, evidence in results.items():
+                ptprinthelper.ptprint(f"{plugin}", "OK", condition=not self.args.json, indent=4)
                 if self.args.verbose:
-                    ptprinthelper.ptprint(f'{post["id"]}, {self.user_discover.USERS_TABLE.get_user_slug_or_name(post["author"])}, {post["date"]}, {post["title"]["rendered"]}', "ADDITIONS", colortext=True, condition=not self.args.json, indent=4, clear_to_eol=True)
-
-            if not all_posts:
-                ptprint(f"No posts discovered", "OK", condition=not self.args.json, indent=4)
-
-            if self.args.output:
-                self.helpers.save_posts_csv(all_posts, enumerated_users)
-
-        if "MEDIA" in self.args.tests:
-            media_urls: list = self.source_discover.print_media(self.user_discover.USERS_TABLE.get_users()) # Scrape all uploaded public media
-            # Parse unique directories, add media to it & run directory listing test
-            self.http_client._stored_urls.update(media_urls)
-            with open(load_wordlist_file("directories.txt", None)) as f:
-                entries = [line.strip() for line in f if line.strip()]
-
-            urls = []
-            for entry in entries:
-                if not entry.startswith("/"):
-                    entry = "/" + entry
-                urls.append(self.BASE_URL + entry)
-
-            self.http_client._stored_urls.update(urls)
-
-            if self.args.save_media:
-                MediaDownloader(args=self.args, ptjsonlib=self.ptjsonlib).save_media(media_urls)
-        
-        if "EXTURLS" in self.args.tests:
-            all_posts = self.user_discover._scrape_posts() if not self.user_discover.was_crawled_posts else self.user_discover.all_posts
-
-            ptprinthelper.ptprint(f"Discovered external links (from posts)", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
-
-            for e in sorted(list(self.user_discover.external_links)):
-                ptprinthelper.ptprint(e, "TEXT", condition=not self.args.json, flush=True, indent=4, clear_to_eol=True)
-
-            if not self.user_discover.external_links:
-                ptprinthelper.ptprint("No external links found", "OK", condition=not self.args.json, flush=True, indent=4, clear_to_eol=True)
+                    for item in evidence:
+                        ptprinthelper.ptprint(f"{item}", "ADDITIONS", colortext=True, condition=not self.args.json, indent=8)
+
+        self.plugins = self.source_discover.plugin_themes_discovery(homepage=self.homepage, content_type="plugin")
+        if self.args.plugins or self.args.plugins_budget:
+            self.source_discover.wordlist_discovery("plugins", title="Dictionary plugins", budget=self.args.plugins_budget)
+        self.themes = self.source_discover.plugin_themes_discovery(homepage=self.homepage, content_type="theme")
+
+    def _test_wpscan(self):
+        try:
+            self.wpscan_api.run(wp_version=self.wp_version, plugins=self.plugins, themes=self.themes, versions=self.source_discover.component_versions)
+        except Exception as e:
+            pass
+
+    def _test_password_guessing(self):
+        ptprinthelper.ptprint(f"Password guessing attack", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
+
+        if self.is_administration_available:
+            from modules.guessing import Guessing
+            from modules.helpers import load_wordlist_file
+            guessing = Guessing(self.args, self.ptjsonlib)
+            usernames = [user.get("slug") for user in self.user_discover.USERS_TABLE.get_users() if user.get("slug")]
+            weak_passwords = [line.strip() for line in open(load_wordlist_file("passwords.txt", None), "r", encoding="utf-8")]
+
+            successful_logins, status = guessing.test_login_protection_and_weak_passwords(usernames, weak_passwords)
+            if successful_logins:
+                for l, p in successful_logins:
+                    ptprinthelper.ptprint(f"{l} : {p}", "VULN", condition=not self.args.json, indent=4)
+                    self.events.emit("credentials", username=l, password=p)
+            else:
+                ptprinthelper.ptprint(f"No accounts guessed", "OK", condition=not self.args.json, indent=4)
 
-        if "DIRLIST" in self.args.tests:
-            target_domain = urllib.parse.urlparse(self.BASE_URL).netloc
-            _directories = self.http_client._extract_unique_directories(target_domain)
-            self.source_discover.wordlist_discovery(list(set(_directories)), title="directory listing", search_in_response="index of", method="get")
+            if status == "blocked":
+                ptprinthelper.ptprint(f"Login attempts were blocked by protection mechanisms", "OK", condition=not self.args.json, indent=4)
+        else:
+            ptprinthelper.ptprint(f"Administration area is not accessible, skipping password attack", "OK", condition=not self.args.json, indent=4)
 
-        self.ptjsonlib.set_status("finished")
-        ptprinthelper.ptprint(self.ptjsonlib.get_result_json(), "", self.args.json)
+    def _test_posts(self):
+        all_posts = self.user_discover.crawl_posts()
+        enumerated_users = self.user_discover.USERS_TABLE.get_users()
+        extracted = []
+        ptprinthelper.ptprint(f"Discovered posts ({'links' if not self.args.verbose else 'link, id, author, date, title'})", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
+        for post in all_posts:
+            extracted.append({
+                "id": post["id"],
+                "date": post["date"],
+                "modified": post["modified"],
+                "slug": post["slug"],
+                "status": post["status"],
+                "type": post["type"],
+                "link": post["link"],
+                "title": post["title"],
+                "author": post["author"]
+            })
+
+            ptprinthelper.ptprint(post["link"], "Text", colortext=False, condition=not self.args.json, indent=4, clear_to_eol=True)
+            if self.args.verbose:
+                ptprinthelper.ptprint(f'{post["id"]}, {self.user_discover.USERS_TABLE.get_user_slug_or_name(post["author"])}, {post["date"]}, {post["title"]}', "ADDITIONS", colortext=True, condition=not self.args.json, indent=4, clear_to_eol=True)
+
+        if not all_posts:
+            ptprint(f"No posts discovered", "OK", condition=not self.args.json, indent=4)
+
+        if self.args.output:
+            self.helpers.save_posts_csv(all_posts, enumerated_users)
+
+    def _test_media(self):
+        from modules.helpers import load_wordlist_file
+        media_urls: list = self.source_discover.print_media(self.user_discover.USERS_TABLE.get_users()) # Scrape all uploaded public media
+        # Parse unique directories, add media to it & run directory listing test
+        self.http_client._stored_urls.update(media_urls)
+        with open(load_wordlist_file("directories.txt", None)) as f:
+            entries = [line.strip() for line in f if line.strip()]
+
+        urls = []
+        for entry in entries:
+            if not entry.startswith("/"):
+                entry = "/" + entry
+            urls.append(self.BASE_URL + entry)
+
+        self.http_client._stored_urls.update(urls)
+
+        if self.args.save_media:
+            from modules.plugins.media_downloader import MediaDownloader
+            MediaDownloader(args=self.args, ptjsonlib=self.ptjsonlib).save_media(media_urls)
+
+    def _test_external_urls(self):
+        self.user_discover.crawl_posts()
+
+        ptprinthelper.ptprint(f"Discovered external links (from posts)", "TITLE", condition=not self.args.json, colortext=True, newline_above=True)
+
+        for e in sorted(list(self.user_discover.external_links)):
+            ptprinthelper.ptprint(e, "TEXT", condition=not self.args.json, flush=True, indent=4, clear_to_eol=True)
+
+        if not self.user_discover.external_links:
+            ptprinthelper.ptprint("No external links found", "OK", condition=not self.args.json, flush=True, indent=4, clear_to_eol=True)
+
+    def _test_directory_listing(self):
+        target_domain = urllib.parse.urlparse(self.BASE_URL).netloc
+        _directories = self.http_client._extract_unique_directories(target_domain)
+        self.source_discover.wordlist_discovery(list(set(_directories)), title="directory listing", search_in_response="index of", method="get")
 
 
 def get_tests(for_help=False):
@@ -328,35 +426,53 @@ def get_help():
             "ptwordpress -u https://www.example.com",
             "ptwordpress -u https://www.example.com -w ~/mywordlist",
             "ptwordpress -u https://www.example.com -o ./example -sm ./media",
+            "ptwordpress -l targets.txt -lc 8 -j",
         ]},
         {"Info": [
             "If no wordlist option set, default will be used",
         ]},
         {"options": [
             ["-u",   "--url",                    "<url>",                "Connect to URL"],
+            ["-l",   "--url-list",               "<file>",               "Scan URLs from file, one per line (- for stdin)"],
+            ["-lc",  "--list-concurrency",       "<targets>",            "Number of targets from list scanned at once (default 4)"],
+            ["-mc",  "--max-connections",        "<connections>",        "Max requests in flight for all targets from list (default targets * threads)"],
             ["-rm",  "--readme",                 "",                     "Enable readme dictionary attacks"],
             ["-pd",  "--plugins",                "",                     "Enable plugins dictionary attacks"],
+            ["-pb",  "--plugins-budget",         "<requests|time>",      "Probe plugins dictionary in its order until budget is spent (e.g. 5000, 90s, 10m)"],
             ["-ts",  "--tests",                  "<tests>",              "Specify tests:"],
             *get_tests(for_help=True),
             ["","","","",""],
             ["-o",   "--output",                 "<file>",               "Save emails, users, logins and media urls to files"],
             ["-sm",  "--save-media",             "<folder>",             "Save media to folder"],
             ["-T",   "--timeout",                "<seconds>",            "Set Timeout"],
-            ["-bw",  "--block-wait",             "<miliseconds>",        "Set miliseconds to wait before trying again when blocked"],
+            ["-bw",  "--block-wait",             "<miliseconds>",        "Set miliseconds to wait before trying again when blocked (default Retry-After or backoff)"],
             ["-p",   "--proxy",                  "<proxy>",              "Set Proxy"],
             ["-c",   "--cookie",                 "<cookie>",             "Set Cookie"],
             ["-a",   "--user-agent",             "<agent>",              "Set User-Agent"],
-            ["-d",   "--delay",                  "<miliseconds>",        "Set delay before each request"],
+            ["-d",   "--delay",                  "<miliseconds>",        "Set min delay between requests to host"],
             ["-ar",  "--author-range",           "<author-range>",       "Set custom range for author enumeration (default 1-10)"],
+            ["-am",  "--author-misses",          "<misses>",             "Extend author range until consecutive IDs without user (default 10, 0 for fixed range)"],
+            ["-vc",  "--version-candidates",     "<versions>",           "Stop version fingerprinting by sources when at most this many versions remain (default 1)"],
             ["-w",   "--wordlist",               "<directory>",          "Set custom wordlist directory"],
             ["-H",   "--headers",                "<header:value>",       "Set Header(s)"],
             ["-wpsk","--wpscan-key",             "<api-key>",            "Set WPScan API key (https://wpscan.com)"],
             ["-pw",  "--password",               "[wordlist]",           "Run password attack on enumerated users"],
             ["-t",   "--threads",                "<threads>",            "Number of threads (default 10)"],
+            ["-ae",  "--async-engine",           "[connections]",        "Send dictionary probes by asyncio engine (default 1000 in flight, requires aiohttp)"],
+            ["-nc",  "--no-calibration",         "",                     "Do not calibrate dictionary probes against responses to paths that do not exist"],
             ["-r",   "--redirects",              "",                     "Follow redirects (default False)"],
-            ["-dl",  "--download",               "<directory>",          "Download all versions of Wordpress"],
+            ["-dl",  "--download",               "<directory>",          "Download all versions of Wordpress and build version fingerprints from them"],
             ["-gp",  "--get-plugins",            "<filename>",           "Retrieve list of all plugins from wordpress.com api (default plugins.txt in wordlist directory)"],
-            ["-C",   "--cache",                  "",                     "Cache HTTP communication"],
+            ["-bi",  "--build-index",            "",                     "Compile fingerprint databases into index in cache directory (done on first scan otherwise)"],
+            ["-C",   "--cache",                  "",                     "Cache HTTP communication on disk, revalidated on next scans"],
+            ["-cd",  "--cache-dir",              "<directory>",          "Set cache directory (default ~/.cache/ptwordpress)"],
+            ["-ct",  "--cache-ttl",              "<hours>",              "Use cached responses without revalidation for hours (default 24)"],
+            ["-cs",  "--cache-size",             "<MB>",                 "Max size of cache (default 512)"],
+            ["-ms",  "--memo-size",              "<MB>",                 "Memory for responses reused within the scan (default 64, 0 to disable)"],
+            ["-jr",  "--journal",                "<file>",               "Record scan progress to journal file"],
+            ["-tr",  "--trace",                  "<file>",               "Write every request (test, latency, bytes, status) to JSONL file"],
+            ["-rs",  "--resume",                 "<file>",               "Resume interrupted scan from journal file, skip finished work"],
+            ["-nd",  "--ndjson",                 "",                     "Stream findings as NDJSON events to stdout (or to --socket-address:--socket-port)"],
             ["-v",   "--version",                "",                     "Show script version and exit"],
             ["-vv",  "--verbose",                "",                     "Enable verbose output"],
             ["-h",   "--help",                   "",                     "Show this help message and exit"],
@@ -364,8 +480,31 @@ def get_help():
         ]
         }]
 
+def parse_range(value):
+    from ptlibs import ptmisclib # Imports requests, not needed by -h and -v
+    return ptmisclib.parse_range(value)
+
+def parse_pairs(value):
+    from ptlibs import ptmisclib
+    return ptmisclib.pairs(value)
+
+def parse_budget(value):
+    """Budget of the plugins dictionary, positive number of requests or time with s, m or h suffix"""
+    units = {"s": 1, "m": 60, "h": 3600}
+    try:
+        if value[-1:].lower() in units:
+            budget = ("seconds", float(value[:-1]) * units[value[-1].lower()])
+        else:
+            budget = ("requests", int(value))
+    except ValueError:
+        budget = None
+    if budget is None or not 0 < budget[1] < float("inf"):
+        raise argparse.ArgumentTypeError(f"Invalid budget '{value}', use number of requests or time (e.g. 5000, 90s, 10m)")
+    return budget
+
 def validate_wordlist(path):
     if path == "__DEFAULT__":
+        from modules.helpers import load_wordlist_file
         return [line.strip() for line in open(load_wordlist_file("passwords.txt", None)) if line.strip()]
     if not os.path.isfile(path):
         raise argparse.ArgumentTypeError(f"Wordlist '{path}' does not exist.")
@@ -377,8 +516,10 @@ def parse_args():
     parser = argparse.ArgumentParser(add_help="False", description=f"{SCRIPTNAME} <options>", allow_abbrev=False)
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("-u",     "--url", type=str, help="Provide a URL")
+    group.add_argument("-l",     "--url-list", type=str, help="Provide a file with URLs")
     group.add_argument("-dl",    "--download", nargs="?", const=True, help="Download mode")
     group.add_argument("-gp",    "--get-plugins", nargs="?", const=True, help="Get plugins mode")
+    group.add_argument("-bi",    "--build-index", action="store_true", help="Build fingerprint index mode")
     parser.add_argument("-ts", "--tests",          type=lambda s: s.upper(), nargs="+", choices=choices, default=choices)
     parser.add_argument("-p",    "--proxy",           type=str)
     parser.add_argument("-sm",   "--save-media",      type=str)
@@ -388,18 +529,33 @@ def parse_args():
     parser.add_argument("-wpsk", "--wpscan-key",      type=str)
     parser.add_argument("-bw",   "--block-wait",      type=int)
     parser.add_argument("-a",    "--user-agent",      type=str, default="Penterep Tools")
-    parser.add_argument("-ar",   "--author-range",    type=ptmisclib.parse_range, default=(1, 10))
-    parser.add_argument("-ir",   "--id-range",        type=ptmisclib.parse_range, default=(1, 10))
-    parser.add_argument("-H",    "--headers",         type=ptmisclib.pairs, nargs="+")
+    parser.add_argument("-ar",   "--author-range",    type=parse_range, default=(1, 10))
+    parser.add_argument("-am",   "--author-misses",   type=int, default=10)
+    parser.add_argument("-vc",   "--version-candidates", type=int, default=1)
+    parser.add_argument("-ir",   "--id-range",        type=parse_range, default=(1, 10))
+    parser.add_argument("-H",    "--headers",         type=parse_pairs, nargs="+")
     parser.add_argument("-pd",   "--plugins",         action="store_true", help="Plugins attack")
+    parser.add_argument("-pb",   "--plugins-budget",  type=parse_budget)
     parser.add_argument("-r",    "--redirects",       action="store_true")
     parser.add_argument("-rm",   "--readme",          action="store_true")
     parser.add_argument("-C",    "--cache",           action="store_true")
+    parser.add_argument("-cd",   "--cache-dir",       type=str, default=os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "ptwordpress"))
+    parser.add_argument("-ct",   "--cache-ttl",       type=float, default=24)
+    parser.add_argument("-cs",   "--cache-size",      type=int, default=512)
+    parser.add_argument("-ms",   "--memo-size",       type=int, default=64)
+    parser.add_argument("-jr",   "--journal",         type=str)
+    parser.add_argument("-rs",   "--resume",          type=str)
+    parser.add_argument("-tr",   "--trace",           type=str)
+    parser.add_argument("-nd",   "--ndjson",          action="store_true")
     parser.add_argument("-j",    "--json",            action="store_true")
     parser.add_argument("-vv",    "--verbose",        action="store_true")
     parser.add_argument("-d",    "--delay",           type=float, default=0, help="Delay between requests in seconds")
     parser.add_argument("-T",    "--timeout",         type=int, default=10)
     parser.add_argument("-t",    "--threads",         type=int, default=10)
+    parser.add_argument("-lc",   "--list-concurrency", type=int, default=4)
+    parser.add_argument("-mc",   "--max-connections", type=int)
+    parser.add_argument("-ae",   "--async-engine",    type=int, nargs="?", const=1000)
+    parser.add_argument("-nc",   "--no-calibration",  action="store_true")
     parser.add_argument("-v",    "--version",         action='version', version=f'{SCRIPTNAME} {__version__}')
     parser.add_argument("-pw", "--password", nargs="?", const="__DEFAULT__", type=validate_wordlist, help="Optional wordlist path or default.")
     parser.add_argument("--socket-address",          type=str, default=None)
@@ -411,25 +567,43 @@ def parse_args():
 
     args = parser.parse_args()
 
-    # Conditional validation: URL must be provided unless -dl or -gp is used
-    if not args.url and not (args.download or args.get_plugins):
-        sys.exit("The --url argument is required unless --download or --get-plugins is specified.")
+    # Conditional validation: URL must be provided unless -l, -dl, -gp or -bi is used
+    if not (args.url or args.url_list) and not (args.download or args.get_plugins or args.build_index):
+        sys.exit("The --url argument is required unless --url-list, --download, --get-plugins or --build-index is specified.")
 
+    from ptlibs import ptnethelper
     args.timeout = args.timeout if not args.proxy else None
     args.proxy = {"http": args.proxy, "https": args.proxy} if args.proxy else None
     args.headers = ptnethelper.get_request_headers(args)
-    args.threads = 1 if args.delay != 0 else args.threads # Run in one thread if delay parameter provided.
     if args.output:
         args.output = os.path.abspath(args.output)
 
+    if args.resume:
+        if args.url and not os.path.isfile(args.resume):
+            sys.exit(f"Journal '{args.resume}' does not exist.")
+        args.journal = args.resume # Resumed scan continues in the same journal
+
+    if args.ndjson and not (args.socket_address and args.socket_port):
+        args.json = True # Events own stdout, console output is suppressed
+
+    if args.async_engine and importlib.util.find_spec("aiohttp") is None:
+        sys.exit("The --async-engine argument requires aiohttp (pip install ptwordpress[async]).")
+
     if args.download:
+        from modules.wordpress_downloader.wordpres_downloader import WordpressDownloader
         WordpressDownloader(download_path=args.download, ptjsonlib=ptjsonlib.PtJsonLib())
         sys.exit(0)
 
     if args.get_plugins:
+        from modules.wordpress_downloader.plugins_downloader import WordpressPluginsDownloader
         WordpressPluginsDownloader(args=args, ptjsonlib=ptjsonlib.PtJsonLib(), download_path=args.get_plugins).run()
         sys.exit(0)
 
+    if args.build_index:
+        from modules.fingerprint_index import build_index
+        print(f"Fingerprint index written to {build_index(args.cache_dir)}")
+        sys.exit(0)
+
     if args.wordlist:
         args.wordlist = os.path.abspath(args.wordlist)
         if not os.path.isdir(args.wordlist):
@@ -439,10 +613,18 @@ def parse_args():
     ptprinthelper.print_banner(SCRIPTNAME, __version__, args.json, space=0)
     return args
 
+def scan_target(args, ptjsonlib_object):
+    """Scan args.url, used by batch mode worker processes"""
+    PtWordpress(args, ptjsonlib_object).run(args)
+
 def main():
     global SCRIPTNAME
     SCRIPTNAME = "ptwordpress"
     args = parse_args()
+    if args.url_list:
+        from modules.batch import BatchScanner, load_targets
+        BatchScanner(args, scan_target).run(load_targets(args.url_list))
+        return
     script = PtWordpress(args)
     script.run(args)
 
@@ -23,6 +23,7 @@ setuptools.setup(
     ],
     python_requires='>=3.9',
     install_requires=["ptlibs>=1.0.58,<2", "bs4", "lxml", "defusedxml", "tqdm"],
+    extras_require={"async": ["aiohttp"]},
     entry_points = {'console_scripts': ['ptwordpress = ptwordpress.ptwordpress:main']},
     include_package_data= True,
     long_description=long_description,
@@ -0,0 +1,65 @@
+"""
+Per-host adaptive rate control (modules/rate_control.py).
+
+Usage:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ptwordpress"))
+
+from modules.rate_control import HostRateControl, HostBlockedError, is_throttling_response
+
+
+class Response:
+    def __init__(self, status_code=200, body=b"", headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers or {}
+
+
+class RateControlTest(unittest.TestCase):
+    def test_throttling_responses(self):
+        self.assertTrue(is_throttling_response(Response(429)))
+        self.assertTrue(is_throttling_response(Response(403, b"<title>Just a moment...</title>")))
+        self.assertFalse(is_throttling_response(Response(403, b"<form>Please fill in the captcha to comment</form>")))
+        self.assertFalse(is_throttling_response(Response(404)))
+
+    def throttle(self, rate, times):
+        for _ in range(times):
+            rate.update(time.monotonic(), Response(429, headers={"Retry-After": "0"}))
+
+    def test_host_throttling_at_maximum_backoff_is_blocked(self):
+        rate = HostRateControl(10)
+        self.throttle(rate, 7) # Backoff 1, 2, 4, ... 60 s
+        self.assertFalse(rate.blocked)
+        self.throttle(rate, 1)
+        self.assertTrue(rate.blocked)
+        self.assertRaises(HostBlockedError, rate.acquire)
+        self.assertRaises(HostBlockedError, rate.try_reserve)
+
+    def test_successful_response_resets_blocking(self):
+        rate = HostRateControl(10)
+        self.throttle(rate, 7)
+        rate.update(time.monotonic(), Response(200))
+        self.throttle(rate, 1)
+        self.assertFalse(rate.blocked)
+
+    def test_unblock(self):
+        rate = HostRateControl(10)
+        self.throttle(rate, 8)
+        rate.unblock()
+        self.assertFalse(rate.blocked)
+        self.assertEqual(rate.paused_until, 0)
+        self.throttle(rate, 1) # Host still throttling
+        self.assertFalse(rate.blocked)
+        self.throttle(rate, 1)
+        self.assertTrue(rate.blocked)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Pagination of REST API collections (modules/rest_paginator.py).
+
+Usage:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import json
+import threading
+import unittest
+import argparse
+import urllib.parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ptwordpress"))
+
+from modules.rest_paginator import RestPaginator
+
+
+class Response:
+    def __init__(self, status_code, data, headers=None):
+        self.status_code = status_code
+        self.content = json.dumps(data).encode()
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class Collection:
+    """HTTP client serving a collection of total items, pages past the last one are answered by 400 like WordPress does"""
+    def __init__(self, total, total_pages_header=True, failing_page=None):
+        self.total = total
+        self.total_pages_header = total_pages_header
+        self.failing_page = failing_page
+        self.pages = []
+        self._lock = threading.Lock()
+
+    def send_request(self, url, method="GET", **kwargs):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+        page, per_page = int(query["page"][0]), int(query["per_page"][0])
+        with self._lock:
+            self.pages.append(page)
+        total_pages = -(-self.total // per_page)
+        headers = {"X-WP-TotalPages": str(total_pages)} if self.total_pages_header else {}
+        if page == self.failing_page:
+            return Response(500, {"code": "internal_server_error"})
+        if page > max(total_pages, 1):
+            return Response(400, {"code": "rest_post_invalid_page_number"})
+        return Response(200, list(range((page - 1) * per_page, min(page * per_page, self.total))), headers)
+
+
+class RestPaginatorTest(unittest.TestCase):
+    def fetch(self, collection, threads=4, **kwargs):
+        pages = []
+        response, items = RestPaginator(argparse.Namespace(threads=threads), collection).fetch("http://example.com/wp-json/wp/v2/posts", per_page=10,
+                                                                                              on_page=lambda page, items: pages.append(page), **kwargs)
+        return items, pages
+
+    def test_pages_by_total_pages_header(self):
+        collection = Collection(95)
+        items, pages = self.fetch(collection)
+        self.assertEqual(items, list(range(95)))
+        self.assertEqual(pages, list(range(1, 11)))
+        self.assertEqual(sorted(collection.pages), list(range(1, 11)))
+
+    def test_fallback_stops_at_short_page(self):
+        collection = Collection(95, total_pages_header=False)
+        items, pages = self.fetch(collection)
+        self.assertEqual(items, list(range(95)))
+        self.assertEqual(pages, list(range(1, 11)))
+        self.assertLessEqual(max(collection.pages), 13) # Probed in windows of --threads pages
+
+    def test_fallback_stops_at_page_past_the_last_one(self):
+        collection = Collection(100, total_pages_header=False)
+        items, pages = self.fetch(collection, threads=1)
+        self.assertEqual(items, list(range(100)))
+        self.assertEqual(collection.pages, list(range(1, 12)))
+
+    def test_fallback_stops_at_failed_page(self):
+        collection = Collection(100, total_pages_header=False, failing_page=4)
+        items, pages = self.fetch(collection)
+        self.assertEqual(items, list(range(30)))
+        self.assertEqual(pages, [1, 2, 3])
+
+    def test_fallback_stops_at_max_pages(self):
+        collection = Collection(1000, total_pages_header=False)
+        items, pages = self.fetch(collection, max_pages=7)
+        self.assertEqual(items, list(range(70)))
+        self.assertEqual(max(collection.pages), 7)
+
+    def test_first_page_not_a_list(self):
+        collection = Collection(0)
+        collection.send_request = lambda url, **kwargs: Response(401, {"code": "rest_forbidden"})
+        self.assertEqual(self.fetch(collection), (None, []))
+
+    def test_known_pages_are_not_requested(self):
+        collection = Collection(50)
+        items, pages = self.fetch(collection, known_page=lambda page: list(range((page - 1) * 10, page * 10)) if page <= 3 else None)
+        self.assertEqual(items, list(range(50)))
+        self.assertEqual(sorted(collection.pages), [1, 4, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Selection of version identifying files from hashed releases (modules/wordpress_downloader/wordpres_downloader.py).
+
+Usage:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import zipfile
+import hashlib
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ptwordpress"))
+
+from modules.wordpress_downloader.wordpres_downloader import select_sources, hash_release, BADGE_FILE
+
+
+def row(version, path, md5, min_version, max_version, reason="contained"):
+    return {"Version": version, "File": path, "MD5": md5, "MinVersion": min_version, "MaxVersion": max_version, "Reason": reason}
+
+
+class SelectSourcesTest(unittest.TestCase):
+    def test_shortest_run_then_smallest_file(self):
+        releases = {
+            "1.0": {"wp-includes/a.js": ["a1", 10], "wp-includes/b.css": ["b1", 5]},
+            "1.1": {"wp-includes/a.js": ["a1", 10], "wp-includes/b.css": ["b2", 5]},
+            "1.2": {"wp-includes/a.js": ["a2", 10], "wp-includes/b.css": ["b2", 5]},
+        }
+        self.assertEqual(select_sources(releases), [
+            row("1.0", "wp-includes/b.css", "b1", "1.0", "1.0"),
+            row("1.1", "wp-includes/b.css", "b2", "1.1", "1.2"),
+            row("1.2", "wp-includes/a.js", "a2", "1.2", "1.2"),
+        ])
+
+    def test_hash_returning_in_later_release_is_not_used(self):
+        releases = {
+            "1.0": {"wp-includes/a.js": ["a1", 1], "wp-includes/b.css": ["b1", 100]},
+            "1.1": {"wp-includes/a.js": ["a2", 1], "wp-includes/b.css": ["b2", 100]},
+            "1.2": {"wp-includes/a.js": ["a1", 1], "wp-includes/b.css": ["b3", 100]},
+        }
+        self.assertEqual([r["File"] for r in select_sources(releases)], ["wp-includes/b.css", "wp-includes/a.js", "wp-includes/b.css"])
+
+    def test_versions_sorted_numerically(self):
+        releases = {version: {"wp-includes/version.js": [version, 1]} for version in ["1.10", "1.9", "1.2.1", "1.2"]}
+        self.assertEqual([r["Version"] for r in select_sources(releases)], ["1.2", "1.2.1", "1.9", "1.10"])
+
+    def test_release_without_files_gets_nearest_row(self):
+        releases = {"1.0": {"wp-includes/a.js": ["a1", 1]}, "1.1": {}, "1.2": {"wp-includes/a.js": ["a2", 1]}, "1.3": {"wp-includes/a.js": ["a3", 1]}}
+        rows = select_sources(releases)
+        self.assertEqual(rows[1], row("1.1", "wp-includes/a.js", "a1", "1.0", "1.0", "nearest"))
+        self.assertEqual([r["Reason"] for r in rows], ["contained", "nearest", "contained", "contained"])
+
+    def test_no_static_files(self):
+        self.assertEqual(select_sources({"1.0": {}, "1.1": {}}), [])
+
+
+class HashReleaseTest(unittest.TestCase):
+    def test_static_assets_of_core_directories(self):
+        files = {
+            "wordpress/wp-includes/js/a.js": b"js",
+            "wordpress/wp-admin/css/b.css": b"css",
+            "wordpress/wp-includes/version.php": b"<?php",
+            "wordpress/wp-content/themes/t/style.css": b"theme",
+            f"wordpress/{BADGE_FILE}": b"<svg/>",
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "wordpress-1.0.zip")
+            with zipfile.ZipFile(path, "w") as z:
+                for name, data in files.items():
+                    z.writestr(name, data)
+            fingerprint = hash_release(path)
+        self.assertEqual(fingerprint["files"], {
+            "wp-includes/js/a.js": [hashlib.md5(b"js").hexdigest(), 2],
+            "wp-admin/css/b.css": [hashlib.md5(b"css").hexdigest(), 3],
+            BADGE_FILE: [hashlib.md5(b"<svg/>").hexdigest(), 6],
+        })
+        self.assertEqual(fingerprint["sha256"], {BADGE_FILE: hashlib.sha256(b"<svg/>").hexdigest()})
+
+
+if __name__ == "__main__":
+    unittest.main()
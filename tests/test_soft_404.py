@@ -0,0 +1,101 @@
+"""
+Soft-404 fingerprints of dictionary probes (modules/soft_404.py).
+
+Usage:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ptwordpress"))
+
+from modules.soft_404 import NotFoundFingerprint, SoftNotFoundCalibration, split_probe_url
+
+NAMES = ["k3j9x0qa", "p0w8e7r6t5y4u3i2", "z1x2c3v4b5n6m7l8k9j0h1g2"] # Lengths of SoftNotFoundCalibration.NAME_LENGTHS
+
+
+class Response:
+    def __init__(self, status_code=200, body=b"", headers=None, content_length=True):
+        self.status_code = status_code
+        self.content = body
+        self.headers = dict(headers or {})
+        if content_length:
+            self.headers["Content-Length"] = str(len(body))
+
+
+def catch_all_page(name, content_length=True) -> Response:
+    """Themed 200 page naming the requested path, like most WordPress themes do"""
+    return Response(200, f"<html><h1>Nothing found for /backup/{name}</h1>{'<p>Try a search.</p>' * 50}</html>".encode(), content_length=content_length)
+
+
+class NotFoundFingerprintTest(unittest.TestCase):
+    def test_split_probe_url(self):
+        self.assertEqual(split_probe_url("http://example.com:8080/backup/site.zip"), ("http://example.com:8080/backup/", "site.zip", "zip", ""))
+        self.assertEqual(split_probe_url("http://example.com/backup/old/"), ("http://example.com/backup/", "old", "", "/"))
+
+    def test_catch_all_page_reflecting_the_name(self):
+        fingerprint = NotFoundFingerprint([(name, catch_all_page(name)) for name in NAMES])
+        self.assertFalse(fingerprint.needs_body)
+        url = "http://example.com/backup/wp-config.php.bak"
+        self.assertTrue(fingerprint.matches(url, catch_all_page("wp-config.php.bak"), has_body=True))
+        self.assertTrue(fingerprint.matches(url, Response(200, headers={"Content-Length": catch_all_page("wp-config.php.bak").headers["Content-Length"]}, content_length=False), has_body=False))
+        self.assertFalse(fingerprint.matches(url, Response(200, b"<?php define('DB_PASSWORD', 'secret');" * 200), has_body=True))
+        self.assertFalse(fingerprint.matches(url, Response(403, b"Forbidden"), has_body=True))
+
+    def test_head_response_without_content_length_needs_body(self):
+        fingerprint = NotFoundFingerprint([(name, catch_all_page(name, content_length=False)) for name in NAMES])
+        self.assertTrue(fingerprint.needs_body)
+        url = "http://example.com/backup/site.zip"
+        self.assertIsNone(fingerprint.matches(url, Response(200, content_length=False), has_body=False))
+        self.assertTrue(fingerprint.matches(url, catch_all_page("site.zip", content_length=False), has_body=True))
+
+    def test_redirect_to_location_naming_the_path(self):
+        fingerprint = NotFoundFingerprint([(name, Response(302, headers={"Location": f"http://example.com/?s={name}"})) for name in NAMES])
+        url = "http://example.com/backup/site.zip"
+        self.assertTrue(fingerprint.matches(url, Response(302, headers={"Location": "http://example.com/?s=site.zip"}), has_body=False))
+        self.assertFalse(fingerprint.matches(url, Response(302, headers={"Location": "http://example.com/backup/site.zip/"}), has_body=False))
+
+    def test_status_other_than_200_needs_no_certainty(self):
+        fingerprint = NotFoundFingerprint([(name, Response(403, b"Forbidden", content_length=False)) for name in NAMES])
+        self.assertTrue(fingerprint.matches("http://example.com/backup/site.zip", Response(403, content_length=False), has_body=False))
+
+
+class HttpClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def send_request(self, url, **kwargs):
+        self.urls.append(url)
+        return self.responses.pop(0)
+
+
+class SoftNotFoundCalibrationTest(unittest.TestCase):
+    def test_plain_404_directory_is_calibrated_once(self):
+        client = HttpClient([Response(404)])
+        calibration = SoftNotFoundCalibration(client)
+        self.assertFalse(calibration.is_soft_404("http://example.com/backup/a.zip", Response(200, b"zip"), "GET"))
+        self.assertFalse(calibration.is_soft_404("http://example.com/backup/b.zip", Response(200, b"zip"), "GET"))
+        self.assertEqual(len(client.urls), 1)
+
+    def test_throttled_calibration_is_repeated(self):
+        client = HttpClient([Response(429), Response(200, b"page"), Response(200, b"page"), Response(200, b"page")])
+        calibration = SoftNotFoundCalibration(client)
+        self.assertIsNone(calibration.calibrate("http://example.com/backup/a.zip"))
+        self.assertEqual(calibration.calibrate("http://example.com/backup/b.zip").status, 200)
+        self.assertTrue(calibration.is_soft_404("http://example.com/backup/c.zip", Response(200, b"page"), "GET"))
+        self.assertEqual(len(client.urls), 4)
+
+    def test_head_probe_of_directory_needing_body_is_checked_by_get(self):
+        client = HttpClient([catch_all_page(name, content_length=False) for name in NAMES] + [catch_all_page("site.zip", content_length=False)])
+        calibration = SoftNotFoundCalibration(client)
+        url = "http://example.com/backup/site.zip"
+        self.assertEqual(calibration.probe_method(url, "HEAD"), "HEAD")
+        self.assertTrue(calibration.is_soft_404(url, Response(200, content_length=False), "HEAD"))
+        self.assertEqual(calibration.probe_method(url, "HEAD"), "GET")
+
+
+if __name__ == "__main__":
+    unittest.main()
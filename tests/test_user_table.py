@@ -0,0 +1,68 @@
+"""
+Merge rules of EnumeratedUserTable (modules/user_discover.py).
+
+Usage:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ptwordpress"))
+
+from modules.user_discover import EnumeratedUserTable
+
+
+def user(user_id="", slug="", name=""):
+    return {"id": user_id, "slug": slug, "name": name}
+
+
+class EnumeratedUserTableTest(unittest.TestCase):
+    def merged(self, *users) -> list:
+        table = EnumeratedUserTable()
+        for entry in users:
+            table.update_queue(entry)
+        return table.get_users()
+
+    def test_same_id_fills_missing_name_and_slug(self):
+        self.assertEqual(self.merged(user("1"), user("1", slug="admin"), user("1", name="Admin")), [user("1", "admin", "Admin")])
+
+    def test_same_id_keeps_known_name_and_slug(self):
+        self.assertEqual(self.merged(user("1", "admin", "Admin"), user("1", "other", "Other")), [user("1", "admin", "Admin")])
+
+    def test_duplicate_slug_or_name_is_not_added(self):
+        self.assertEqual(self.merged(user("1", "admin", "Admin"), user("2", slug="admin")), [user("1", "admin", "Admin")])
+        self.assertEqual(self.merged(user("1", "admin", "Admin"), user("2", name="Admin")), [user("1", "admin", "Admin")])
+
+    def test_different_users_are_kept_in_order_of_discovery(self):
+        self.assertEqual(self.merged(user("2", "editor"), user("1", "admin"), user(name="Writer")),
+                         [user("2", "editor"), user("1", "admin"), user(name="Writer")])
+
+    def test_entry_found_by_id_is_completed_and_drops_entry_without_id(self):
+        # Author of a post (ID only) and RSS author (name only) are the same user once /wp/v2/users/<id> tells its name
+        for users in [(user("1"), user(name="Admin")), (user(name="Admin"), user("1"))]:
+            self.assertEqual(self.merged(*users, user("1", "admin", "Admin")), [user("1", "admin", "Admin")])
+
+    def test_entry_without_id_duplicated_by_new_user_is_dropped(self):
+        # The new user is a duplicate and is not added either
+        self.assertEqual(self.merged(user(name="Admin"), user("1", name="Admin")), [])
+        self.assertEqual(self.merged(user(slug="admin"), user(slug="admin", name="Admin")), [])
+
+    def test_only_entries_without_id_duplicating_new_user_are_dropped(self):
+        self.assertEqual(self.merged(user("1", "admin"), user(name="Writer"), user("2", slug="admin")), [user("1", "admin"), user(name="Writer")])
+
+    def test_lookups(self):
+        table = EnumeratedUserTable()
+        for entry in [user("1"), user("2", "editor", "Editor")]:
+            table.update_queue(entry)
+        self.assertTrue(table.needs_enumeration("1"))
+        self.assertFalse(table.needs_enumeration("2"))
+        self.assertEqual(table.get_user_slug_or_name("2"), "editor")
+        self.assertEqual(table.get_user_slug_or_name("3"), "3")
+        self.assertEqual(table.find(slug="editor"), user("2", "editor", "Editor"))
+        self.assertIsNone(table.find(user_id="3"))
+
+
+if __name__ == "__main__":
+    unittest.main()